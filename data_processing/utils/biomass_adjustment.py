@@ -0,0 +1,575 @@
+"""Batch biomass emissions adjustment for SISEPUEDE run outputs. Applies
+    the biomass reallocation from emissions_adjustment_biomass.ipynb, where
+    removals are moved from Forest land to Manufacturing Industries and
+    Construction (INEN) and Other (Residential, Commercial, Institution)
+    (SCOE), and maps inventory categories to WB CSC categories using
+    categories_wb_to_national_communication.csv. All operations are column
+    operations over (primary, time_period), so a run of any size is
+    adjusted at once.
+
+    Example
+    -------
+    # re-adjust all runs in ssp_run_output
+    df_summary = adjust_run_directories(n_workers = 4, )
+"""
+import concurrent.futures as cf
+import numpy as np
+import pandas as pd
+import pathlib
+import re
+import warnings
+from typing import *
+
+try:
+    import utils.shared_support as shs
+except ModuleNotFoundError:
+    import shared_support as shs
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+# paths
+_PATH_POSTPROCESSING_DATA = shs.get_path_repo().joinpath("ssp_modeling", "output_postprocessing", "data")
+_PATH_ADJUSTMENTS = _PATH_POSTPROCESSING_DATA.joinpath("emission_targets_uganda_inventory_aggregates.xlsx")
+_PATH_CATEGORY_MAP = _PATH_POSTPROCESSING_DATA.joinpath("categories_wb_to_national_communication.csv")
+_PATH_RUN_OUTPUT = shs.get_path_repo().joinpath("ssp_modeling", "ssp_run_output")
+_SHEET_ADJUSTMENTS = "for_trajectory_modification"
+
+# output file names (written in each run directory)
+_FN_ADJUSTED = "emissions_biomass_adjusted.csv"
+_FN_ADJUSTED_MAPPED_TO_WB = "emissions_biomass_adjusted_mapped_to_wbcsc.csv"
+
+# fields in adjustment table and category map
+_FIELD_ADJ_FRAC_ALLOCATIONS_INEN = "frac_allocation_inen"
+_FIELD_ADJ_FRAC_ALLOCATIONS_SCOE = "frac_allocation_scoe"
+_FIELD_ADJ_REMOVALS_TO_ALLOCATE = "total_removals_to_reallocate_mt_co2e"
+_FIELD_ADJ_YEAR = "year"
+_FIELD_MAP_INV = "cats_inv"
+_FIELD_MAP_WB = "cats_wb_1"
+
+# fields in outputs
+_FIELD_GAS = "Gas"
+_FIELD_PRIMARY = "primary_id"
+_FIELD_SECTOR = "Sector"
+_FIELD_SUBSECTOR = "Subsector"
+_FIELD_TIME_PERIOD = "time_period"
+_FIELD_VALUE = "Value"
+_FIELD_YEAR = "Year"
+
+# inventory sectors and categories used in the reallocation
+_SECTOR_AFOLU = "AFOLU"
+_SECTOR_CCSQ = "CCSQ"
+_SECTOR_ENERGY = "Energy"
+_SECTOR_IPPU = "IPPU"
+_SECTOR_WASTE = "Waste"
+_SUBSECTOR_FRST = "Forest land"
+_SUBSECTOR_INEN = "Manufacturing Industries and Construction"
+_SUBSECTOR_SCOE = "Other (Residential, Commercial, Institution)"
+
+# biomass stationary combustion emission factors and gases, in order
+_CAT_ENFU_BIOMASS = "fuel_biomass"
+_GASES_BIOMASS = ["ch4", "co2", "n2o"]
+_FIELDS_EF_BIOMASS = [
+    f"ef_enfu_stationary_combustion_tonne_ch4_per_tj_{_CAT_ENFU_BIOMASS}",
+    f"ef_enfu_combustion_tonne_co2_per_tj_{_CAT_ENFU_BIOMASS}",
+    f"ef_enfu_stationary_combustion_tonne_n2o_per_tj_{_CAT_ENFU_BIOMASS}",
+]
+
+# map SISEPUEDE emission subsectors to National Communication categories;
+#  subsectors that are not mapped keep their abbreviation
+_DICT_SUBSECTOR_TO_CATEGORY_INV = {
+    "agrc": "Biomass Burning Emissions",
+    "entc": "Energy Industries",
+    "frst": _SUBSECTOR_FRST,
+    "inen": _SUBSECTOR_INEN,
+    "ippu": "Cement production",
+    "lndu": "Other Lands",
+    "lsmm": "Manure Management",
+    "lvst": "Enteric Fermentation",
+    "scoe": _SUBSECTOR_SCOE,
+    "soil": "Direct N2O emissions from managed soil",
+    "trns": "Transport",
+    "trww": "Wastewater Treatment and Discharge",
+    "waso": "Solid Waste Disposal",
+}
+_SUBSECTORS_EMISSION = sorted(_DICT_SUBSECTOR_TO_CATEGORY_INV.keys()) + ["ccsq", "fgtv"]
+
+# sector of each SISEPUEDE emission subsector (as in the inventory targets)
+_DICT_SUBSECTOR_TO_SECTOR = {
+    "agrc": _SECTOR_AFOLU,
+    "ccsq": _SECTOR_CCSQ,
+    "entc": _SECTOR_ENERGY,
+    "fgtv": _SECTOR_ENERGY,
+    "frst": _SECTOR_AFOLU,
+    "inen": _SECTOR_ENERGY,
+    "ippu": _SECTOR_IPPU,
+    "lndu": _SECTOR_AFOLU,
+    "lsmm": _SECTOR_AFOLU,
+    "lvst": _SECTOR_AFOLU,
+    "scoe": _SECTOR_ENERGY,
+    "soil": _SECTOR_AFOLU,
+    "trns": _SECTOR_ENERGY,
+    "trww": _SECTOR_WASTE,
+    "waso": _SECTOR_WASTE,
+}
+
+# WB CSC categories for subsectors that have no inventory category
+_DICT_SUBSECTOR_TO_CATEGORY_WB = {
+    "ccsq": "CCSQ",
+    "fgtv": "EN - Fugitive Emissions",
+}
+
+# inventory gases that cannot be mapped to WB CSC gases without splitting 
+#  (the notebook splits or drops them)
+_GASES_NOT_MAPPED = ["ALL GHG", "CO", "NOX"]
+_REGEX_EMISSION = re.compile(
+    rf"^emission_co2e_(?P<gas>.+?)_(?P<subsector>{'|'.join(_SUBSECTORS_EMISSION)})_"
+)
+# aggregates of other emission fields (excluded to avoid double counting)
+_REGEX_EMISSION_EXCLUDE = re.compile(r"^emission_co2e_co2_lndu_conversion_away_")
+
+# valid options for extrapolating adjustments beyond inventory years
+_EXTRAPOLATION_FLAT = "flat"
+_EXTRAPOLATION_ZERO = "zero"
+_EXTRAPOLATION_METHODS = [_EXTRAPOLATION_FLAT, _EXTRAPOLATION_ZERO]
+
+
+
+
+
+##########################
+#    DEFINE FUNCTIONS    #
+##########################
+
+def adjust_emissions(
+    df_run: pd.DataFrame,
+    df_adjustments: Union[pd.DataFrame, None] = None,
+    dict_gwp: Union[Dict[str, float], None] = None,
+    dict_subsector_to_category: Union[Dict[str, str], None] = None,
+    vec_frac_gas: Union[np.ndarray, None] = None,
+    extrapolation: str = _EXTRAPOLATION_FLAT,
+    year_0: Union[int, None] = None,
+) -> pd.DataFrame:
+    """Apply the biomass reallocation to a run output. Returns a long
+        DataFrame with primary_id, time_period, "Year", "Sector", 
+        "Subsector" (inventory category), "Gas", and "Value".
+
+        For each (primary, time_period), the removals R to reallocate are
+        subtracted from Forest land CO2 and added to INEN and SCOE using the
+        allocation fractions, then divided by gas using GWP-weighted biomass
+        stationary combustion factors. Net emissions are preserved.
+
+        NOTE: The adjustment table only covers inventory years (1995-2017).
+        As in emissions_adjustment_biomass.ipynb, the reallocated amounts
+        R*frac_allocation_inen and R*frac_allocation_scoe are linearly 
+        interpolated between inventory years, and by default the last 
+        inventory values are held constant over projection years (see 
+        interpolate_adjustments()).
+
+        NOTE: emissions_adjustment_biomass.ipynb replaces inventory Forest 
+        land emissions with forest_seq_mt_co2e. In the inventory, 
+        forest_seq_mt_co2e = total_forestland_mt_co2e - R, so replacing is
+        the same as subtracting R. Run outputs have modeled Forest land 
+        emissions that differ from the inventory, so R is subtracted here 
+        rather than overwriting Forest land with the inventory series.
+
+    Function Arguments
+    ------------------
+    df_run : pd.DataFrame
+        Wide run output with primary_id, time_period, and emission_co2e_*
+        fields
+
+    Keyword Arguments
+    -----------------
+    df_adjustments : Union[pd.DataFrame, None]
+        Adjustment table with year, total removals to reallocate, and
+        allocation fractions for INEN and SCOE. Interpolated between years
+        (see extrapolation).
+        If None, reads from the inventory aggregates workbook
+    dict_gwp : Union[Dict[str, float], None]
+        Optional dictionary mapping "ch4", "co2", and "n2o" to GWPs. If
+        None, uses SISEPUEDE model attributes
+    dict_subsector_to_category : Union[Dict[str, str], None]
+        Optional dictionary mapping SISEPUEDE subsectors to inventory
+        categories. If None, uses _DICT_SUBSECTOR_TO_CATEGORY_INV
+    vec_frac_gas : Union[np.ndarray, None]
+        Optional fractions of reallocated emissions by gas (ch4, co2, n2o).
+        If None, calculated row-wise from biomass emission factors in
+        df_run
+    extrapolation : str
+        How to treat years outside of the adjustment table. If "flat", 
+        the first and last inventory values are held constant; if "zero",
+        no reallocation is applied outside of inventory years
+    year_0 : Union[int, None]
+        Year of time period 0. If None, uses shared_support.get_year_0()
+    """
+    df_adjustments = read_adjustments() if (df_adjustments is None) else df_adjustments
+    year_0 = shs.get_year_0() if (year_0 is None) else year_0
+    dict_subsector_to_category = (
+        _DICT_SUBSECTOR_TO_CATEGORY_INV
+        if dict_subsector_to_category is None
+        else dict_subsector_to_category
+    )
+
+
+    ##  AGGREGATE EMISSION FIELDS TO (SECTOR, CATEGORY, GAS) COLUMNS
+
+    fields = []
+    keys = []
+    for field in df_run.columns:
+        match = _REGEX_EMISSION.match(field)
+        if (match is None) or (_REGEX_EMISSION_EXCLUDE.match(field) is not None):
+            continue
+
+        subsector = match.group("subsector")
+        fields.append(field)
+        keys.append(
+            (
+                _DICT_SUBSECTOR_TO_SECTOR.get(subsector),
+                dict_subsector_to_category.get(subsector, subsector), 
+                match.group("gas").upper(), 
+            )
+        )
+
+    keys_realloc = [
+        (_SECTOR_AFOLU, _SUBSECTOR_FRST),
+        (_SECTOR_ENERGY, _SUBSECTOR_INEN),
+        (_SECTOR_ENERGY, _SUBSECTOR_SCOE),
+    ]
+    keys_unique = sorted(set(keys) | set(x + (y.upper(), ) for x in keys_realloc for y in _GASES_BIOMASS))
+    dict_key_ind = dict((x, i) for i, x in enumerate(keys_unique))
+
+    arr_agg = np.zeros((len(fields), len(keys_unique)), )
+    arr_agg[np.arange(len(fields)), [dict_key_ind.get(x) for x in keys]] = 1.0
+    arr_emissions = df_run[fields].to_numpy(dtype = float, ) @ arr_agg
+
+
+    ##  REALLOCATE
+
+    vec_year = df_run[_FIELD_TIME_PERIOD].to_numpy() + year_0
+    vec_removals_inen, vec_removals_scoe = interpolate_adjustments(
+        vec_year,
+        df_adjustments,
+        extrapolation = extrapolation,
+    )
+
+    arr_frac_gas = (
+        get_gas_fractions(df_run, dict_gwp = dict_gwp, )
+        if vec_frac_gas is None
+        else np.tile(np.array(vec_frac_gas, dtype = float, ), (len(df_run), 1, ), )
+    )
+
+    arr_emissions[:, dict_key_ind.get(keys_realloc[0] + ("CO2", ))] -= vec_removals_inen + vec_removals_scoe
+    for key, vec_removals in zip(keys_realloc[1:], [vec_removals_inen, vec_removals_scoe]):
+        inds = [dict_key_ind.get(key + (x.upper(), )) for x in _GASES_BIOMASS]
+        arr_emissions[:, inds] += arr_frac_gas*vec_removals[:, None]
+
+
+    ##  BUILD LONG OUTPUT
+
+    n_rows, n_keys = arr_emissions.shape
+    df_out = pd.DataFrame(
+        {
+            _FIELD_PRIMARY: np.repeat(df_run[_FIELD_PRIMARY].to_numpy(), n_keys, ),
+            _FIELD_TIME_PERIOD: np.repeat(df_run[_FIELD_TIME_PERIOD].to_numpy(), n_keys, ),
+            _FIELD_YEAR: np.repeat(vec_year, n_keys, ),
+            _FIELD_SECTOR: np.tile([x[0] for x in keys_unique], n_rows, ),
+            _FIELD_SUBSECTOR: np.tile([x[1] for x in keys_unique], n_rows, ),
+            _FIELD_GAS: np.tile([x[2] for x in keys_unique], n_rows, ),
+            _FIELD_VALUE: arr_emissions.reshape(n_rows*n_keys),
+        }
+    )
+
+    return df_out
+
+
+
+def adjust_run_directory(
+    path_run: Union[str, pathlib.Path],
+    df_adjustments: Union[pd.DataFrame, None] = None,
+    df_category_map: Union[pd.DataFrame, None] = None,
+    write: bool = True,
+    **kwargs,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Adjust emissions for a single run directory and write results next
+        to the run output. Returns a tuple of the form
+
+        (df_adjusted, df_adjusted_mapped_to_wb)
+
+    Function Arguments
+    ------------------
+    path_run : Union[str, pathlib.Path]
+        Run directory containing <dirname>.csv
+
+    Keyword Arguments
+    -----------------
+    df_adjustments : Union[pd.DataFrame, None]
+        Adjustment table (see adjust_emissions())
+    df_category_map : Union[pd.DataFrame, None]
+        Category map with cats_inv and cats_wb_1. If None, reads from
+        categories_wb_to_national_communication.csv
+    write : bool
+        Write outputs to path_run?
+    **kwargs :
+        Passed to adjust_emissions()
+    """
+    path_run = pathlib.Path(path_run)
+    path_csv = path_run.joinpath(f"{path_run.name}.csv")
+    if not path_csv.is_file():
+        raise RuntimeError(f"Run output {path_csv} not found.")
+
+    # only read fields that are needed
+    fields_keep = set([_FIELD_PRIMARY, _FIELD_TIME_PERIOD] + _FIELDS_EF_BIOMASS)
+    df_run = pd.read_csv(
+        path_csv,
+        usecols = lambda x: (x in fields_keep) or (_REGEX_EMISSION.match(x) is not None),
+    )
+
+    df_adjusted = adjust_emissions(
+        df_run,
+        df_adjustments = df_adjustments,
+        **kwargs,
+    )
+    df_mapped = map_to_wb_categories(
+        df_adjusted,
+        df_category_map = df_category_map,
+    )
+
+    if write:
+        shs.write_csv_atomic(df_adjusted, path_run.joinpath(_FN_ADJUSTED), )
+        shs.write_csv_atomic(df_mapped, path_run.joinpath(_FN_ADJUSTED_MAPPED_TO_WB), )
+
+    return df_adjusted, df_mapped
+
+
+
+def adjust_run_directories(
+    paths_runs: Union[List[Union[str, pathlib.Path]], None] = None,
+    n_workers: int = 1,
+    path_run_output: Union[str, pathlib.Path] = _PATH_RUN_OUTPUT,
+    stop_on_error: bool = False,
+    **kwargs,
+) -> pd.DataFrame:
+    """Adjust emissions for any number of run directories in one batch.
+        Adjustment inputs are read once and shared across runs. Returns a
+        summary DataFrame with the path, number of rows written, and any
+        error for each run.
+
+    Keyword Arguments
+    -----------------
+    paths_runs : Union[List[Union[str, pathlib.Path]], None]
+        Run directories to adjust. If None, adjusts all runs in
+        path_run_output
+    n_workers : int
+        Number of runs to adjust in parallel
+    path_run_output : Union[str, pathlib.Path]
+        Directory containing run directories (used if paths_runs is None)
+    stop_on_error : bool
+        Raise errors? If False, errors are recorded in the summary
+    **kwargs :
+        Passed to adjust_run_directory() and adjust_emissions()
+    """
+    paths_runs = (
+        sorted(
+            x for x in pathlib.Path(path_run_output).iterdir()
+            if x.joinpath(f"{x.name}.csv").is_file()
+        )
+        if paths_runs is None
+        else [pathlib.Path(x) for x in paths_runs]
+    )
+
+    # read shared inputs once
+    if kwargs.get("df_adjustments") is None:
+        kwargs.update({"df_adjustments": read_adjustments(), })
+    if kwargs.get("df_category_map") is None:
+        kwargs.update({"df_category_map": read_category_map(), })
+    if (kwargs.get("dict_gwp") is None) and (kwargs.get("vec_frac_gas") is None):
+        kwargs.update({"dict_gwp": get_gwps(), })
+    kwargs.update({"write": True, })
+
+    def adjust(path_run: pathlib.Path, ) -> dict:
+        try:
+            df_adjusted, _ = adjust_run_directory(path_run, **kwargs, )
+            out = {"path_run": str(path_run), "n_rows": len(df_adjusted), "error": None, }
+
+        except Exception as e:
+            if stop_on_error:
+                raise e
+            warnings.warn(f"Biomass adjustment failed for {path_run}: {e}")
+            out = {"path_run": str(path_run), "n_rows": 0, "error": str(e), }
+
+        return out
+
+    with cf.ThreadPoolExecutor(max_workers = max(n_workers, 1), ) as executor:
+        list_out = list(executor.map(adjust, paths_runs, ))
+
+    df_out = pd.DataFrame(list_out, columns = ["path_run", "n_rows", "error"], )
+
+    return df_out
+
+
+
+def get_gas_fractions(
+    df_run: pd.DataFrame,
+    dict_gwp: Union[Dict[str, float], None] = None,
+) -> np.ndarray:
+    """Get the fraction of reallocated CO2e by gas (ch4, co2, n2o) for
+        each row using GWP-weighted biomass combustion emission factors.
+        Returns an array with shape (row, gas).
+    """
+    fields_missing = [x for x in _FIELDS_EF_BIOMASS if x not in df_run.columns]
+    if len(fields_missing) > 0:
+        raise KeyError(f"Biomass emission factor fields {fields_missing} not found; specify vec_frac_gas.")
+
+    dict_gwp = get_gwps() if (dict_gwp is None) else dict_gwp
+    vec_gwp = np.array([dict_gwp.get(x) for x in _GASES_BIOMASS], dtype = float, )
+
+    arr_out = df_run[_FIELDS_EF_BIOMASS].to_numpy(dtype = float, )*vec_gwp
+    vec_total = arr_out.sum(axis = 1, keepdims = True, )
+    arr_out = np.divide(
+        arr_out,
+        vec_total,
+        out = np.zeros_like(arr_out),
+        where = (vec_total != 0),
+    )
+
+    return arr_out
+
+
+
+def get_gwps(
+) -> Dict[str, float]:
+    """Get GWPs for biomass gases from SISEPUEDE model attributes
+    """
+    # import here so that adjustments can run without SISEPUEDE if GWPs are passed
+    try:
+        import utils.common_data_needs as cdn
+    except ModuleNotFoundError:
+        import common_data_needs as cdn
+
+    matt = cdn._SISEPUEDE_MODEL_ATTRIBUTES
+    dict_out = dict((x, float(matt.get_gwp(x))) for x in _GASES_BIOMASS)
+
+    return dict_out
+
+
+
+def interpolate_adjustments(
+    vec_year: np.ndarray,
+    df_adjustments: pd.DataFrame,
+    extrapolation: str = _EXTRAPOLATION_FLAT,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Interpolate removals reallocated to INEN and SCOE to years. Returns 
+        a tuple of the form
+
+        (vec_removals_inen, vec_removals_scoe)
+
+        The products R*frac_allocation_inen and R*frac_allocation_scoe are
+        interpolated (as in emissions_adjustment_biomass.ipynb) rather than
+        R and the fractions separately, which would not match the inventory
+        between inventory years.
+
+    Function Arguments
+    ------------------
+    vec_year : np.ndarray
+        Years to interpolate to
+    df_adjustments : pd.DataFrame
+        Adjustment table (see adjust_emissions())
+
+    Keyword Arguments
+    -----------------
+    extrapolation : str
+        If "flat", the first and last values are held constant outside of
+        the years in df_adjustments (e.g., the 2017 reallocation is carried
+        through all projection years). If "zero", removals are 0 outside of
+        the years in df_adjustments
+    """
+    if extrapolation not in _EXTRAPOLATION_METHODS:
+        raise ValueError(f"Invalid extrapolation '{extrapolation}': specify one of {_EXTRAPOLATION_METHODS}")
+
+    vec_year = np.asarray(vec_year, )
+    df_adjustments = df_adjustments.sort_values(by = [_FIELD_ADJ_YEAR], )
+    vec_years_adj = df_adjustments[_FIELD_ADJ_YEAR].to_numpy()
+    vec_removals = df_adjustments[_FIELD_ADJ_REMOVALS_TO_ALLOCATE].to_numpy(dtype = float, )
+
+    out = tuple(
+        np.interp(vec_year, vec_years_adj, vec_removals*df_adjustments[x].to_numpy(dtype = float, ), )
+        for x in [_FIELD_ADJ_FRAC_ALLOCATIONS_INEN, _FIELD_ADJ_FRAC_ALLOCATIONS_SCOE]
+    )
+
+    if extrapolation == _EXTRAPOLATION_ZERO:
+        vec_outside = (vec_year < vec_years_adj.min()) | (vec_year > vec_years_adj.max())
+        for vec in out:
+            vec[vec_outside] = 0.0
+
+    return out
+
+
+
+def map_to_wb_categories(
+    df_adjusted: pd.DataFrame,
+    df_category_map: Union[pd.DataFrame, None] = None,
+) -> pd.DataFrame:
+    """Map inventory categories in an adjusted emissions table to WB CSC
+        categories and sum. Sector and any other non-value fields are kept. 
+        fgtv and ccsq, which have no inventory category, are mapped to "EN - 
+        Fugitive Emissions" and "CCSQ".
+
+        Raises a ValueError if there are categories that are not in the map
+        or gases that have no WB CSC equivalent (CO, NOx, and All GHG), 
+        rather than dropping them.
+    """
+    df_category_map = read_category_map() if (df_category_map is None) else df_category_map
+    dict_map = dict(_DICT_SUBSECTOR_TO_CATEGORY_WB)
+    dict_map.update(zip(df_category_map[_FIELD_MAP_INV], df_category_map[_FIELD_MAP_WB]))
+
+    cats_missing = sorted(set(df_adjusted[_FIELD_SUBSECTOR]) - set(dict_map.keys()))
+    if len(cats_missing) > 0:
+        raise ValueError(f"Categories {cats_missing} not found in the WB CSC category map.")
+
+    gases_invalid = sorted(
+        x for x in df_adjusted[_FIELD_GAS].unique()
+        if str(x).upper() in _GASES_NOT_MAPPED
+    )
+    if len(gases_invalid) > 0:
+        raise ValueError(f"Gases {gases_invalid} cannot be mapped to WB CSC categories; split them by gas first.")
+
+    fields_group = [x for x in df_adjusted.columns if x != _FIELD_VALUE]
+    df_out = df_adjusted.copy()
+    df_out[_FIELD_SUBSECTOR] = df_out[_FIELD_SUBSECTOR].map(dict_map, )
+    df_out = (
+        df_out
+        .groupby(fields_group, as_index = False, sort = False, )[[_FIELD_VALUE]]
+        .sum()
+    )
+
+    return df_out
+
+
+
+def read_adjustments(
+    path: Union[str, pathlib.Path] = _PATH_ADJUSTMENTS,
+) -> pd.DataFrame:
+    """Read the biomass adjustment table (year, removals to reallocate, and
+        allocation fractions)
+    """
+    df_out = pd.read_excel(path, sheet_name = _SHEET_ADJUSTMENTS, )
+
+    return df_out
+
+
+
+def read_category_map(
+    path: Union[str, pathlib.Path] = _PATH_CATEGORY_MAP,
+) -> pd.DataFrame:
+    """Read the map of National Communication categories to WB CSC
+        categories
+    """
+    df_out = pd.read_csv(path, encoding = "utf-8-sig", )
+
+    return df_out
@@ -0,0 +1,830 @@
+"""Automated calibration of SISEPUEDE inputs against emission targets.
+    Tunable input fields are scaled by bounded parameters, candidate input
+    tables are built for a whole batch at once, and batches are evaluated
+    in parallel by workers that each keep a warm SISEPUEDEModels instance.
+    The error between model emissions and targets is calculated for all
+    candidates, subsectors, and years in one array operation. Evaluated
+    candidates are cached (optionally on disk), so repeated points are not
+    rerun; the cache file is tied to a fingerprint of the inputs, targets,
+    and parameters it was calculated with.
+
+    Example
+    -------
+    targets = CalibrationTargets.from_files(years = [2015, 2016, 2017], )
+    df_parameters = pd.DataFrame(
+        {
+            "parameter": ["lvst_pop", "frst_seq"],
+            "fields": [r"^pop_lvst_initial_", r"^ef_frst_sequestration_"],
+            "min": [0.8, 0.5],
+            "max": [1.2, 1.5],
+        }
+    )
+    calib = Calibrator(df_input, targets, df_parameters, n_workers = 8, path_cache = "calib.csv", )
+    df_history = calib.run(n_iterations = 10, batch_size = 32, seed = 1, )
+    df_input_calibrated = calib.build_inputs(calib.get_best()[0])
+"""
+import concurrent.futures as cf
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+import pathlib
+import re
+import warnings
+from typing import *
+
+try:
+    import utils.shared_support as shs
+except ModuleNotFoundError:
+    import shared_support as shs
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+# paths
+_PATH_POSTPROCESSING_DATA = shs.get_path_repo().joinpath("ssp_modeling", "output_postprocessing", "data")
+_PATH_FIELD_MAP = _PATH_POSTPROCESSING_DATA.joinpath("emission_targets_uganda.csv")
+_PATH_TARGETS = _PATH_POSTPROCESSING_DATA.joinpath("emission_targets_uganda_ghg_inventory_biomass_adjusted_mapped_to_wbcsc.csv")
+
+# fields in targets and field map
+_FIELD_GAS = "Gas"
+_FIELD_MAP_CLASS = "Edgar_Class"
+_FIELD_MAP_VARS = "Vars"
+_FIELD_SUBSECTOR = "Subsector"
+_FIELD_VALUE = "Value"
+_FIELD_YEAR = "Year"
+
+# fields in parameter specification
+_FIELD_PARAM_FIELDS = "fields"
+_FIELD_PARAM_MAX = "max"
+_FIELD_PARAM_MIN = "min"
+_FIELD_PARAM_NAME = "parameter"
+
+# fields in outputs
+_FIELD_ERROR = "error"
+_FIELD_FINGERPRINT = "fingerprint"
+_FIELD_ITERATION = "iteration"
+_FIELD_KEY = "target"
+_FIELD_MODEL = "model"
+_FIELD_TIME_PERIOD = "time_period"
+
+# number of hexadecimal characters kept from the cache fingerprint
+_FINGERPRINT_LENGTH = 16
+
+# inventory subsectors are named differently in the field map
+_DICT_TARGET_SUBSECTOR_RENAME = {
+    "WST - Solid Waste": "Waste - Solid Waste",
+    "WST - Wastewater Treatment": "Waste - Wastewater Treatment",
+}
+
+
+
+
+
+
+###########################
+#    TARGETS AND ERROR    #
+###########################
+
+class CalibrationTargets:
+    """Emission targets by target key (subsector and gas, e.g.,
+        "AG - Livestock:CH4") and year, with the map from model output
+        fields to target keys stored as an aggregation matrix.
+
+    Initialization Arguments
+    ------------------------
+    df_targets : pd.DataFrame
+        Long targets with "Subsector", "Gas", "Year", and "Value"
+    df_field_map : pd.DataFrame
+        Map of target keys ("Edgar_Class") to colon-separated output fields
+        ("Vars")
+
+    Optional Arguments
+    ------------------
+    dict_weights : Union[Dict[str, float], None]
+        Optional weights by target key (default 1)
+    frac_scale_floor : float
+        If scale_floor is None, the minimum scale is frac_scale_floor times
+        the median absolute target. Errors for targets that are small 
+        relative to the rest (e.g., AG - Crops:CO2) are then scaled like
+        absolute errors, so they do not dominate the loss
+    scale_floor : Union[float, None]
+        Minimum absolute target used to scale errors; avoids dividing by
+        targets that are near 0. If None, calculated from frac_scale_floor
+    years : Union[List[int], None]
+        Years to calibrate to. If None, uses all years in df_targets
+    """
+    def __init__(self,
+        df_targets: pd.DataFrame,
+        df_field_map: pd.DataFrame,
+        dict_weights: Union[Dict[str, float], None] = None,
+        frac_scale_floor: float = 0.5,
+        scale_floor: Union[float, None] = None,
+        years: Union[List[int], None] = None,
+    ) -> None:
+
+        self._initialize_targets(
+            df_targets,
+            df_field_map,
+            dict_weights,
+            frac_scale_floor,
+            scale_floor,
+            years,
+        )
+
+        return None
+
+
+
+    @classmethod
+    def from_files(cls,
+        path_targets: Union[str, pathlib.Path] = _PATH_TARGETS,
+        path_field_map: Union[str, pathlib.Path] = _PATH_FIELD_MAP,
+        **kwargs,
+    ) -> "CalibrationTargets":
+        """Initialize from the inventory targets and field map files.
+            kwargs are passed to CalibrationTargets.
+        """
+        df_targets = pd.read_csv(path_targets, )
+        df_targets[_FIELD_SUBSECTOR] = df_targets[_FIELD_SUBSECTOR].replace(_DICT_TARGET_SUBSECTOR_RENAME, )
+        df_field_map = pd.read_csv(path_field_map, )
+
+        out = cls(df_targets, df_field_map, **kwargs, )
+
+        return out
+
+
+
+    def _initialize_targets(self,
+        df_targets: pd.DataFrame,
+        df_field_map: pd.DataFrame,
+        dict_weights: Union[Dict[str, float], None],
+        frac_scale_floor: float,
+        scale_floor: Union[float, None],
+        years: Union[List[int], None],
+    ) -> None:
+        """Build target, weight, and aggregation arrays. Sets the following
+            properties:
+
+            * self.arr_agg
+            * self.arr_scale
+            * self.arr_targets
+            * self.fields
+            * self.keys
+            * self.scale_floor
+            * self.vec_weights
+            * self.years
+        """
+        dict_weights = {} if not isinstance(dict_weights, dict) else dict_weights
+
+        # map keys to fields (union over rows with the same key)
+        dict_key_to_fields = {}
+        for key, fields in zip(df_field_map[_FIELD_MAP_CLASS], df_field_map[_FIELD_MAP_VARS]):
+            if not isinstance(fields, str):
+                continue
+            dict_key_to_fields.setdefault(key, [])
+            dict_key_to_fields[key].extend([x for x in fields.split(":") if x not in dict_key_to_fields[key]])
+
+        # keep target keys that can be calculated from outputs
+        vec_keys_targets = (df_targets[_FIELD_SUBSECTOR] + ":" + df_targets[_FIELD_GAS]).to_numpy()
+        keys_missing = sorted(set(vec_keys_targets) - set(dict_key_to_fields.keys()))
+        if len(keys_missing) > 0:
+            warnings.warn(f"Targets {keys_missing} have no output fields and will be ignored.")
+
+        keys = sorted(set(vec_keys_targets) & set(dict_key_to_fields.keys()))
+        years = sorted(df_targets[_FIELD_YEAR].unique()) if (years is None) else sorted(years)
+
+
+        ##  BUILD ARRAYS
+
+        arr_targets = (
+            pd.DataFrame({_FIELD_KEY: vec_keys_targets, _FIELD_YEAR: df_targets[_FIELD_YEAR], _FIELD_VALUE: df_targets[_FIELD_VALUE], })
+            .groupby([_FIELD_YEAR, _FIELD_KEY])[_FIELD_VALUE]
+            .sum()
+            .unstack(_FIELD_KEY)
+            .reindex(index = years, columns = keys, )
+            .to_numpy(dtype = float, )
+        )
+
+        fields = sorted(set(sum([dict_key_to_fields.get(x) for x in keys], [])))
+        dict_field_ind = dict((x, i) for i, x in enumerate(fields))
+        arr_agg = np.zeros((len(fields), len(keys)), )
+        for j, key in enumerate(keys):
+            arr_agg[[dict_field_ind.get(x) for x in dict_key_to_fields.get(key)], j] = 1.0
+
+        # base the floor on target magnitudes so that near-zero targets do not dominate
+        if scale_floor is None:
+            vec_abs = np.abs(arr_targets[~np.isnan(arr_targets)])
+            scale_floor = frac_scale_floor*np.median(vec_abs) if (len(vec_abs) > 0) else 1.0
+            scale_floor = scale_floor if (scale_floor > 0) else 1.0
+
+        self.arr_agg = arr_agg
+        self.arr_scale = np.maximum(np.abs(arr_targets), scale_floor, )
+        self.arr_targets = arr_targets
+        self.fields = fields
+        self.keys = keys
+        self.scale_floor = float(scale_floor)
+        self.vec_weights = np.array([dict_weights.get(x, 1.0) for x in keys], dtype = float, )
+        self.years = years
+
+        return None
+
+
+
+    def compute_error(self,
+        arr_model: np.ndarray,
+        return_components: bool = False,
+    ) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """Calculate the weighted mean squared relative error for a batch of
+            model arrays with shape (candidate, year, key). Cells with
+            missing targets are ignored. Returns a vector of errors by
+            candidate, or, if return_components, a tuple of the form
+
+            (vec_error, arr_error)
+
+            where arr_error is the relative error by candidate, year, and
+            key.
+        """
+        arr_model = np.asarray(arr_model, dtype = float, )
+        arr_model = arr_model[None, :, :] if (arr_model.ndim == 2) else arr_model
+        arr_error = (arr_model - self.arr_targets[None, :, :])/self.arr_scale[None, :, :]
+
+        arr_w = np.where(np.isnan(arr_error), 0.0, self.vec_weights[None, None, :], )
+        vec_error = (
+            np.nansum(arr_w*arr_error**2, axis = (1, 2), )
+            / np.maximum(arr_w.sum(axis = (1, 2), ), 1e-12, )
+        )
+
+        out = (vec_error, arr_error) if return_components else vec_error
+
+        return out
+
+
+
+    def get_error_table(self,
+        arr_model: np.ndarray,
+    ) -> pd.DataFrame:
+        """Get a long table of targets, model values, and relative errors by
+            target key and year for a single model array (year, key).
+        """
+        _, arr_error = self.compute_error(arr_model, return_components = True, )
+        n_years, n_keys = self.arr_targets.shape
+
+        df_out = pd.DataFrame(
+            {
+                _FIELD_YEAR: np.repeat(self.years, n_keys, ),
+                _FIELD_KEY: np.tile(self.keys, n_years, ),
+                _FIELD_VALUE: self.arr_targets.reshape(-1),
+                _FIELD_MODEL: np.asarray(arr_model).reshape(-1),
+                _FIELD_ERROR: arr_error[0].reshape(-1),
+            }
+        )
+
+        return df_out
+
+
+
+    def get_model_array(self,
+        df_output: pd.DataFrame,
+        year_0: Union[int, None] = None,
+    ) -> np.ndarray:
+        """Aggregate a model output (one row per time period) to an array
+            with shape (year, key). Missing output fields are treated as 0,
+            and years without output are NaN. If year_0 is None, uses
+            shared_support.get_year_0().
+        """
+        year_0 = shs.get_year_0() if (year_0 is None) else year_0
+        arr_fields = (
+            df_output
+            .reindex(columns = self.fields, fill_value = 0.0, )
+            .to_numpy(dtype = float, )
+        )
+        arr_keys = arr_fields @ self.arr_agg
+
+        vec_years = df_output[_FIELD_TIME_PERIOD].to_numpy() + year_0
+        vec_row = pd.Index(vec_years).get_indexer(self.years, )
+
+        arr_out = np.full((len(self.years), len(self.keys)), np.nan, )
+        arr_out[vec_row >= 0] = arr_keys[vec_row[vec_row >= 0]]
+
+        return arr_out
+
+
+
+
+
+########################
+#    PRIMARY CLASS     #
+########################
+
+class Calibrator:
+    """Search bounded input scalars that minimize the error between model
+        emissions and targets. For parameter p with value x[p], all input
+        fields assigned to p are multiplied by x[p]. The search uses the
+        cross-entropy method: each iteration proposes a batch of candidates
+        from a normal distribution (in normalized parameter space), and the
+        distribution is refit to the best (elite) candidates.
+
+    Initialization Arguments
+    ------------------------
+    df_input_base : pd.DataFrame
+        Base input table for one region (one row per time period)
+    targets : CalibrationTargets
+        Emission targets used to calculate errors
+    df_parameters : pd.DataFrame
+        Parameter specification with fields "parameter", "fields" (regular
+        expression or list of input fields), "min", and "max"
+
+    Optional Arguments
+    ------------------
+    build_models : Union[Callable[[], Callable], None]
+        Function that returns a model callable (e.g., SISEPUEDEModels).
+        Called once per worker, so models stay warm across batches. Must be
+        picklable (defined at module level) if n_workers > 1. If None, uses
+        the models in common_data_needs
+    decimals_cache : int
+        Number of decimals used to identify repeated candidates
+    dict_models_kwargs : Union[dict, None]
+        Optional keyword arguments passed to the models on each run
+    logger : Union[logging.Logger, None]
+        Optional logger used to report failed candidates. If None, failures
+        are reported as warnings
+    n_workers : int
+        Number of worker processes; if 1, runs in the current process
+    path_cache : Union[str, pathlib.Path, None]
+        Optional CSV used to persist evaluated candidates across sessions.
+        Each row stores a fingerprint of the base inputs, targets, weights,
+        parameter specification, and decimals_cache (see 
+        get_fingerprint()); a cache with a different fingerprint is 
+        ignored and overwritten
+    year_0 : Union[int, None]
+        Year of time period 0. If None, uses shared_support.get_year_0()
+    """
+    def __init__(self,
+        df_input_base: pd.DataFrame,
+        targets: CalibrationTargets,
+        df_parameters: pd.DataFrame,
+        build_models: Union[Callable[[], Callable], None] = None,
+        decimals_cache: int = 8,
+        dict_models_kwargs: Union[dict, None] = None,
+        logger: Union[logging.Logger, None] = None,
+        n_workers: int = 1,
+        path_cache: Union[str, pathlib.Path, None] = None,
+        year_0: Union[int, None] = None,
+    ) -> None:
+
+        self.build_models = shs.build_models_default if (build_models is None) else build_models
+        self.decimals_cache = decimals_cache
+        self.df_input_base = df_input_base.reset_index(drop = True, )
+        self.dict_models_kwargs = {} if not isinstance(dict_models_kwargs, dict) else dict_models_kwargs
+        self.logger = logger
+        self.n_workers = n_workers
+        self.path_cache = None if (path_cache is None) else pathlib.Path(path_cache)
+        self.targets = targets
+        self.year_0 = shs.get_year_0() if (year_0 is None) else year_0
+
+        self._initialize_parameters(df_parameters, )
+        self._initialize_fingerprint()
+        self._initialize_cache()
+
+        return None
+
+
+
+    ########################
+    #    INITIALIZATION    #
+    ########################
+
+    def _initialize_cache(self,
+    ) -> None:
+        """Initialize the cache of evaluated candidates, reading from
+            self.path_cache if it exists and its fingerprint matches 
+            self.fingerprint. Sets the following properties:
+
+            * self.dict_cache
+        """
+        self.dict_cache = {}
+
+        if (self.path_cache is None) or not self.path_cache.is_file():
+            return None
+
+        df_cache = pd.read_csv(self.path_cache, dtype = {_FIELD_FINGERPRINT: str, }, )
+        if not set(self.parameters + [_FIELD_ERROR, _FIELD_FINGERPRINT]).issubset(df_cache.columns):
+            warnings.warn(f"Cache {self.path_cache} does not match parameters and will be overwritten.")
+            return None
+
+        if not (df_cache[_FIELD_FINGERPRINT] == self.fingerprint).all():
+            warnings.warn(f"Cache {self.path_cache} was calculated with different inputs, targets, or parameters and will be overwritten.")
+            return None
+
+        arr_x = df_cache[self.parameters].to_numpy(dtype = float, )
+        for vec_x, error in zip(arr_x, df_cache[_FIELD_ERROR].to_numpy()):
+            self.dict_cache.update({self._get_cache_key(vec_x): float(error), })
+
+        return None
+
+
+
+    def _initialize_fingerprint(self,
+    ) -> None:
+        """Initialize the fingerprint used to validate the cache file. Sets 
+            the following properties:
+
+            * self.fingerprint
+        """
+        self.fingerprint = self.get_fingerprint()
+
+        return None
+
+
+
+    def _initialize_parameters(self,
+        df_parameters: pd.DataFrame,
+    ) -> None:
+        """Resolve parameter fields and bounds. Sets the following
+            properties:
+
+            * self.arr_param_to_field
+            * self.fields_tuned
+            * self.parameters
+            * self.vec_max
+            * self.vec_min
+        """
+        fields_input = list(self.df_input_base.columns)
+        dict_field_to_param = {}
+
+        for i, spec in enumerate(df_parameters[_FIELD_PARAM_FIELDS]):
+            fields = (
+                [x for x in fields_input if re.search(spec, x) is not None]
+                if isinstance(spec, str)
+                else [x for x in spec if x in fields_input]
+            )
+            if len(fields) == 0:
+                raise KeyError(f"No input fields found for parameter '{df_parameters[_FIELD_PARAM_NAME].iloc[i]}'.")
+
+            fields_dup = [x for x in fields if x in dict_field_to_param]
+            if len(fields_dup) > 0:
+                raise ValueError(f"Fields {fields_dup} are assigned to more than one parameter.")
+
+            dict_field_to_param.update(dict((x, i) for x in fields))
+
+        fields_tuned = sorted(dict_field_to_param.keys())
+        arr_param_to_field = np.zeros((len(df_parameters), len(fields_tuned)), )
+        arr_param_to_field[[dict_field_to_param.get(x) for x in fields_tuned], np.arange(len(fields_tuned))] = 1.0
+
+        vec_min = df_parameters[_FIELD_PARAM_MIN].to_numpy(dtype = float, )
+        vec_max = df_parameters[_FIELD_PARAM_MAX].to_numpy(dtype = float, )
+        if (vec_max < vec_min).any():
+            raise ValueError(f"Parameter maximums must be greater than or equal to minimums.")
+
+        self.arr_param_to_field = arr_param_to_field
+        self.fields_tuned = fields_tuned
+        self.parameters = list(df_parameters[_FIELD_PARAM_NAME])
+        self.vec_max = vec_max
+        self.vec_min = vec_min
+
+        return None
+
+
+
+    ########################
+    #    CORE FUNCTIONS    #
+    ########################
+
+    def build_inputs(self,
+        vec_x: np.ndarray,
+    ) -> pd.DataFrame:
+        """Build the input table for a single candidate
+        """
+        df_out = self.build_inputs_batch(np.atleast_2d(vec_x), )[0]
+
+        return df_out
+
+
+
+    def build_inputs_batch(self,
+        arr_x: np.ndarray,
+    ) -> List[pd.DataFrame]:
+        """Build input tables for a batch of candidates (candidate,
+            parameter). Scaled fields for all candidates are calculated at
+            once as a (candidate, time_period, field) array.
+        """
+        arr_base = self.df_input_base[self.fields_tuned].to_numpy(dtype = float, )
+        arr_scalar = np.asarray(arr_x, dtype = float, ) @ self.arr_param_to_field
+        arr_tuned = arr_base[None, :, :]*arr_scalar[:, None, :]
+
+        list_out = []
+        for arr in arr_tuned:
+            df = self.df_input_base.copy()
+            df[self.fields_tuned] = arr
+            list_out.append(df)
+
+        return list_out
+
+
+
+    def evaluate(self,
+        arr_x: np.ndarray,
+        executor: Union[cf.Executor, None] = None,
+    ) -> np.ndarray:
+        """Calculate errors for a batch of candidates (candidate,
+            parameter). Cached and repeated candidates are only run once.
+            Candidates that fail to run are logged and assigned an infinite
+            error; they are not cached, so they are retried if proposed
+            again.
+
+            If the executor breaks (e.g., a worker process is killed), 
+            candidates that completed are cached and a RuntimeError is 
+            raised; the executor cannot run the rest of the batch.
+
+        Function Arguments
+        ------------------
+        arr_x : np.ndarray
+            Candidate parameter values
+
+        Keyword Arguments
+        -----------------
+        executor : Union[cf.Executor, None]
+            Optional executor with workers initialized by
+            _initialize_worker(). If None, runs in the current process
+        """
+        arr_x = np.clip(np.atleast_2d(arr_x), self.vec_min, self.vec_max, )
+        keys = [self._get_cache_key(x) for x in arr_x]
+
+        # unique candidates that have not been evaluated
+        dict_new = {}
+        for key, vec_x in zip(keys, arr_x):
+            if (key not in self.dict_cache) and (key not in dict_new):
+                dict_new.update({key: vec_x, })
+
+        if len(dict_new) > 0:
+            keys_new = list(dict_new.keys())
+            list_inputs = self.build_inputs_batch(np.array([dict_new.get(x) for x in keys_new]), )
+
+            if executor is None:
+                _initialize_worker(self.build_models, self.targets, self.dict_models_kwargs, self.year_0, )
+                futures = None
+            else:
+                futures = [executor.submit(_evaluate_worker, x, ) for x in list_inputs]
+
+            # run candidates independently so that one failure does not stop the batch
+            arr_model = np.full((len(keys_new), ) + self.targets.arr_targets.shape, np.nan, )
+            vec_success = np.zeros(len(keys_new), dtype = bool, )
+            error_executor = None
+            for i, key in enumerate(keys_new):
+                try:
+                    arr_model[i] = (
+                        _evaluate_worker(list_inputs[i], )
+                        if futures is None
+                        else futures[i].result()
+                    )
+                    vec_success[i] = True
+
+                # a broken pool fails every pending future; keep results that completed
+                except cf.BrokenExecutor as e:
+                    error_executor = e
+
+                except Exception as e:
+                    self._log_failure(key, e, )
+
+            vec_error_new = self.targets.compute_error(arr_model, )
+            self.dict_cache.update(
+                dict(
+                    (key, float(x)) for key, x, success in zip(keys_new, vec_error_new, vec_success)
+                    if success
+                )
+            )
+            self._write_cache()
+
+            if error_executor is not None:
+                n_lost = int((~vec_success).sum())
+                raise RuntimeError(f"Calibration executor failed; {n_lost} candidates were not evaluated: {error_executor}") from error_executor
+
+        vec_out = np.array([self.dict_cache.get(x, np.inf, ) for x in keys])
+
+        return vec_out
+
+
+
+    def get_fingerprint(self,
+    ) -> str:
+        """Get a hash of everything that determines cached errors: the base
+            inputs, targets, weights, and error scales, the parameter 
+            fields and bounds, decimals_cache, year_0, and the models 
+            (build function and keyword arguments)
+        """
+        df_input_base = self.df_input_base
+        targets = self.targets
+
+        hasher = hashlib.sha256()
+        for x in [df_input_base.columns, targets.keys, targets.fields, targets.years, self.parameters, self.fields_tuned]:
+            hasher.update(repr(list(x)).encode())
+
+        hasher.update(pd.util.hash_pandas_object(df_input_base, index = False, ).to_numpy().tobytes())
+        for arr in [
+            targets.arr_agg,
+            targets.arr_scale,
+            targets.arr_targets,
+            targets.vec_weights,
+            self.arr_param_to_field,
+            self.vec_max,
+            self.vec_min,
+        ]:
+            hasher.update(np.ascontiguousarray(arr, dtype = float, ).tobytes())
+
+        build_models = (
+            getattr(self.build_models, "__module__", ""),
+            getattr(self.build_models, "__qualname__", repr(self.build_models)),
+        )
+        for x in [self.decimals_cache, self.year_0, build_models, sorted(self.dict_models_kwargs.items())]:
+            hasher.update(repr(x).encode())
+
+        out = hasher.hexdigest()[0:_FINGERPRINT_LENGTH]
+
+        return out
+
+
+
+    def get_best(self,
+    ) -> Tuple[np.ndarray, float]:
+        """Get the best cached candidate. Returns a tuple of the form
+
+            (vec_x, error)
+        """
+        if len(self.dict_cache) == 0:
+            raise RuntimeError(f"No candidates have been evaluated.")
+
+        key = min(self.dict_cache, key = self.dict_cache.get, )
+        out = (np.array(key), self.dict_cache.get(key))
+
+        return out
+
+
+
+    def run(self,
+        n_iterations: int = 10,
+        batch_size: int = 16,
+        alpha: float = 0.7,
+        n_elite: Union[int, None] = None,
+        seed: Union[int, None] = None,
+    ) -> pd.DataFrame:
+        """Run the calibration search. The first batch includes the base
+            inputs (all scalars 1, clipped to bounds). Returns the history of
+            evaluated candidates with iteration, parameter values, and
+            error.
+
+        Keyword Arguments
+        -----------------
+        n_iterations : int
+            Number of batches to evaluate
+        batch_size : int
+            Number of candidates in each batch
+        alpha : float
+            Smoothing applied when refitting the distribution (1 uses only
+            the new elite candidates)
+        n_elite : Union[int, None]
+            Number of best candidates used to refit the distribution. If
+            None, uses a quarter of batch_size
+        seed : Union[int, None]
+            Random seed
+        """
+        rng = np.random.default_rng(seed, )
+        n_elite = max(batch_size//4, 2) if (n_elite is None) else n_elite
+        vec_range = np.where(self.vec_max > self.vec_min, self.vec_max - self.vec_min, 1.0, )
+
+        # search in normalized space [0, 1]; start at the base inputs
+        vec_mu = np.clip((1.0 - self.vec_min)/vec_range, 0.0, 1.0, )
+        vec_sigma = np.full(len(self.parameters), 0.3, )
+        list_history = []
+
+        executor = (
+            cf.ProcessPoolExecutor(
+                max_workers = self.n_workers,
+                initializer = _initialize_worker,
+                initargs = (self.build_models, self.targets, self.dict_models_kwargs, self.year_0, ),
+            )
+            if self.n_workers > 1
+            else None
+        )
+
+        try:
+            for i in range(n_iterations):
+                arr_u = np.clip(rng.normal(vec_mu, vec_sigma, (batch_size, len(vec_mu)), ), 0.0, 1.0, )
+                if i == 0:
+                    arr_u[0] = vec_mu
+
+                arr_x = self.vec_min + arr_u*vec_range
+                vec_error = self.evaluate(arr_x, executor = executor, )
+
+                # refit to elite candidates
+                w_elite = np.argsort(vec_error, )[0:n_elite]
+                vec_mu = alpha*arr_u[w_elite].mean(axis = 0, ) + (1 - alpha)*vec_mu
+                vec_sigma = alpha*arr_u[w_elite].std(axis = 0, ) + (1 - alpha)*vec_sigma
+
+                df_iter = pd.DataFrame(arr_x, columns = self.parameters, )
+                df_iter.insert(0, _FIELD_ITERATION, i, )
+                df_iter[_FIELD_ERROR] = vec_error
+                list_history.append(df_iter)
+
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        df_out = pd.concat(list_history, axis = 0, ).reset_index(drop = True, )
+
+        return df_out
+
+
+
+    def _log_failure(self,
+        key: Tuple[float],
+        error: Exception,
+    ) -> None:
+        """Report a candidate that failed to run
+        """
+        msg = f"Calibration candidate {dict(zip(self.parameters, key))} failed: {error}"
+
+        if self.logger is None:
+            warnings.warn(msg)
+        else:
+            self.logger.error(msg, )
+
+        return None
+
+
+
+    def _get_cache_key(self,
+        vec_x: np.ndarray,
+    ) -> Tuple[float]:
+        """Get the cache key for a candidate
+        """
+        out = tuple(float(x) for x in np.round(vec_x, self.decimals_cache, ))
+
+        return out
+
+
+
+    def _write_cache(self,
+    ) -> None:
+        """Write the cache to self.path_cache (if specified) atomically
+        """
+        if self.path_cache is None:
+            return None
+
+        df_cache = pd.DataFrame(list(self.dict_cache.keys()), columns = self.parameters, )
+        df_cache[_FIELD_ERROR] = list(self.dict_cache.values())
+        df_cache[_FIELD_FINGERPRINT] = self.fingerprint
+
+        self.path_cache.parent.mkdir(parents = True, exist_ok = True, )
+        shs.write_csv_atomic(df_cache, self.path_cache, )
+
+        return None
+
+
+
+
+
+##########################
+#    WORKER FUNCTIONS    #
+##########################
+
+def _evaluate_worker(
+    df_input: pd.DataFrame,
+) -> np.ndarray:
+    """Run models on a candidate input table and return the (year, key)
+        array of model emissions
+    """
+    models = shs.get_worker_state("models")
+    targets = shs.get_worker_state("targets")
+
+    df_output = models(df_input, **shs.get_worker_state("dict_models_kwargs"), )
+    arr_out = targets.get_model_array(df_output, year_0 = shs.get_worker_state("year_0"), )
+
+    return arr_out
+
+
+
+def _initialize_worker(
+    build_models: Callable[[], Callable],
+    targets: CalibrationTargets,
+    dict_models_kwargs: dict,
+    year_0: int,
+) -> None:
+    """Initialize models and targets once per worker (see 
+        shared_support.initialize_worker())
+    """
+    shs.initialize_worker(
+        build_models,
+        {
+            "dict_models_kwargs": dict_models_kwargs,
+            "targets": targets,
+            "year_0": year_0,
+        },
+    )
+
+    return None
@@ -1,17 +1,37 @@
 
+import concurrent.futures as cf
+import hashlib
+import importlib.metadata
+import inspect
 import numpy as np
 import os, os.path
 import pandas as pd
 import pathlib
+import pickle
+import sisepuede
 import sisepuede.core.attribute_table as att
 import sisepuede.core.support_classes as sc
 import sisepuede.manager.sisepuede_examples as sxl
 import sisepuede.manager.sisepuede_file_structure as sfs
 import sisepuede.manager.sisepuede_models as sm
 import sisepuede.utilities._toolbox as sf
+import threading
+import warnings
 from numpy import arange
 from typing import *
 
+# support both `import utils.common_data_needs` and `import common_data_needs`
+try:
+    import utils.dtype_policy as dtp
+    import utils.gap_filling as gf
+    import utils.profiling as prf
+    import utils.shared_support as shs
+except ModuleNotFoundError:
+    import dtype_policy as dtp
+    import gap_filling as gf
+    import profiling as prf
+    import shared_support as shs
+
 
 
 
@@ -70,6 +90,196 @@ def get_file_structure(
 
 
 
+def _get_sisepuede_version(
+) -> str:
+    """Get the installed version of the sisepuede package
+    """
+    try:
+        out = importlib.metadata.version("sisepuede")
+    except importlib.metadata.PackageNotFoundError:
+        out = str(getattr(sisepuede, "__version__", "unknown"))
+
+    return out
+
+
+
+def _get_sisepuede_source_hash(
+    path_package: Union[pathlib.Path, None] = None,
+    globs: Union[List[str], None] = None,
+) -> str:
+    """Get a short hash of the contents of the SISEPUEDE attribute tables 
+        and configuration files. Used in the snapshot key so that editing 
+        any of these files rebuilds the snapshot instead of loading a stale
+        one.
+
+    Keyword Arguments
+    -----------------
+    path_package : Union[pathlib.Path, None]
+        Directory to search. If None, uses the installed sisepuede package
+    globs : Union[List[str], None]
+        Glob patterns (relative to path_package) of files to hash. If None,
+        uses _SNAPSHOT_SOURCE_GLOBS
+    """
+    path_package = (
+        pathlib.Path(sisepuede.__file__).parent 
+        if (path_package is None) 
+        else pathlib.Path(path_package)
+    )
+    globs = _SNAPSHOT_SOURCE_GLOBS if (globs is None) else globs
+
+    paths = sorted(
+        set(
+            x for pattern in globs for x in path_package.glob(pattern)
+            if x.is_file()
+        )
+    )
+
+    # include relative paths so that renaming a file changes the hash
+    hasher = hashlib.sha256()
+    for path in paths:
+        hasher.update(path.relative_to(path_package).as_posix().encode())
+        hasher.update(path.read_bytes())
+
+    out = hasher.hexdigest()[0:_SNAPSHOT_SOURCE_HASH_LENGTH]
+
+    return out
+
+
+
+def get_sisepuede_snapshot(
+    y0: int = 2015,
+    y1: int = 2070,
+    path_snapshots: Union[pathlib.Path, None] = None,
+    use_snapshot: bool = True,
+) -> Dict[str, Any]:
+    """Get the configured SISEPUEDE file structure, time period attribute 
+        table, model attributes, regions, and time periods. Loads from a 
+        serialized snapshot keyed by the sisepuede version, a hash of the
+        attribute and configuration file contents (see 
+        _get_sisepuede_source_hash()), and (y0, y1) if one exists; 
+        otherwise, builds using get_file_structure() and writes the snapshot
+        for later imports (e.g., in worker processes).
+
+        Returns a dictionary with keys
+
+        * "attribute_time_period"
+        * "file_structure"
+        * "model_attributes"
+        * "regions"
+        * "time_periods"
+
+    Keyword Arguments
+    -----------------
+    y0 : int
+        First year
+    y1 : int
+        Last year
+    path_snapshots : Union[pathlib.Path, None]
+        Directory storing snapshots. If None, uses _PATH_SNAPSHOTS
+    use_snapshot : bool
+        Set to False to always rebuild (the snapshot is still refreshed)
+    """
+    path_snapshots = _PATH_SNAPSHOTS if (path_snapshots is None) else pathlib.Path(path_snapshots)
+    path_snapshot = path_snapshots.joinpath(
+        f"sisepuede_snapshot_v{_SNAPSHOT_FORMAT_VERSION}_{_get_sisepuede_version()}_{_get_sisepuede_source_hash()}_{y0}_{y1}.pkl"
+    )
+
+    # try loading
+    if use_snapshot and path_snapshot.is_file():
+        try:
+            with open(path_snapshot, "rb") as fp:
+                dict_out = pickle.load(fp)
+
+            return dict_out
+
+        except Exception as e:
+            warnings.warn(f"Unable to load SISEPUEDE snapshot at {path_snapshot}: {e}. Rebuilding...")
+
+
+    ##  BUILD AND WRITE
+
+    file_struct, attribute_time_period = get_file_structure(y0 = y0, y1 = y1, )
+    model_attributes = file_struct.model_attributes
+
+    dict_out = {
+        "attribute_time_period": attribute_time_period,
+        "file_structure": file_struct,
+        "model_attributes": model_attributes,
+        "regions": sc.Regions(model_attributes, ),
+        "time_periods": sc.TimePeriods(model_attributes, ),
+    }
+
+    # write to a temporary file and move so that parallel workers never read
+    #  a partially written snapshot
+    try:
+        path_snapshots.mkdir(parents = True, exist_ok = True, )
+        with shs.atomic_write(path_snapshot, ) as path_tmp:
+            with open(path_tmp, "wb") as fp:
+                pickle.dump(dict_out, fp, protocol = pickle.HIGHEST_PROTOCOL, )
+
+    except Exception as e:
+        warnings.warn(f"Unable to write SISEPUEDE snapshot to {path_snapshot}: {e}")
+
+    return dict_out
+
+
+
+def get_sisepuede_examples(
+) -> sxl.SISEPUEDEExamples:
+    """Get the SISEPUEDEExamples object, building it on first use. Shared 
+        by all callers in the process.
+    """
+    with _LOCK_SISEPUEDE_ELEMENTS:
+        out = _DICT_SISEPUEDE_ELEMENTS.get("examples")
+        if out is None:
+            out = sxl.SISEPUEDEExamples()
+            _DICT_SISEPUEDE_ELEMENTS.update({"examples": out, })
+
+    return out
+
+
+
+def get_sisepuede_models(
+) -> sm.SISEPUEDEModels:
+    """Get the SISEPUEDEModels object, building it (and initializing Julia)
+        on first use. Shared by all callers in the process; only callers 
+        that run models pay the start-up cost.
+    """
+    with _LOCK_SISEPUEDE_ELEMENTS:
+        out = _DICT_SISEPUEDE_ELEMENTS.get("models")
+        if out is None:
+            out = sm.SISEPUEDEModels(
+                _SISEPUEDE_MODEL_ATTRIBUTES,
+                allow_electricity_run = True,
+                fp_julia = _SISEPUEDE_FILE_STRUCTURE.dir_jl,
+                fp_nemomod_reference_files = _SISEPUEDE_FILE_STRUCTURE.dir_ref_nemo,
+                initialize_julia = True, 
+            )
+            _DICT_SISEPUEDE_ELEMENTS.update({"models": out, })
+
+    return out
+
+
+
+def __getattr__(
+    name: str,
+) -> Any:
+    """Support module-level access to lazily built elements (e.g., 
+        `common_data_needs._SISEPUEDE_MODELS`)
+    """
+    dict_getters = {
+        "_SISEPUEDE_EXAMPLES": get_sisepuede_examples,
+        "_SISEPUEDE_MODELS": get_sisepuede_models,
+    }
+
+    func = dict_getters.get(name)
+    if func is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return func()
+
+
+
     
 # set up some paths
 _PATH_CUR = pathlib.Path(__file__).parents[0]
@@ -78,21 +288,32 @@ _PATH_INPUTS = _PATH_PROJ.joinpath("input_data")
 _PATH_OUTPUTS = _PATH_PROJ.joinpath("output_data")
 _PATH_BASE_RAW_DATA = _PATH_INPUTS.joinpath("sisepuede_raw_global_inputs_uganda.csv")
 
-# model attributes and associated support classes
-_SISEPUEDE_EXAMPLES = sxl.SISEPUEDEExamples()
-_SISEPUEDE_FILE_STRUCTURE, _ATTRIBUTE_TABLE_TIME_PERIOD = get_file_structure()
-_SISEPUEDE_MODEL_ATTRIBUTES = _SISEPUEDE_FILE_STRUCTURE.model_attributes
-_SISEPUEDE_REGIONS = sc.Regions(_SISEPUEDE_MODEL_ATTRIBUTES, )
-_SISEPUEDE_TIME_PERIODS = sc.TimePeriods(_SISEPUEDE_MODEL_ATTRIBUTES, )
-
-# setup models
-_SISEPUEDE_MODELS = sm.SISEPUEDEModels(
-    _SISEPUEDE_MODEL_ATTRIBUTES,
-    allow_electricity_run = True,
-    fp_julia = _SISEPUEDE_FILE_STRUCTURE.dir_jl,
-    fp_nemomod_reference_files = _SISEPUEDE_FILE_STRUCTURE.dir_ref_nemo,
-    initialize_julia = True, 
+# snapshots of model attributes; set SSP_SNAPSHOT_DIR to override location
+_PATH_SNAPSHOTS = pathlib.Path(
+    os.environ.get(
+        "SSP_SNAPSHOT_DIR",
+        pathlib.Path.home().joinpath(".cache", "ssp_uganda_data", "snapshots"),
+    )
 )
+_SNAPSHOT_FORMAT_VERSION = 1
+_SNAPSHOT_SOURCE_GLOBS = [
+    "attributes/**/*.csv",
+    "**/*.config",
+]
+_SNAPSHOT_SOURCE_HASH_LENGTH = 16
+
+# model attributes and associated support classes
+_SISEPUEDE_SNAPSHOT = get_sisepuede_snapshot()
+_ATTRIBUTE_TABLE_TIME_PERIOD = _SISEPUEDE_SNAPSHOT.get("attribute_time_period")
+_SISEPUEDE_FILE_STRUCTURE = _SISEPUEDE_SNAPSHOT.get("file_structure")
+_SISEPUEDE_MODEL_ATTRIBUTES = _SISEPUEDE_SNAPSHOT.get("model_attributes")
+_SISEPUEDE_REGIONS = _SISEPUEDE_SNAPSHOT.get("regions")
+_SISEPUEDE_TIME_PERIODS = _SISEPUEDE_SNAPSHOT.get("time_periods")
+
+# examples and models (which initializes Julia) are expensive, so they are 
+#  built on first use; see get_sisepuede_examples() and get_sisepuede_models()
+_DICT_SISEPUEDE_ELEMENTS = {}
+_LOCK_SISEPUEDE_ELEMENTS = threading.Lock()
 
 
 
@@ -105,20 +326,35 @@ _SISEPUEDE_MODELS = sm.SISEPUEDEModels(
 ##########################
 
 class MissingValuesError(Exception):
-    pass
+    """Raised when required values are missing. The offending DataFrame,
+        if any, is stored in the `df` property for debugging.
+    """
+    def __init__(self,
+        msg: str,
+        df: Union[pd.DataFrame, None] = None,
+    ) -> None:
+        super().__init__(msg)
+        self.df = df
 
     
 def _build_from_outputs(
     years_required: tuple, 
+    compact: bool = False,
+    df_examples: Union[pd.DataFrame, None] = None,
+    df_overwrite_init: Union[pd.DataFrame, None] = None,
+    dict_fill_methods: Union[Dict[str, str], None] = None,
     extension_read: str = "csv",
     fns_exclude: Union[List[str], None] = None,
     force_complete_build: bool = False,
     merge_type: str = "outer",
+    path_base_raw_data: pathlib.Path = _PATH_BASE_RAW_DATA,
     path_csvs: pathlib.Path = _PATH_OUTPUTS,
     print_info: bool = False,
+    profiler: Union[prf.StageProfiler, None] = None,
+    return_imputation_log: bool = False,
     stop_on_error: bool = False,
     **kwargs
-) -> pd.DataFrame:
+) -> Union[pd.DataFrame, Tuple[pd.DataFrame, pd.DataFrame]]:
     """Build an input table for from data outputs stored in the output
         data repo.
 
@@ -130,6 +366,24 @@ def _build_from_outputs(
         
     Keyword Arguments
     -----------------
+    compact : bool
+        Return a compact DataFrame (see dtype_policy.compact_df)? Use 
+        dtype_policy.expand_df() or run_models() to upcast. The build is 
+        compacted after merging, gap filling, and interpolation (which run
+        at float64), so expanding the compact build returns the float64 
+        build exactly.
+    df_examples : Union[pd.DataFrame, None]
+        Optional SISEPUEDE example input DataFrame; if None, reads from 
+        SISEPUEDEExamples
+    df_overwrite_init : Union[pd.DataFrame, None]
+        Optional DataFrame (with year) of values read from shared sources;
+        files in path_csvs are merged onto it
+    dict_fill_methods : Union[Dict[str, str], None]
+        Optional dictionary mapping fields or field prefixes to gap filling 
+        methods ("flat", "growth_rate", "linear", or "profile"; see 
+        gap_filling.fill_gaps). Fields that are not specified are filled 
+        linearly. The "profile" method scales SISEPUEDE example inputs to 
+        the nearest observation.
     extension_read : str
         Default extension to read
     fns_exclude : Union[List[str], None]
@@ -138,10 +392,22 @@ def _build_from_outputs(
         If any fields are missing, pull from examples df?
     merge_type : str
         Merge type to pass to pd.merge as 'how = merge_type'
+    path_base_raw_data : pathlib.Path
+        Path to the base raw input CSV (see get_raw_ssp_inputs)
     path_csvs : pathlib.Path
         Directory storing CSVs
     print_info : bool
         Print info while iterating?
+    profiler : Union[prf.StageProfiler, None]
+        Optional StageProfiler used to record time, memory, and shapes for
+        each stage of the build (file reads, merges, fills, etc.)
+    return_imputation_log : bool
+        If True, returns a tuple of the form
+
+            (df_out, df_imputation_log)
+
+        where df_imputation_log gives the year, field, method, and value of
+        each imputed cell
     stop_on_error : bool
         Stop if there's a read error? If False, skips files that produce 
         errors.
@@ -149,16 +415,26 @@ def _build_from_outputs(
         Passed to pd.read_csv()
     """
     # init
-    global _DF_OVERWRITE
-    global _DF_CUR
-    global _PATHS_ITER
-    _DF_OVERWRITE = None
-    _DF_CUR = None
-    _PATHS_ITER = []
+    profiler = prf.get_profiler(profiler, )
     
     # get raw inputs
-    df_examples = _SISEPUEDE_EXAMPLES("input_data_frame")
-    df_base = get_raw_ssp_inputs()
+    df_examples = (
+        get_sisepuede_examples()("input_data_frame")
+        if df_examples is None
+        else df_examples
+    )
+    df_base = get_raw_ssp_inputs(
+        path = path_base_raw_data, 
+        profiler = profiler, 
+    )
+
+    # profiles for gap filling and imputation logs
+    df_profile = (
+        _SISEPUEDE_TIME_PERIODS
+        .tps_to_years(df_examples, )
+        .drop(columns = _SISEPUEDE_TIME_PERIODS.field_time_period, )
+    )
+    dfs_imputation_log = []
 
     
     ##  DEAL WITH MISSING FIELDS
@@ -174,26 +450,143 @@ def _build_from_outputs(
             raise RuntimeError(f"Cannot proceed: fields {fields_missing} not found.")
 
         # add in values from examples
+        with profiler.span(
+            "fill_missing_fields_from_examples", 
+            category = "fill", 
+            obj_in = df_base,
+            n_fields = len(fields_missing),
+        ) as rec:
+            # raw inputs are indexed by year, so merge using example profiles
+            df_base = (
+                pd.merge(
+                    df_base,
+                    df_profile
+                    .get(
+                        [_SISEPUEDE_TIME_PERIODS.field_year] + fields_missing
+                    ),
+                    how = "left",
+                )
+                .reset_index(drop = True)
+            )
+
+            df_base, df_log = gf.fill_gaps(
+                df_base,
+                _SISEPUEDE_TIME_PERIODS.field_year,
+                dict_methods = dict_fill_methods,
+                df_profile = df_profile,
+            )
+            dfs_imputation_log.append(df_log)
+            rec.set_shape(df_base, )
+        
+
+    
+    # check for available files
+    df_overwrite = _read_output_directory(
+        path_csvs,
+        df_overwrite = df_overwrite_init,
+        extension_read = extension_read,
+        fns_exclude = fns_exclude,
+        merge_type = merge_type,
+        print_info = print_info,
+        profiler = profiler,
+        stop_on_error = stop_on_error,
+        **kwargs
+    )
+    if df_overwrite is None:
+        raise MissingValuesError(f"No {extension_read} files found in {path_csvs}.")
+
+
+    ##  CHECKS AND FINAL OVERWRITE
+
+    df_overwrite = df_overwrite.dropna()
+    
+    # check that all needed years are included
+    set_years_req = set(range(years_required[0], years_required[1] + 1))
+    proceed = set_years_req.issubset(set(df_overwrite[_SISEPUEDE_TIME_PERIODS.field_year]))
+    if not proceed:
+        raise MissingValuesError(
+            f"Years missing from the dataframe. Check the dataframe at MissingValuesError.df",
+            df = df_overwrite,
+        )
+
+    # merge df_base to set of years available and fill
+    with profiler.span("fill_years", category = "fill", obj_in = df_base, ) as rec:
         df_base = (
             pd.merge(
+                df_overwrite[
+                    df_overwrite[_SISEPUEDE_TIME_PERIODS.field_year]
+                    .isin(set_years_req)
+                ][[_SISEPUEDE_TIME_PERIODS.field_year]],
                 df_base,
-                df_examples
-                .get(
-                    [_SISEPUEDE_MODEL_ATTRIBUTES.dim_time_period] + fields_missing
-                ),
                 how = "left",
             )
-            .interpolate()
-            .bfill()
-            .reset_index(drop = True)
         )
+
+        # only fields with gaps are filled
+        df_base, df_log = gf.fill_gaps(
+            df_base,
+            _SISEPUEDE_TIME_PERIODS.field_year,
+            dict_methods = dict_fill_methods,
+            df_profile = df_profile,
+        )
+        dfs_imputation_log.append(df_log)
+        rec.set_shape(df_base, )
+    
+    # overwrite fields in base to prouce output
+    with profiler.span("match_df_to_target_df", category = "merge", obj_in = df_base, ) as rec:
+        df_out = sf.match_df_to_target_df(
+            df_base,
+            df_overwrite,
+            [
+                _SISEPUEDE_TIME_PERIODS.field_year,
+            ],
+            overwrite_only = False,
+        )
+        rec.set_shape(df_out, )
+    
+    with profiler.span("years_to_tps", category = "transform", obj_in = df_out, ) as rec:
+        df_out = (
+            _SISEPUEDE_TIME_PERIODS
+            .years_to_tps(df_out)
+            .drop(
+                columns = _SISEPUEDE_TIME_PERIODS.field_year,
+            )
+        )
+        rec.set_shape(df_out, )
+
+    if _SISEPUEDE_REGIONS.key in df_out.columns:
+        df_out.drop(columns = _SISEPUEDE_REGIONS.key, inplace = True, )
         
+    if compact:
+        df_out = _compact_df(df_out, print_info = print_info, )
 
+    if return_imputation_log:
+        df_imputation_log = pd.concat(dfs_imputation_log, axis = 0, ).reset_index(drop = True, )
+        return df_out, df_imputation_log
     
-    shp = None
+    
+    return df_out
+
+
+
+def _read_output_directory(
+    path_csvs: pathlib.Path,
+    df_overwrite: Union[pd.DataFrame, None] = None,
+    extension_read: str = "csv",
+    fns_exclude: Union[List[str], None] = None,
+    merge_type: str = "outer",
+    print_info: bool = False,
+    profiler: Union[prf.StageProfiler, None] = None,
+    stop_on_error: bool = False,
+    **kwargs
+) -> Union[pd.DataFrame, None]:
+    """Read and merge all files in a directory of output CSVs. Returns None
+        if no files are read. See _build_from_outputs for keyword arguments; 
+        files are merged onto df_overwrite if specified. **kwargs are passed
+        to pd.read_csv().
+    """
+    profiler = prf.get_profiler(profiler, )
 
-    # check for available files
-    df_overwrite = None
     for path in path_csvs.iterdir():
 
         # skip?
@@ -206,10 +599,12 @@ def _build_from_outputs(
 
         # try reading the file
         try:
-            df_cur = (
-                pd.read_csv(path, **kwargs)
-                .drop_duplicates()
-            )
+            with profiler.span("read_csv", category = "read", path = str(path), ) as rec:
+                df_cur = (
+                    pd.read_csv(path, **kwargs)
+                    .drop_duplicates()
+                )
+                rec.set_shape(df_cur, )
             
         except Exception as e:
             msg = f"Error reading {extension_read} file at {path}: {e}"
@@ -219,80 +614,36 @@ def _build_from_outputs(
             warnings.warn(msg)
             continue
 
-        shp = df_cur.shape
-        
         # if successful, update the df
-        df_overwrite = (
-            df_cur
-            if df_overwrite is None
-            else pd.merge(
-                df_overwrite,
-                df_cur,
-                how = merge_type,
+        with profiler.span(
+            "merge", 
+            category = "merge", 
+            obj_in = df_overwrite, 
+            path = str(path),
+        ) as rec:
+            df_overwrite = (
+                df_cur
+                if df_overwrite is None
+                else pd.merge(
+                    df_overwrite,
+                    df_cur,
+                    how = merge_type,
+                )
             )
-        )
+            rec.set_shape(df_overwrite, )
 
-        _PATHS_ITER.append(path)
         if print_info: print(f"Shape after path {path}: {df_overwrite.shape}\n")
 
-
-    ##  CHECKS AND FINAL OVERWRITE
-
-    df_overwrite = df_overwrite.dropna()
-    
-    # check that all needed years are included
-    set_years_req = set(range(years_required[0], years_required[1] + 1))
-    proceed = set_years_req.issubset(set(df_overwrite[_SISEPUEDE_TIME_PERIODS.field_year]))
-    if not proceed:
-        _DF_OVERWRITE = df_overwrite
-        raise MissingValuesError(f"Years missing from the dataframe. Check the dataframe at _DF_OVERWRITE")
-
-    # merge df_base to set of years available and fill
-    df_base = (
-        pd.merge(
-            df_overwrite[
-                df_overwrite[_SISEPUEDE_TIME_PERIODS.field_year]
-                .isin(set_years_req)
-            ][[_SISEPUEDE_TIME_PERIODS.field_year]],
-            df_base,
-            how = "left",
-        )
-        .interpolate()
-        .bfill()
-        .ffill()
-    )
-    
-    # overwrite fields in base to prouce output
-    df_out = sf.match_df_to_target_df(
-        df_base,
-        df_overwrite,
-        [
-            _SISEPUEDE_TIME_PERIODS.field_year,
-        ],
-        overwrite_only = False,
-    )
-    
-    df_out = (
-        _SISEPUEDE_TIME_PERIODS
-        .years_to_tps(df_out)
-        .drop(
-            columns = _SISEPUEDE_TIME_PERIODS.field_year,
-        )
-    )
-
-    if _SISEPUEDE_REGIONS.key in df_out.columns:
-        df_out.drop(columns = _SISEPUEDE_REGIONS.key, inplace = True, )
-        
-    
-    
-    return df_out
+    return df_overwrite
 
 
 
 def get_files_from_matchstr(
     matchstr: str,
+    compact: bool = False,
 ) -> pd.DataFrame:
-    """Read output files that start with matchstr
+    """Read output files that start with matchstr. Set compact = True to
+        return a compact DataFrame (see dtype_policy.compact_df).
     """
     dfs_read = [
         x for x in sorted(os.listdir(_PATH_OUTPUTS))
@@ -312,17 +663,39 @@ def get_files_from_matchstr(
             else pd.merge(df_cur, df_data, how = "inner", )
         )
 
+    if compact and (df_data is not None):
+        df_data = _compact_df(df_data, )
+
     return df_data
 
 
 
 
 def get_raw_ssp_inputs(
+    compact: bool = False,
+    path: pathlib.Path = _PATH_BASE_RAW_DATA,
+    profiler: Union[prf.StageProfiler, None] = None,
 ) -> pd.DataFrame:
     """Retrieve the base, raw Uganda inputs for SISEPUEDE,
         which are composed of the V0 database. 
+
+    Keyword Arguments
+    -----------------
+    compact : bool
+        Return a compact DataFrame (see dtype_policy.compact_df)?
+    path : pathlib.Path
+        Path to the raw inputs CSV
+    profiler : Union[prf.StageProfiler, None]
+        Optional StageProfiler used to record the read
     """
-    df = pd.read_csv(_PATH_BASE_RAW_DATA, )
+    profiler = prf.get_profiler(profiler, )
+    with profiler.span(
+        "read_raw_ssp_inputs", 
+        category = "read", 
+        path = str(path),
+    ) as rec:
+        df = pd.read_csv(path, )
+        rec.set_shape(df, )
 
     if _SISEPUEDE_TIME_PERIODS.field_year not in df.columns:
         df = (
@@ -330,11 +703,31 @@ def get_raw_ssp_inputs(
             .tps_to_years(df, )
             .drop(columns = _SISEPUEDE_TIME_PERIODS.field_time_period, )
         )
+
+    if compact:
+        df = _compact_df(df, )
     
     return df
 
 
 
+def get_year_0(
+) -> int:
+    """Get the year of time period 0 from the time period attribute table
+        set up in get_file_structure()
+    """
+    df = _ATTRIBUTE_TABLE_TIME_PERIOD.table
+    vec_year = df.loc[
+        df[_SISEPUEDE_TIME_PERIODS.field_time_period] == 0, 
+        _SISEPUEDE_TIME_PERIODS.field_year
+    ]
+
+    out = int(vec_year.iloc[0])
+
+    return out
+
+
+
 def mix_from_base_year_future(
     df: pd.DataFrame,
     fields_ind: List[str],
@@ -426,20 +819,206 @@ def mix_from_base_year_future(
 
 
 
+def build_inputs_multi_region(
+    dict_regions: Dict[str, Tuple[pathlib.Path, pathlib.Path]],
+    years_required: tuple,
+    compact: bool = False,
+    n_workers: Union[int, None] = None,
+    path_csvs_shared: Union[pathlib.Path, None] = None,
+    profiler: Union[prf.StageProfiler, None] = None,
+    return_imputation_log: bool = False,
+    **kwargs,
+) -> Union[pd.DataFrame, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """Build a single input table for multiple regions. Shared sources (the
+        SISEPUEDE examples and any shared output CSVs) are read once, and 
+        each region is built in parallel using _build_from_outputs(). The 
+        output is sorted by region and time period and can be passed to 
+        SISEPUEDE(regions = list(dict_regions.keys()), ...).
+
+    Function Arguments
+    ------------------
+    dict_regions : Dict[str, Tuple[pathlib.Path, pathlib.Path]]
+        Dictionary mapping each region name to a tuple of the form
+
+            (path_csvs, path_base_raw_data)
+
+        giving the region's output directory and base raw input CSV
+    years_required : Tuple[int, int]
+        Tuple giving years that are required to run the analysis
+
+    Keyword Arguments
+    -----------------
+    compact : bool
+        Return a compact DataFrame (see dtype_policy.compact_df)? Regions
+        are built at float64 and compacted after they are combined.
+    n_workers : Union[int, None]
+        Number of threads used to build regions; if None, uses one per 
+        region (up to os.cpu_count())
+    path_csvs_shared : Union[pathlib.Path, None]
+        Optional directory of output CSVs shared by all regions. Shared
+        files should not contain fields that are also in region files.
+    profiler : Union[prf.StageProfiler, None]
+        Optional StageProfiler used to record the build
+    return_imputation_log : bool
+        Also return the imputation log (with a region field)? See
+        _build_from_outputs
+    **kwargs :
+        Passed to _build_from_outputs() (e.g., fns_exclude, 
+        force_complete_build, dict_fill_methods). Read options and 
+        pd.read_csv() kwargs are also used to read shared sources, so 
+        shared and region files are read the same way.
+    """
+    profiler = prf.get_profiler(profiler, )
+    field_region = _SISEPUEDE_REGIONS.key
+    n_workers = (
+        min(len(dict_regions), os.cpu_count() or 1)
+        if n_workers is None
+        else n_workers
+    )
+
+    # shared sources
+    df_examples = get_sisepuede_examples()("input_data_frame")
+    df_overwrite_init = None
+    if path_csvs_shared is not None:
+        with profiler.span("read_shared_sources", category = "read", path = str(path_csvs_shared), ) as rec:
+            # pass read options and pd.read_csv() kwargs, as in _build_from_outputs
+            params_build_only = (
+                set(inspect.signature(_build_from_outputs).parameters)
+                - set(inspect.signature(_read_output_directory).parameters)
+            )
+            df_overwrite_init = _read_output_directory(
+                pathlib.Path(path_csvs_shared), 
+                profiler = profiler,
+                **dict(
+                    (k, v) for k, v in kwargs.items() 
+                    if k not in params_build_only
+                ),
+            )
+            rec.set_shape(df_overwrite_init, )
+
+    def build_region(region: str, ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        path_csvs, path_base_raw_data = dict_regions.get(region)
+        with profiler.span("build_region", category = "region", region = region, ):
+            df_region, df_log = _build_from_outputs(
+                years_required,
+                df_examples = df_examples,
+                df_overwrite_init = df_overwrite_init,
+                path_base_raw_data = pathlib.Path(path_base_raw_data),
+                path_csvs = pathlib.Path(path_csvs),
+                profiler = profiler,
+                return_imputation_log = True,
+                **kwargs,
+            )
+
+        df_region.insert(0, field_region, region, )
+        df_log.insert(0, field_region, region, )
+
+        return df_region, df_log
+
+
+    ##  BUILD REGIONS IN PARALLEL AND COMBINE
+
+    regions = list(dict_regions.keys())
+    with cf.ThreadPoolExecutor(max_workers = max(n_workers, 1), ) as executor:
+        list_out = list(executor.map(build_region, regions, ))
+
+    df_out = (
+        pd.concat([x[0] for x in list_out], axis = 0, )
+        .sort_values(by = [field_region, _SISEPUEDE_TIME_PERIODS.field_time_period], )
+        .reset_index(drop = True, )
+    )
+
+    if compact:
+        df_out = _compact_df(df_out, )
+
+    if return_imputation_log:
+        df_imputation_log = pd.concat([x[1] for x in list_out], axis = 0, ).reset_index(drop = True, )
+        return df_out, df_imputation_log
+
+    return df_out
+
+
+
+def _compact_df(
+    df: pd.DataFrame,
+    print_info: bool = False,
+    **kwargs,
+) -> pd.DataFrame:
+    """Compact a DataFrame using dtype_policy.compact_df(), optionally
+        printing the bytes saved. **kwargs are passed to compact_df().
+    """
+    df_out = dtp.compact_df(df, **kwargs, )
+
+    if print_info:
+        report = dtp.get_compaction_report(df_out, )
+        print(f"Compacted DataFrame from {report['bytes_before']/1e6:.2f} MB to {report['bytes_after']/1e6:.2f} MB ({report['bytes_saved']/1e6:.2f} MB saved)")
+
+    return df_out
+
+
+
 def _read_output_csv(
     nm: str,
+    compact: bool = False,
     **kwargs,
 ) -> Union[pd.DataFrame, None]:
-    """Read an output CSV file quickly. **kwargs are passed to 
-        pd.read_csv()
+    """Read an output CSV file quickly. Set compact = True to return a 
+        compact DataFrame (see dtype_policy.compact_df). **kwargs are 
+        passed to pd.read_csv()
     """
     path_try = pathlib.Path(_PATH_OUTPUTS.joinpath(f"{nm}.csv"))
     if not path_try.is_file():
         return None
 
     df_out = pd.read_csv(path_try, **kwargs, )
+    if compact:
+        df_out = _compact_df(df_out, )
     
     return df_out
+
+
+
+def read_run_output(
+    path_run: Union[str, pathlib.Path],
+    compact: bool = False,
+    merge_attribute_primary: bool = False,
+    **kwargs,
+) -> pd.DataFrame:
+    """Read the output database from a SISEPUEDE run directory (e.g., 
+        ssp_modeling/ssp_run_output/sisepuede_run_...), which stores outputs
+        in a CSV with the same name as the directory.
+
+    Function Arguments
+    ------------------
+    path_run : Union[str, pathlib.Path]
+        Path to the run directory
+
+    Keyword Arguments
+    -----------------
+    compact : bool
+        Return a compact DataFrame (see dtype_policy.compact_df)?
+    merge_attribute_primary : bool
+        Merge design, future, and strategy ids from ATTRIBUTE_PRIMARY.csv?
+    **kwargs :
+        Passed to pd.read_csv()
+    """
+    path_run = pathlib.Path(path_run)
+    path_read = path_run.joinpath(f"{path_run.parts[-1]}.csv")
+    if not path_read.is_file():
+        raise RuntimeError(f"Run output file {path_read} not found.")
+
+    df_out = pd.read_csv(path_read, **kwargs, )
+
+    # add ids?
+    path_attr = path_run.joinpath("ATTRIBUTE_PRIMARY.csv")
+    if merge_attribute_primary and path_attr.is_file():
+        df_attr = pd.read_csv(path_attr, )
+        df_out = pd.merge(df_attr, df_out, how = "right", )
+
+    if compact:
+        df_out = _compact_df(df_out, )
+
+    return df_out
     
         
     
@@ -451,7 +1030,7 @@ def _setup_sisepuede_elements(
 
     dict_out = {
         "model_attributes": _SISEPUEDE_MODEL_ATTRIBUTES,
-        "models": _SISEPUEDE_MODELS,
+        "models": get_sisepuede_models(),
         "regions": _SISEPUEDE_REGIONS,
         "time_periods": _SISEPUEDE_TIME_PERIODS,
     }
@@ -460,6 +1039,45 @@ def _setup_sisepuede_elements(
 
 
 
+def run_models(
+    df_input: pd.DataFrame,
+    models: Union[sm.SISEPUEDEModels, None] = None,
+    profiler: Union[prf.StageProfiler, None] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Run SISEPUEDE models on an input DataFrame, recording the run in
+        an optional profiler.
+
+    Function Arguments
+    ------------------
+    df_input : pd.DataFrame
+        Input DataFrame to run. Compact DataFrames (see dtype_policy) are 
+        upcast before running.
+
+    Keyword Arguments
+    -----------------
+    models : Union[sm.SISEPUEDEModels, None]
+        Optional SISEPUEDEModels object to use; if None, uses the module 
+        level models
+    profiler : Union[prf.StageProfiler, None]
+        Optional StageProfiler used to record the run
+    **kwargs :
+        Passed to SISEPUEDEModels.__call__()
+    """
+    models = get_sisepuede_models() if (models is None) else models
+    profiler = prf.get_profiler(profiler, )
+
+    # SISEPUEDE expects 64-bit types
+    df_input = dtp.expand_df(df_input, )
+
+    with profiler.span("run_models", category = "model", obj_in = df_input, ) as rec:
+        df_out = models(df_input, **kwargs, )
+        rec.set_shape(df_out, )
+
+    return df_out
+
+
+
 def spawn_years_space_df(
     year_range: Tuple[int, int],
 ) -> pd.DataFrame:
@@ -0,0 +1,271 @@
+"""Compact dtype policy for wide SISEPUEDE input and output frames. Value
+    fields are downcast to float32 only if they round-trip losslessly (see
+    compact_df()), ID fields are stored as small integers, and label fields
+    (e.g., region or strategy) are stored as categoricals. Use expand_df()
+    to restore 64-bit types before passing data to SISEPUEDE.
+"""
+import numpy as np
+import pandas as pd
+from typing import *
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+# key in DataFrame.attrs used to store the compaction report
+_ATTR_COMPACTION_REPORT = "compaction_report"
+
+# default label fields to store as categoricals
+_FIELDS_CATEGORICAL = [
+    "region",
+    "strategy",
+    "strategy_code",
+    "transformation_specification",
+]
+
+# default id fields to store as small integers
+_FIELDS_INTEGER = [
+    "design_id",
+    "future_id",
+    "primary_id",
+    "strategy_id",
+    "time_period",
+    "year",
+]
+
+# default number of significant digits float values must round-trip to
+_DIGITS_DEFAULT = 7
+
+
+
+
+
+##########################
+#    DEFINE FUNCTIONS    #
+##########################
+
+def compact_df(
+    df: pd.DataFrame,
+    dict_digits_by_field: Union[Dict[str, int], None] = None,
+    digits: int = _DIGITS_DEFAULT,
+    fields_categorical: Union[List[str], None] = None,
+    fields_integer: Union[List[str], None] = None,
+) -> pd.DataFrame:
+    """Downcast a wide DataFrame to a compact set of dtypes. A report of
+        the fields converted and the bytes saved is stored in
+        df.attrs["compaction_report"] (see get_compaction_report()).
+
+        A float64 field is stored as float32 only if every value has at
+        most `digits` significant digits and is recovered exactly by
+        rounding its float32 value to `digits` significant digits (which
+        expand_df() does). Fields with more precision (e.g., computed
+        values) stay float64, so compaction never changes values.
+
+    Function Arguments
+    ------------------
+    df : pd.DataFrame
+        DataFrame to compact
+
+    Keyword Arguments
+    -----------------
+    dict_digits_by_field : Union[Dict[str, int], None]
+        Optional dictionary mapping fields to a number of significant
+        digits that overrides digits. Set a value < 1 to keep a field at
+        float64.
+    digits : int
+        Default number of significant digits (at most 7, the precision of
+        float32)
+    fields_categorical : Union[List[str], None]
+        Label fields to store as categoricals. If None, defaults to
+        _FIELDS_CATEGORICAL
+    fields_integer : Union[List[str], None]
+        ID fields to store as small integers. If None, defaults to
+        _FIELDS_INTEGER
+    """
+    fields_categorical = _FIELDS_CATEGORICAL if (fields_categorical is None) else fields_categorical
+    fields_integer = _FIELDS_INTEGER if (fields_integer is None) else fields_integer
+    dict_digits_by_field = {} if not isinstance(dict_digits_by_field, dict) else dict_digits_by_field
+
+    bytes_0 = int(df.memory_usage(deep = True, ).sum())
+    df_out = df.copy()
+
+
+    ##  CATEGORICALS AND INTEGERS
+
+    fields_cat = [
+        x for x in fields_categorical
+        if (x in df_out.columns) and not isinstance(df_out[x].dtype, pd.CategoricalDtype)
+    ]
+    for field in fields_cat:
+        df_out[field] = df_out[field].astype("category")
+
+    fields_int = [
+        x for x in fields_integer
+        if (x in df_out.columns) and pd.api.types.is_integer_dtype(df_out[x])
+    ]
+    for field in fields_int:
+        df_out[field] = pd.to_numeric(df_out[field], downcast = "integer", )
+
+
+    ##  FLOATS -- CHECK ROUND TRIPS FOR ALL FIELDS AT ONCE
+
+    fields_float = [
+        x for x in df_out.columns
+        if df_out[x].dtype == np.float64
+    ]
+    fields_float32 = []
+    dict_digits = {}
+
+    if len(fields_float) > 0:
+        arr = df_out[fields_float].to_numpy(dtype = np.float64, )
+        vec_digits = np.array(
+            [min(dict_digits_by_field.get(x, digits), _DIGITS_DEFAULT) for x in fields_float],
+            dtype = int,
+        )
+        with np.errstate(over = "ignore", invalid = "ignore", ):
+            arr_32 = arr.astype(np.float32)
+
+        arr_digits = np.broadcast_to(np.maximum(vec_digits, 1), arr.shape, )
+        arr_ok = (
+            (round_significant(arr, arr_digits, ) == arr)
+            & (round_significant(arr_32.astype(np.float64), arr_digits, ) == arr)
+        )
+        arr_ok |= np.isnan(arr)
+        vec_pass = arr_ok.all(axis = 0) & (vec_digits >= 1)
+
+        fields_float32 = [x for x, passes in zip(fields_float, vec_pass) if passes]
+        dict_digits = dict(
+            (x, int(d)) for x, d, passes in zip(fields_float, vec_digits, vec_pass)
+            if passes
+        )
+        if len(fields_float32) > 0:
+            df_out[fields_float32] = arr_32[:, vec_pass]
+
+
+    ##  BUILD REPORT
+
+    bytes_1 = int(df_out.memory_usage(deep = True, ).sum())
+    df_out.attrs[_ATTR_COMPACTION_REPORT] = {
+        "bytes_after": bytes_1,
+        "bytes_before": bytes_0,
+        "bytes_saved": bytes_0 - bytes_1,
+        "dict_digits": dict_digits,
+        "fields_categorical": fields_cat,
+        "fields_float32": fields_float32,
+        "fields_float64": [x for x in fields_float if x not in fields_float32],
+        "fields_integer": fields_int,
+    }
+
+    return df_out
+
+
+
+def expand_df(
+    df: pd.DataFrame,
+    digits: int = _DIGITS_DEFAULT,
+) -> pd.DataFrame:
+    """Upcast a compacted DataFrame to 64-bit floats and integers and
+        convert categoricals back to their category dtype. Use before
+        passing data to SISEPUEDE. Returns the input if it is not compact.
+
+        float32 fields are rounded to the number of significant digits
+        stored in the compaction report (or `digits` for fields that are
+        not in the report, e.g., after a merge), which restores the
+        original float64 values of fields compacted by compact_df().
+    """
+    if not is_compact(df):
+        return df
+
+    df_out = df.copy()
+    dict_astype = {}
+
+    report = get_compaction_report(df, )
+    dict_digits = {} if (report is None) else report.get("dict_digits", {})
+
+    for field, dtype in df_out.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            dict_astype.update({field: dtype.categories.dtype, })
+        elif dtype == np.float32:
+            dict_astype.update({field: np.float64, })
+        elif pd.api.types.is_signed_integer_dtype(dtype) and (dtype != np.int64):
+            dict_astype.update({field: np.int64, })
+
+    df_out = df_out.astype(dict_astype, )
+
+    # restore values of float fields
+    fields_float32 = [k for k, v in dict_astype.items() if v is np.float64]
+    if len(fields_float32) > 0:
+        vec_digits = np.array([dict_digits.get(x, digits) for x in fields_float32], dtype = int, )
+        arr = df_out[fields_float32].to_numpy(dtype = np.float64, )
+        df_out[fields_float32] = round_significant(
+            arr,
+            np.broadcast_to(vec_digits, arr.shape, ),
+        )
+
+    df_out.attrs.pop(_ATTR_COMPACTION_REPORT, None)
+
+    return df_out
+
+
+
+def get_compaction_report(
+    df: pd.DataFrame,
+) -> Union[dict, None]:
+    """Get the compaction report from a DataFrame compacted using
+        compact_df(). Returns None if no report is found.
+    """
+    out = df.attrs.get(_ATTR_COMPACTION_REPORT)
+
+    return out
+
+
+
+def is_compact(
+    df: pd.DataFrame,
+) -> bool:
+    """Check if a DataFrame contains any compact dtypes
+    """
+    if _ATTR_COMPACTION_REPORT in df.attrs:
+        return True
+
+    out = any(
+        isinstance(x, pd.CategoricalDtype)
+        or (x == np.float32)
+        for x in df.dtypes
+    )
+
+    return out
+
+
+
+def round_significant(
+    arr: np.ndarray,
+    digits: Union[int, np.ndarray],
+) -> np.ndarray:
+    """Round values to a number of significant digits (element-wise if
+        digits is an array with the same shape as arr). Rounding uses exact
+        powers of ten, so decimal values with at most `digits` significant
+        digits are returned unchanged.
+    """
+    arr = np.asarray(arr, dtype = np.float64, )
+
+    with np.errstate(divide = "ignore", invalid = "ignore", ):
+        arr_exp = np.floor(np.log10(np.abs(arr)))
+
+    arr_exp = np.where(np.isfinite(arr_exp), arr_exp, 0.0, )
+    arr_k = np.asarray(digits) - 1 - arr_exp
+
+    # multiply and divide by integer powers of ten (exact up to 1e22)
+    arr_scale = 10.0**np.abs(arr_k)
+    with np.errstate(over = "ignore", invalid = "ignore", ):
+        arr_out = np.where(
+            arr_k >= 0,
+            np.round(arr*arr_scale)/arr_scale,
+            np.round(arr/arr_scale)*arr_scale,
+        )
+
+    return arr_out
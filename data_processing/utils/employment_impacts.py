@@ -0,0 +1,444 @@
+"""Estimate employment impacts of strategies from SISEPUEDE run outputs.
+    Jobs coefficients (direct, indirect, and total jobs per million USD of
+    activity) are read once from the employment results workbook and
+    cached. Jobs are calculated as a vectorized (primary, time_period,
+    sector) product of coefficients and changes in activity relative to
+    the baseline strategy.
+
+    Example
+    -------
+    df_run = cdn.read_run_output(path_run, merge_attribute_primary = True, )
+    engine = EmploymentEngine(
+        {
+            "INEN": r"^totalvalue_enfu_fuel_consumed_inen_",
+            "SCOE": r"^totalvalue_enfu_fuel_consumed_scoe_",
+        },
+    )
+    df_jobs = engine(df_run)
+    engine.export_tables(df_jobs, path_run, )
+"""
+import functools
+import numpy as np
+import os, os.path
+import pandas as pd
+import pathlib
+import re
+from typing import *
+
+try:
+    import utils.shared_support as shs
+except ModuleNotFoundError:
+    import shared_support as shs
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+# paths
+_PATH_EMPLOYMENT = shs.get_path_repo().joinpath("employment_estimates")
+_PATH_EMPLOYMENT_RESULTS = _PATH_EMPLOYMENT.joinpath("Sisepuede - Employment Results - WB.xlsx")
+
+# sheets and fields in the employment workbook
+_SHEET_BY_GROUP = "Average - By Group"
+_SHEET_BY_STRATEGY = "All Countries"
+_FIELD_WB_COUNTRY = "Country"
+_FIELD_WB_GROUP = "Group"
+_FIELD_WB_STRATEGY_ID = "strategy_id"
+_FIELDS_WB_JOBS = ["Direct_jobs", "Indirect_jobs", "Total_jobs"]
+
+# output fields
+_FIELD_DESIGN = "design_id"
+_FIELD_FUTURE = "future_id"
+_FIELD_PRIMARY = "primary_id"
+_FIELD_SECTOR = "sector"
+_FIELD_STRATEGY = "strategy_id"
+_FIELD_TIME_PERIOD = "time_period"
+_FIELDS_JOBS = ["direct_jobs", "indirect_jobs", "total_jobs"]
+
+_COUNTRY_DEFAULT = "UGA"
+_STRATEGY_BASELINE = 0
+
+# units of coefficients in the employment workbook; activity must be converted
+#  to the denominator (see EmploymentEngine dict_activity_scalars)
+_UNITS_COEFFICIENTS = "jobs per million USD"
+
+
+
+
+
+########################
+#    PRIMARY CLASS     #
+########################
+
+class EmploymentEngine:
+    """Calculate jobs by primary, time period, and sector (strategy group,
+        e.g., AGRC or TRNS) from run outputs. For primary p, time period t,
+        and sector g,
+
+        jobs[p, t, g] = coef[p, g]*(activity[p, t, g] - activity[b(p), t, g])
+
+        where b(p) is the baseline primary sharing p's design and future.
+        Coefficients default to the country's sector averages; if a
+        strategy has its own coefficients, they are used for its sector.
+
+    Initialization Arguments
+    ------------------------
+    dict_sector_activity : Dict[str, Union[str, List[str]]]
+        Dictionary mapping each sector (strategy group in the employment
+        workbook) to the activity fields in run outputs that are summed to
+        give sector activity. Values can be a list of fields or a regular
+        expression. Every listed field must be in the run output, and each
+        regular expression must match at least one field; otherwise,
+        compute_jobs() raises a KeyError.
+
+    Coefficients in the employment workbook are jobs per million USD of
+        activity (_UNITS_COEFFICIENTS; the workbook does not store units).
+        Sector activity is multiplied by its scalar in dict_activity_scalars
+        before coefficients are applied, so activity fields in other units
+        (e.g., USD) must be given a scalar (e.g., 1e-6).
+
+    Optional Arguments
+    ------------------
+    country : str
+        ISO alpha-3 code of the country to get coefficients for
+    dict_activity_scalars : Union[Dict[str, float], None]
+        Optional dictionary mapping sectors to scalars that convert summed
+        activity fields to million USD. Sectors that are not specified use
+        1 (activity fields are already in million USD)
+    path_workbook : Union[str, pathlib.Path]
+        Path to the employment results workbook
+    relative_to_baseline : bool
+        Calculate jobs from changes in activity relative to the baseline
+        strategy? If False, uses activity levels
+    strategy_baseline : int
+        Baseline strategy id
+    use_strategy_coefficients : bool
+        Use strategy-specific coefficients where available?
+    """
+    def __init__(self,
+        dict_sector_activity: Dict[str, Union[str, List[str]]],
+        country: str = _COUNTRY_DEFAULT,
+        dict_activity_scalars: Union[Dict[str, float], None] = None,
+        path_workbook: Union[str, pathlib.Path] = _PATH_EMPLOYMENT_RESULTS,
+        relative_to_baseline: bool = True,
+        strategy_baseline: int = _STRATEGY_BASELINE,
+        use_strategy_coefficients: bool = True,
+    ) -> None:
+
+        df_by_group, df_by_strategy = read_employment_coefficients(
+            path_workbook,
+            country = country,
+        )
+
+        # check sectors and scalars before any run output is read
+        dict_activity_scalars = {} if (dict_activity_scalars is None) else dict(dict_activity_scalars)
+        sectors_invalid = [x for x in dict_activity_scalars.keys() if x not in dict_sector_activity]
+        if len(sectors_invalid) > 0:
+            raise KeyError(f"Sectors {sectors_invalid} in dict_activity_scalars are not in dict_sector_activity.")
+
+        sectors_missing = [x for x in dict_sector_activity.keys() if x not in set(df_by_group[_FIELD_SECTOR])]
+        if len(sectors_missing) > 0:
+            raise KeyError(f"No employment coefficients found for sectors {sectors_missing} (country '{country}').")
+
+        self.country = country
+        self.df_coefficients_by_sector = df_by_group
+        self.df_coefficients_by_strategy = df_by_strategy
+        self.dict_activity_scalars = dict_activity_scalars
+        self.dict_sector_activity = dict_sector_activity
+        self.relative_to_baseline = relative_to_baseline
+        self.sectors = list(dict_sector_activity.keys())
+        self.strategy_baseline = strategy_baseline
+        self.use_strategy_coefficients = use_strategy_coefficients
+
+        return None
+
+
+
+    def __call__(self,
+        *args,
+        **kwargs,
+    ) -> pd.DataFrame:
+
+        out = self.compute_jobs(*args, **kwargs, )
+
+        return out
+
+
+
+    ########################
+    #    CORE FUNCTIONS    #
+    ########################
+
+    def build_coefficient_array(self,
+        vec_strategies: np.ndarray,
+    ) -> np.ndarray:
+        """Build an array of coefficients with shape (primary, sector, job
+            type) for a vector of strategy ids (one per primary).
+        """
+        # sectors are checked on initialization
+        df_sector = (
+            self.df_coefficients_by_sector
+            .set_index(_FIELD_SECTOR)
+            .reindex(self.sectors)
+        )
+        arr_sector = df_sector[_FIELDS_JOBS].to_numpy(dtype = float, )
+        arr_out = np.tile(arr_sector[None, :, :], (len(vec_strategies), 1, 1), )
+
+        if not self.use_strategy_coefficients:
+            return arr_out
+
+        # overwrite the strategy's own sector where coefficients are available
+        df_strat = self.df_coefficients_by_strategy
+        df_strat = df_strat[df_strat[_FIELD_SECTOR].isin(self.sectors)]
+        dict_sector_ind = dict((x, i) for i, x in enumerate(self.sectors))
+
+        vec_row = pd.Index(df_strat[_FIELD_STRATEGY]).get_indexer(vec_strategies)
+        w = np.where(vec_row >= 0)[0]
+        vec_sector = df_strat[_FIELD_SECTOR].map(dict_sector_ind).to_numpy()
+
+        arr_out[w, vec_sector[vec_row[w]], :] = df_strat[_FIELDS_JOBS].to_numpy()[vec_row[w]]
+
+        return arr_out
+
+
+
+    def build_activity_array(self,
+        df_run: pd.DataFrame,
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Sum activity fields by sector for all rows at once. Returns a
+            tuple of the form
+
+            (df_index, arr_activity)
+
+            where df_index contains the primary and time period for each
+            row and arr_activity has shape (row, sector) in million USD.
+            Raises a KeyError if mapped activity fields are not in df_run.
+        """
+        fields_all = []
+        dict_field_to_sectors = {}
+        dict_missing = {}
+
+        for j, sector in enumerate(self.sectors):
+            spec = self.dict_sector_activity.get(sector)
+            if isinstance(spec, str):
+                fields = [x for x in df_run.columns if re.search(spec, x) is not None]
+                if len(fields) == 0:
+                    dict_missing.update({sector: spec, })
+            else:
+                fields = list(spec)
+                fields_missing = [x for x in fields if x not in df_run.columns]
+                if (len(fields_missing) > 0) or (len(fields) == 0):
+                    dict_missing.update({sector: fields_missing, })
+
+            for field in fields:
+                if field not in dict_field_to_sectors:
+                    fields_all.append(field)
+                dict_field_to_sectors.setdefault(field, []).append(j)
+
+        if len(dict_missing) > 0:
+            raise KeyError(f"Activity fields not found in run output (sector: missing fields or pattern): {dict_missing}")
+
+        # aggregation matrix (field, sector), including unit conversion
+        vec_scalars = np.array([self.dict_activity_scalars.get(x, 1.0) for x in self.sectors], dtype = float, )
+        arr_agg = np.zeros((len(fields_all), len(self.sectors)), )
+        for i, field in enumerate(fields_all):
+            inds = dict_field_to_sectors.get(field)
+            arr_agg[i, inds] = vec_scalars[inds]
+
+        arr_activity = df_run[fields_all].to_numpy(dtype = float, ) @ arr_agg
+        fields_index = [
+            x for x in [_FIELD_PRIMARY, _FIELD_DESIGN, _FIELD_FUTURE, _FIELD_STRATEGY, _FIELD_TIME_PERIOD]
+            if x in df_run.columns
+        ]
+        df_index = df_run[fields_index].reset_index(drop = True, )
+
+        return df_index, arr_activity
+
+
+
+    def compute_jobs(self,
+        df_run: pd.DataFrame,
+        df_attribute_primary: Union[pd.DataFrame, None] = None,
+    ) -> pd.DataFrame:
+        """Calculate jobs by primary, time period, and sector. Returns a
+            long DataFrame with primary, strategy, time period, sector, and
+            direct, indirect, and total jobs.
+
+        Function Arguments
+        ------------------
+        df_run : pd.DataFrame
+            Run output (e.g., from common_data_needs.read_run_output) with
+            primary_id and time_period
+
+        Keyword Arguments
+        -----------------
+        df_attribute_primary : Union[pd.DataFrame, None]
+            Primary attribute table (ATTRIBUTE_PRIMARY.csv) used to get
+            strategy ids if they are not in df_run
+        """
+        if (_FIELD_STRATEGY not in df_run.columns):
+            if df_attribute_primary is None:
+                raise KeyError(f"Field {_FIELD_STRATEGY} not found in df_run; specify df_attribute_primary.")
+            df_run = pd.merge(df_attribute_primary, df_run, how = "right", )
+
+        df_run = df_run.sort_values(by = [_FIELD_PRIMARY, _FIELD_TIME_PERIOD]).reset_index(drop = True, )
+        df_index, arr_activity = self.build_activity_array(df_run, )
+
+        # change relative to baseline primaries with the same design/future
+        if self.relative_to_baseline:
+            arr_activity = arr_activity - self._get_baseline_activity(df_index, arr_activity, )
+
+        # (row, sector, job type) product
+        arr_coef = self.build_coefficient_array(df_index[_FIELD_STRATEGY].to_numpy(), )
+        arr_jobs = arr_coef*arr_activity[:, :, None]
+
+
+        ##  BUILD LONG OUTPUT
+
+        n_rows, n_sectors = arr_activity.shape
+        df_out = df_index[[_FIELD_PRIMARY, _FIELD_STRATEGY, _FIELD_TIME_PERIOD]].loc[
+            np.repeat(np.arange(n_rows), n_sectors)
+        ].reset_index(drop = True, )
+        df_out[_FIELD_SECTOR] = np.tile(self.sectors, n_rows, )
+        df_out[_FIELDS_JOBS] = arr_jobs.reshape((n_rows*n_sectors, len(_FIELDS_JOBS)))
+
+        return df_out
+
+
+
+    def export_tables(self,
+        df_jobs: pd.DataFrame,
+        dir_out: Union[str, pathlib.Path],
+        prefix: str = "employment",
+    ) -> Dict[str, pathlib.Path]:
+        """Export jobs tables for charts. Writes
+
+            * {prefix}_by_primary_time_period_sector.csv: long jobs table
+            * {prefix}_by_strategy_sector.csv: jobs summed over time
+            * {prefix}_by_strategy_time_period.csv: jobs summed over sectors
+
+            Returns a dictionary mapping table names to paths.
+        """
+        dir_out = pathlib.Path(dir_out)
+        dir_out.mkdir(parents = True, exist_ok = True, )
+
+        dict_tables = {
+            "by_primary_time_period_sector": df_jobs,
+            "by_strategy_sector": (
+                df_jobs
+                .groupby([_FIELD_STRATEGY, _FIELD_SECTOR], as_index = False, )[_FIELDS_JOBS]
+                .sum()
+            ),
+            "by_strategy_time_period": (
+                df_jobs
+                .groupby([_FIELD_STRATEGY, _FIELD_TIME_PERIOD], as_index = False, )[_FIELDS_JOBS]
+                .sum()
+            ),
+        }
+
+        dict_out = {}
+        for k, df in dict_tables.items():
+            path = dir_out.joinpath(f"{prefix}_{k}.csv")
+            shs.write_csv_atomic(df, path, )
+            dict_out.update({k: path, })
+
+        return dict_out
+
+
+
+    def _get_baseline_activity(self,
+        df_index: pd.DataFrame,
+        arr_activity: np.ndarray,
+    ) -> np.ndarray:
+        """Get baseline activity aligned to each row. Baseline rows share
+            design, future, and time period with the row.
+        """
+        fields_match = [
+            x for x in [_FIELD_DESIGN, _FIELD_FUTURE, _FIELD_TIME_PERIOD]
+            if x in df_index.columns
+        ]
+
+        vec_base = (df_index[_FIELD_STRATEGY] == self.strategy_baseline).to_numpy()
+        if not vec_base.any():
+            raise RuntimeError(f"Baseline strategy {self.strategy_baseline} not found in run outputs.")
+
+        index_base = pd.MultiIndex.from_frame(df_index.loc[vec_base, fields_match], )
+        vec_row = index_base.get_indexer(pd.MultiIndex.from_frame(df_index[fields_match], ), )
+        if (vec_row < 0).any():
+            raise RuntimeError(f"Baseline activity missing for some rows; check that the baseline was run for all designs and futures.")
+
+        arr_out = arr_activity[vec_base][vec_row]
+
+        return arr_out
+
+
+
+
+
+##########################
+#    DEFINE FUNCTIONS    #
+##########################
+
+def read_employment_coefficients(
+    path_workbook: Union[str, pathlib.Path] = _PATH_EMPLOYMENT_RESULTS,
+    country: str = _COUNTRY_DEFAULT,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Read jobs coefficients for a country from the employment results
+        workbook. Results are cached by path and modification time, so the
+        workbook is only read once per session unless it changes. Returns a
+        tuple of the form
+
+        (df_by_sector, df_by_strategy)
+    """
+    path_workbook = pathlib.Path(path_workbook)
+    if not path_workbook.is_file():
+        raise RuntimeError(f"Employment workbook {path_workbook} not found.")
+
+    out = _read_employment_coefficients_cached(
+        str(path_workbook),
+        os.path.getmtime(path_workbook),
+        country,
+    )
+    out = tuple(x.copy() for x in out)
+
+    return out
+
+
+
+@functools.lru_cache(maxsize = None)
+def _read_employment_coefficients_cached(
+    path_workbook: str,
+    mtime: float,
+    country: str,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Cached support for read_employment_coefficients(). mtime is only
+        used as part of the cache key.
+    """
+    dict_sheets = pd.read_excel(
+        path_workbook,
+        sheet_name = [_SHEET_BY_GROUP, _SHEET_BY_STRATEGY],
+    )
+    dict_rename = dict(zip(_FIELDS_WB_JOBS, _FIELDS_JOBS))
+    dict_rename.update({_FIELD_WB_GROUP: _FIELD_SECTOR, _FIELD_WB_STRATEGY_ID: _FIELD_STRATEGY, })
+
+    list_out = []
+    for sheet in [_SHEET_BY_GROUP, _SHEET_BY_STRATEGY]:
+        df = dict_sheets.get(sheet)
+        df = (
+            df[df[_FIELD_WB_COUNTRY] == country]
+            .rename(columns = dict_rename, )
+            .drop(columns = [_FIELD_WB_COUNTRY], )
+            .reset_index(drop = True, )
+        )
+        df[_FIELD_SECTOR] = df[_FIELD_SECTOR].str.strip()
+
+        if len(df) == 0:
+            raise KeyError(f"No employment coefficients found for country '{country}' in sheet '{sheet}'.")
+
+        list_out.append(df)
+
+    return tuple(list_out)
@@ -0,0 +1,575 @@
+"""Registry of values taken from source figures (e.g., IEA ETP, UBOS),
+    indexed by SISEPUEDE model variable, category, and year. Figures are
+    registered from classes.Dataset objects (one dictionary per figure
+    attribute, keyed by model variable name), model variables are resolved
+    to input fields once through model attributes, and all registered
+    values are written to an input table in one operation.
+
+    Example
+    -------
+    from utils.shared_data_etp import ETPData, DICT_FIGURE_CATEGORIES
+
+    registry = FigureRegistry()
+    registry.register_dataset(ETPData, "iea_etp", dict_categories = DICT_FIGURE_CATEGORIES, )
+
+    df_inputs = registry.apply(df_inputs, )
+"""
+import itertools
+import numpy as np
+import pandas as pd
+from typing import *
+
+try:
+    import utils.classes as cl
+    import utils.shared_support as shs
+except ModuleNotFoundError:
+    import classes as cl
+    import shared_support as shs
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+_FIELD_CATEGORY = "category"
+_FIELD_FIELD = "field"
+_FIELD_FIGURE = "figure"
+_FIELD_MODVAR = "modvar"
+_FIELD_PRECEDENCE = "precedence"
+_FIELD_SOURCE = "source"
+_FIELD_TIME_PERIOD = "time_period"
+_FIELD_VALUE = "value"
+_FIELD_YEAR = "year"
+
+# year code used for values that apply to all years
+_YEAR_ALL = -1
+
+# options for filling rows of new fields that no record covers
+_FILL_INTERPOLATE = "interpolate"
+_FILL_RAISE = "raise"
+_FILL_METHODS = [_FILL_INTERPOLATE, _FILL_RAISE]
+
+
+
+
+
+########################
+#    RECORD CLASS      #
+########################
+
+class FigureRecord:
+    """Single value from a source figure. If category or year are None, the
+        value applies to all categories or years.
+    """
+    __slots__ = ("category", "figure", "modvar", "source", "value", "year", )
+
+    def __init__(self,
+        source: str,
+        figure: str,
+        modvar: str,
+        value: float,
+        category: Union[str, None] = None,
+        year: Union[int, None] = None,
+    ) -> None:
+
+        self.category = category
+        self.figure = figure
+        self.modvar = modvar
+        self.source = source
+        self.value = value
+        self.year = year
+
+        return None
+
+
+    def __repr__(self,
+    ) -> str:
+        return (
+            f"FigureRecord(source = {self.source!r}, figure = {self.figure!r}, "
+            f"modvar = {self.modvar!r}, category = {self.category!r}, "
+            f"year = {self.year!r}, value = {self.value!r})"
+        )
+
+
+
+
+
+########################
+#    PRIMARY CLASS     #
+########################
+
+class FigureRegistry:
+    """Store source figure values indexed by (model variable, category,
+        year). Values are held in arrays; each key maps to one row, so
+        registering the same key again replaces the value (later sources
+        take precedence).
+
+        When records with different keys cover the same field and year, the
+        more specific record is used, regardless of registration order. 
+        Specificity is ranked by category first, then year:
+
+        0. all categories, all years
+        1. all categories, one year
+        2. one category, all years
+        3. one category, one year
+
+    Optional Arguments
+    ------------------
+    model_attributes : Union[ModelAttributes, None]
+        SISEPUEDE model attributes used to resolve model variables to
+        fields. If None, uses the model attributes in common_data_needs
+        (imported on first use)
+    """
+    def __init__(self,
+        model_attributes: Union[Any, None] = None,
+    ) -> None:
+
+        self.model_attributes = model_attributes
+
+        self._initialize_store()
+
+        return None
+
+
+
+    def __len__(self,
+    ) -> int:
+        return len(self._dict_key_to_row)
+
+
+
+    def _initialize_store(self,
+    ) -> None:
+        """Initialize the array store. Sets the following properties:
+
+            * self._arr_values
+            * self._dict_field_cache
+            * self._dict_key_to_row
+            * self._list_keys
+            * self._list_labels
+        """
+        # row values
+        self._arr_values = np.zeros(16, dtype = float, )
+
+        # (modvar, category, year) -> row and row -> (modvar, category, year)
+        self._dict_key_to_row = {}
+        self._list_keys = []
+
+        # row -> (source, figure)
+        self._list_labels = []
+
+        # (modvar, category) -> fields
+        self._dict_field_cache = {}
+
+        return None
+
+
+
+    ########################
+    #    CORE FUNCTIONS    #
+    ########################
+
+    def apply(self,
+        df_input: pd.DataFrame,
+        field_year: str = _FIELD_YEAR,
+        fill_new_fields: str = _FILL_INTERPOLATE,
+        inplace: bool = False,
+        year_0: Union[int, None] = None,
+    ) -> pd.DataFrame:
+        """Write all registered values to an input table. If more than one
+            record covers a field and year, the most specific record is 
+            written (see FigureRegistry and get_targets()). Existing fields
+            keep their values in rows that no record covers. Fields that are
+            not in df_input are added; rows that no record covers are filled
+            according to fill_new_fields.
+
+        Function Arguments
+        ------------------
+        df_input : pd.DataFrame
+            Input table with a year field or a time_period field
+
+        Keyword Arguments
+        -----------------
+        field_year : str
+            Year field in df_input; if not found, years are calculated from
+            time_period and year_0
+        fill_new_fields : str
+            How to fill rows of new fields that no record covers:
+            * "interpolate": linearly interpolate between covered years
+                and hold the first and last covered values constant
+            * "raise": raise a ValueError
+        inplace : bool
+            Modify df_input in place?
+        year_0 : Union[int, None]
+            Year of time period 0 (used if field_year is not in df_input).
+            If None, uses shared_support.get_year_0()
+        """
+        if fill_new_fields not in _FILL_METHODS:
+            raise ValueError(f"Invalid fill_new_fields '{fill_new_fields}': valid options are {_FILL_METHODS}")
+
+        df_out = df_input if inplace else df_input.copy()
+        df_targets = self.get_targets()
+        if len(df_targets) == 0:
+            return df_out
+
+        vec_years = (
+            df_out[field_year].to_numpy()
+            if field_year in df_out.columns
+            else df_out[_FIELD_TIME_PERIOD].to_numpy() + (shs.get_year_0() if (year_0 is None) else year_0)
+        )
+
+
+        ##  BUILD (ROW, COLUMN, VALUE) INDICES
+
+        fields = list(dict.fromkeys(df_targets[_FIELD_FIELD]))
+        fields_new = [x for x in fields if x not in df_out.columns]
+        dict_field_to_col = dict((x, i) for i, x in enumerate(fields))
+
+        vec_col = df_targets[_FIELD_FIELD].map(dict_field_to_col, ).to_numpy()
+        vec_year = df_targets[_FIELD_YEAR].to_numpy()
+        vec_value = df_targets[_FIELD_VALUE].to_numpy(dtype = float, )
+        vec_precedence = df_targets[_FIELD_PRECEDENCE].to_numpy()
+
+        # values for all years -- broadcast across rows
+        w_all = np.where(vec_year == _YEAR_ALL)[0]
+        n_rows = len(df_out)
+        vec_row_all = np.tile(np.arange(n_rows), len(w_all), )
+
+        # year-specific values -- drop years that are not in df_input
+        index_years = pd.Index(vec_years, )
+        if not index_years.is_unique:
+            raise ValueError(f"Years in df_input are not unique; apply() takes one region at a time.")
+
+        w_year = np.where(vec_year != _YEAR_ALL)[0]
+        vec_row_year = index_years.get_indexer(vec_year[w_year], )
+        w_year = w_year[vec_row_year >= 0]
+        vec_row_year = vec_row_year[vec_row_year >= 0]
+
+        # combine, order by precedence, and keep the last (most specific) value for each cell
+        w = np.concatenate([np.repeat(w_all, n_rows, ), w_year], )
+        vec_row = np.concatenate([vec_row_all, vec_row_year], )
+        w_order = np.argsort(vec_precedence[w], kind = "stable", )
+        w, vec_row = w[w_order], vec_row[w_order]
+
+        vec_cell = vec_row*len(fields) + vec_col[w]
+        _, w_last = np.unique(vec_cell[::-1], return_index = True, )
+        w_last = len(vec_cell) - 1 - w_last
+
+
+        ##  WRITE
+
+        arr_out = np.full((n_rows, len(fields)), np.nan, )
+        if len(fields_new) < len(fields):
+            fields_exist = [x for x in fields if x not in fields_new]
+            arr_out[:, [dict_field_to_col.get(x) for x in fields_exist]] = df_out[fields_exist].to_numpy(dtype = float, )
+
+        arr_out[vec_row[w_last], vec_col[w[w_last]]] = vec_value[w[w_last]]
+
+        # fill rows of new fields that no record covers
+        if len(fields_new) > 0:
+            arr_out = self._fill_new_fields(
+                arr_out,
+                vec_years,
+                [dict_field_to_col.get(x) for x in fields_new],
+                fields_new,
+                fill_new_fields,
+            )
+
+        df_out[fields] = arr_out
+
+        return df_out
+
+
+
+    def get(self,
+        modvar: str,
+        category: Union[str, None] = None,
+        year: Union[int, None] = None,
+    ) -> Union[FigureRecord, None]:
+        """Get the record for a key. Returns None if the key is not
+            registered.
+        """
+        row = self._dict_key_to_row.get(self._build_key(modvar, category, year, ))
+        if row is None:
+            return None
+
+        out = self._build_record(row, )
+
+        return out
+
+
+
+    def get_fields(self,
+        modvar: str,
+        category: Union[str, None] = None,
+    ) -> List[str]:
+        """Get input fields for a model variable (restricted to category if
+            specified). Resolved through model attributes once and cached.
+        """
+        key = (modvar, category)
+        fields = self._dict_field_cache.get(key)
+        if fields is not None:
+            return fields
+
+        matt = self._get_model_attributes()
+        modvar_obj = matt.get_variable(modvar, )
+        if modvar_obj is None:
+            raise KeyError(f"Model variable '{modvar}' not found in model attributes.")
+
+        fields = modvar_obj.build_fields(category_restrictions = category, )
+        fields = [fields] if isinstance(fields, str) else list(fields)
+        self._dict_field_cache.update({key: fields, })
+
+        return fields
+
+
+
+    def get_targets(self,
+    ) -> pd.DataFrame:
+        """Get a table of all registered values with resolved fields
+            (one row per field and year) and precedence (see 
+            FigureRegistry). Rows are sorted by precedence, and if more than
+            one record resolves to the same field and year (e.g., a value 
+            for all categories and one for a single category), only the 
+            most specific is kept.
+        """
+        n = len(self._list_keys)
+        if n == 0:
+            return pd.DataFrame(columns = [_FIELD_FIELD, _FIELD_YEAR, _FIELD_VALUE, _FIELD_PRECEDENCE], )
+
+        list_fields = [self.get_fields(modvar, category, ) for (modvar, category, _) in self._list_keys]
+        vec_n = np.array([len(x) for x in list_fields], dtype = int, )
+        vec_year = np.array([year for (_, _, year) in self._list_keys], dtype = int, )
+        vec_precedence = np.array(
+            [
+                2*int(category is not None) + int(year != _YEAR_ALL)
+                for (_, category, year) in self._list_keys
+            ], 
+            dtype = int, 
+        )
+
+        df_out = pd.DataFrame(
+            {
+                _FIELD_FIELD: list(itertools.chain.from_iterable(list_fields, )),
+                _FIELD_YEAR: np.repeat(vec_year, vec_n, ),
+                _FIELD_VALUE: np.repeat(self._arr_values[0:n], vec_n, ),
+                _FIELD_PRECEDENCE: np.repeat(vec_precedence, vec_n, ),
+            }
+        )
+        df_out = (
+            df_out
+            .sort_values(by = [_FIELD_PRECEDENCE], kind = "stable", )
+            .drop_duplicates(subset = [_FIELD_FIELD, _FIELD_YEAR], keep = "last", )
+            .reset_index(drop = True, )
+        )
+
+        return df_out
+
+
+
+    def register(self,
+        source: str,
+        figure: str,
+        modvar: str,
+        value: float,
+        category: Union[str, None] = None,
+        year: Union[int, None] = None,
+    ) -> None:
+        """Register a value. Replaces any value with the same model
+            variable, category, and year.
+
+        Function Arguments
+        ------------------
+        source : str
+            Source name (e.g., "iea_etp")
+        figure : str
+            Figure name (e.g., "figure_2_27")
+        modvar : str
+            SISEPUEDE model variable name
+        value : float
+            Value
+
+        Keyword Arguments
+        -----------------
+        category : Union[str, None]
+            Optional category restriction; if None, applies to all
+            categories of the variable
+        year : Union[int, None]
+            Optional year; if None, applies to all years
+        """
+        key = self._build_key(modvar, category, year, )
+        row = self._dict_key_to_row.get(key)
+
+        if row is None:
+            row = len(self._list_keys)
+            if row >= len(self._arr_values):
+                self._arr_values = np.concatenate([self._arr_values, np.zeros(len(self._arr_values), )], )
+
+            self._dict_key_to_row.update({key: row, })
+            self._list_keys.append(key)
+            self._list_labels.append((source, figure))
+
+        else:
+            self._list_labels[row] = (source, figure)
+
+        self._arr_values[row] = value
+
+        return None
+
+
+
+    def register_dataset(self,
+        dataset: cl.Dataset,
+        source: str,
+        dict_categories: Union[Dict[str, str], None] = None,
+    ) -> None:
+        """Register all values in a classes.Dataset. Each figure variable
+            that is a dictionary is read as model variable -> value, where
+            value is a number (all years) or a dictionary of year -> value.
+
+        Function Arguments
+        ------------------
+        dataset : cl.Dataset
+            Dataset of figures
+        source : str
+            Source name
+
+        Keyword Arguments
+        -----------------
+        dict_categories : Union[Dict[str, str], None]
+            Optional dictionary mapping figure names to category
+            restrictions
+        """
+        dict_categories = {} if not isinstance(dict_categories, dict) else dict_categories
+
+        for figure in dataset.figures:
+            fig = getattr(dataset, figure)
+            category = dict_categories.get(figure)
+
+            for variable in fig.all_variables:
+                dict_vals = getattr(fig, variable)
+                if not isinstance(dict_vals, dict):
+                    continue
+
+                for modvar, value in dict_vals.items():
+                    dict_years = value if isinstance(value, dict) else {None: value}
+                    for year, val in dict_years.items():
+                        self.register(source, figure, modvar, val, category = category, year = year, )
+
+        return None
+
+
+
+    def to_frame(self,
+    ) -> pd.DataFrame:
+        """Get all records as a DataFrame (one row per key)
+        """
+        n = len(self._list_keys)
+        df_out = pd.DataFrame(
+            {
+                _FIELD_SOURCE: [x[0] for x in self._list_labels],
+                _FIELD_FIGURE: [x[1] for x in self._list_labels],
+                _FIELD_MODVAR: [x[0] for x in self._list_keys],
+                _FIELD_CATEGORY: [x[1] for x in self._list_keys],
+                _FIELD_YEAR: [(None if x[2] == _YEAR_ALL else x[2]) for x in self._list_keys],
+                _FIELD_VALUE: self._arr_values[0:n].copy(),
+            }
+        )
+
+        return df_out
+
+
+
+    def _build_key(self,
+        modvar: str,
+        category: Union[str, None],
+        year: Union[int, None],
+    ) -> Tuple[str, Union[str, None], int]:
+        """Build a store key; year is coded as _YEAR_ALL if None
+        """
+        key = (modvar, category, (_YEAR_ALL if (year is None) else int(year)))
+
+        return key
+
+
+
+    def _build_record(self,
+        row: int,
+    ) -> FigureRecord:
+        """Build a FigureRecord for a row in the store
+        """
+        modvar, category, year = self._list_keys[row]
+        source, figure = self._list_labels[row]
+
+        out = FigureRecord(
+            source,
+            figure,
+            modvar,
+            float(self._arr_values[row]),
+            category = category,
+            year = (None if (year == _YEAR_ALL) else year),
+        )
+
+        return out
+
+
+
+    def _fill_new_fields(self,
+        arr_out: np.ndarray,
+        vec_years: np.ndarray,
+        cols_new: List[int],
+        fields_new: List[str],
+        fill_new_fields: str,
+    ) -> np.ndarray:
+        """Fill rows of new field columns in arr_out (row, field) that are
+            not covered by any record (see apply())
+        """
+        arr_uncovered = np.isnan(arr_out[:, cols_new])
+        if not arr_uncovered.any():
+            return arr_out
+
+        if fill_new_fields == _FILL_RAISE:
+            fields_uncovered = [x for x, q in zip(fields_new, arr_uncovered.any(axis = 0, )) if q]
+            raise ValueError(
+                f"Registered values do not cover all rows of new fields {fields_uncovered}. "
+                f"Register values for all years or set fill_new_fields = '{_FILL_INTERPOLATE}'."
+            )
+
+        # values can only be interpolated from at least one covered row
+        fields_empty = [x for x, q in zip(fields_new, arr_uncovered.all(axis = 0, )) if q]
+        if len(fields_empty) > 0:
+            raise ValueError(f"No registered values fall in the years of df_input for new fields {fields_empty}.")
+
+        vec_order = np.argsort(vec_years, kind = "stable", )
+        for col, vec_uncovered in zip(cols_new, arr_uncovered.transpose()):
+            if not vec_uncovered.any():
+                continue
+
+            vec_covered = ~vec_uncovered[vec_order]
+            arr_out[vec_uncovered, col] = np.interp(
+                vec_years[vec_uncovered],
+                vec_years[vec_order][vec_covered],
+                arr_out[vec_order, col][vec_covered],
+            )
+
+        return arr_out
+
+
+
+    def _get_model_attributes(self,
+    ):
+        """Get model attributes; imported from common_data_needs on first
+            use if not specified
+        """
+        if self.model_attributes is None:
+            try:
+                import utils.common_data_needs as cdn
+            except ModuleNotFoundError:
+                import common_data_needs as cdn
+
+            self.model_attributes = cdn._SISEPUEDE_MODEL_ATTRIBUTES
+
+        return self.model_attributes
@@ -0,0 +1,640 @@
+"""Vectorized Monte Carlo future generation for SISEPUEDE uncertainty runs.
+    Futures are sampled using a Latin hypercube over all trajectory groups
+    at once and stored as a (future, time_period, variable) array. Bounds
+    and base trajectories are read from the variable specification templates
+    written by Strategies.build_strategies_to_templates().
+
+    Example
+    -------
+    df_template = read_templates(path_templates, strategy_id = 0, )
+    sampler = FutureSampler(df_template, time_period_u0 = 10, )
+    sampler.write_futures_table("futures.parquet", 500, seed = 1, )
+
+    for future_ids, df in sampler.iter_batches(500, 50, seed = 1, ):
+        ...
+"""
+import concurrent.futures as cf
+import numpy as np
+import pandas as pd
+import pathlib
+import re
+from typing import *
+
+try:
+    import utils.template_store as tps
+except ModuleNotFoundError:
+    import template_store as tps
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+# fields in variable specification templates
+_FIELD_NORMALIZE_GROUP = "normalize_group"
+_FIELD_TRAJGROUP = "variable_trajectory_group"
+_FIELD_TRAJGROUP_NO_VARY = "trajgroup_no_vary_q"
+_FIELD_VARIABLE = "variable"
+
+# output fields
+_FIELD_FUTURE = "future_id"
+_FIELD_REGION = "region"
+_FIELD_TIME_PERIOD = "time_period"
+
+# futures table formats
+_FORMAT_CSV = "csv"
+_FORMAT_PARQUET = "parquet"
+_DICT_EXTENSION_TO_FORMAT = {
+    ".csv": _FORMAT_CSV,
+    ".parquet": _FORMAT_PARQUET,
+}
+
+# regular expressions for bound fields in templates
+_REGEX_FIELD_MAX = re.compile(r"max_(\d+)")
+_REGEX_FIELD_MIN = re.compile(r"min_(\d+)")
+
+# subdirectory of template directories used to store columnar templates
+_DIR_TEMPLATE_STORE = "template_store"
+
+
+
+
+
+########################
+#    PRIMARY CLASS     #
+########################
+
+class FutureSampler:
+    """Sample futures for all varying input trajectories at once.
+
+    Each trajectory group (and each ungrouped variable with non-trivial
+    bounds) is a dimension of a Latin hypercube. For future f, a variable v
+    in dimension d is scaled by
+
+        s[f, v] = min[v] + u[f, d]*(max[v] - min[v])
+
+    in the final time period, with uncertainty ramping in linearly from
+    time_period_u0. Variables in a normalized group are rescaled so that the
+    group total matches the base trajectory. Future 0 is the base future:
+    its trajectories are exactly the base trajectories in the template.
+
+    Initialization Arguments
+    ------------------------
+    df_template : pd.DataFrame
+        Variable specification template (see read_templates()) with
+        variable, trajectory group, bound (min_T, max_T), and time period
+        fields
+
+    Optional Arguments
+    ------------------
+    df_trajgroup : Union[pd.DataFrame, None]
+        Optional trajectory group specification with fields "variable" and
+        "variable_trajectory_group" that overrides groups in df_template
+    region : Union[str, None]
+        Optional region that the template describes. If specified, futures
+        tables include a region field, and sampled fields are only written
+        to the region's rows in multi-region base inputs (see
+        to_data_frame())
+    time_period_u0 : int
+        Last time period with no uncertainty
+    """
+    def __init__(self,
+        df_template: pd.DataFrame,
+        df_trajgroup: Union[pd.DataFrame, None] = None,
+        region: Union[str, None] = None,
+        time_period_u0: int = 10,
+    ) -> None:
+
+        self.region = region
+
+        self._initialize_template(
+            df_template,
+            df_trajgroup,
+        )
+        self._initialize_dimensions()
+        self._initialize_ramp(time_period_u0, )
+
+        return None
+
+
+
+    ########################
+    #    INITIALIZATION    #
+    ########################
+
+    def _initialize_dimensions(self,
+    ) -> None:
+        """Map each varying variable to a sampling dimension and build the
+            normalization matrix. Sets the following properties:
+
+            * self.arr_normalize
+            * self.n_dims
+            * self.vec_dim
+        """
+        df = self.df_template
+
+        # grouped variables share a dimension, others get their own
+        vec_group = df[_FIELD_TRAJGROUP].to_numpy()
+        vec_key = np.where(
+            pd.isna(vec_group),
+            [f"variable:{x}" for x in df[_FIELD_VARIABLE]],
+            [f"group:{x}" for x in vec_group],
+        )
+        _, vec_dim = np.unique(vec_key, return_inverse = True, )
+
+        # normalization matrix (n_variables x n_groups) for simplex groups
+        vec_norm = df[_FIELD_NORMALIZE_GROUP].to_numpy()
+        w = np.where(~pd.isna(vec_norm))[0]
+        groups_norm, vec_norm_ind = np.unique(vec_norm[w].astype(str), return_inverse = True, )
+
+        arr_normalize = np.zeros((len(df), len(groups_norm)), )
+        arr_normalize[w, vec_norm_ind] = 1.0
+
+
+        ##  SET PROPERTIES
+
+        self.arr_normalize = arr_normalize
+        self.n_dims = int(vec_dim.max() + 1) if (len(vec_dim) > 0) else 0
+        self.vec_dim = vec_dim
+
+        return None
+
+
+
+    def _initialize_ramp(self,
+        time_period_u0: int,
+    ) -> None:
+        """Set the uncertainty ramp over time periods. Sets the following
+            properties:
+
+            * self.time_period_u0
+            * self.vec_ramp
+        """
+        tps = self.time_periods.astype(float)
+        t1 = tps.max()
+        denom = max(t1 - time_period_u0, 1.0)
+
+        vec_ramp = np.clip((tps - time_period_u0)/denom, 0.0, 1.0, )
+
+
+        ##  SET PROPERTIES
+
+        self.time_period_u0 = time_period_u0
+        self.vec_ramp = vec_ramp
+
+        return None
+
+
+
+    def _initialize_template(self,
+        df_template: pd.DataFrame,
+        df_trajgroup: Union[pd.DataFrame, None],
+    ) -> None:
+        """Get base trajectories and bounds from the template. Only
+            variables that vary are kept. Sets the following properties:
+
+            * self.arr_base
+            * self.df_template
+            * self.time_periods
+            * self.variables
+            * self.vec_max
+            * self.vec_min
+        """
+        df = df_template.copy()
+        df.columns = [str(x) for x in df.columns]
+
+        # override trajectory groups?
+        if isinstance(df_trajgroup, pd.DataFrame):
+            dict_groups = dict(
+                zip(
+                    df_trajgroup[_FIELD_VARIABLE],
+                    df_trajgroup[_FIELD_TRAJGROUP],
+                )
+            )
+            df[_FIELD_TRAJGROUP] = df[_FIELD_VARIABLE].map(dict_groups)
+
+        for field in [_FIELD_TRAJGROUP, _FIELD_NORMALIZE_GROUP, _FIELD_TRAJGROUP_NO_VARY]:
+            if field not in df.columns:
+                df[field] = np.nan
+
+        # get bound and time period fields
+        field_max = [x for x in df.columns if _REGEX_FIELD_MAX.fullmatch(x) is not None]
+        field_min = [x for x in df.columns if _REGEX_FIELD_MIN.fullmatch(x) is not None]
+        if (len(field_max) != 1) or (len(field_min) != 1):
+            raise ValueError(f"Template must include exactly one max_T and one min_T field.")
+
+        fields_tp = sorted([x for x in df.columns if x.isdigit()], key = int, )
+        df = df.drop_duplicates(subset = [_FIELD_VARIABLE], keep = "first", )
+
+        # keep variables with bounds that vary
+        vec_max = df[field_max[0]].to_numpy(dtype = float, )
+        vec_min = df[field_min[0]].to_numpy(dtype = float, )
+        vec_no_vary = df[_FIELD_TRAJGROUP_NO_VARY].fillna(0).to_numpy(dtype = float, ) > 0
+        vec_keep = (vec_max != vec_min) & ~vec_no_vary
+
+        # normalized groups must be kept whole if any element varies
+        vec_norm = df[_FIELD_NORMALIZE_GROUP]
+        groups_keep = set(vec_norm[vec_keep].dropna())
+        vec_keep |= vec_norm.isin(groups_keep).to_numpy()
+
+        df = df[vec_keep].reset_index(drop = True, )
+
+
+        ##  SET PROPERTIES
+
+        self.arr_base = df[fields_tp].to_numpy(dtype = float, ).transpose()
+        self.df_template = df
+        self.time_periods = np.array([int(x) for x in fields_tp])
+        self.variables = list(df[_FIELD_VARIABLE])
+        self.vec_max = vec_max[vec_keep]
+        self.vec_min = vec_min[vec_keep]
+
+        return None
+
+
+
+    ########################
+    #    CORE FUNCTIONS    #
+    ########################
+
+    def build_trajectories(self,
+        arr_lhs: np.ndarray,
+        dtype: type = np.float64,
+    ) -> np.ndarray:
+        """Build trajectories for a set of futures from Latin hypercube
+            samples. Returns an array of shape (future, time_period,
+            variable).
+
+        Function Arguments
+        ------------------
+        arr_lhs : np.ndarray
+            Array of samples (future, dimension) in [0, 1] (see
+            sample_lhs()). Rows that are all NaN are base futures and
+            return the base trajectories exactly.
+
+        Keyword Arguments
+        -----------------
+        dtype : type
+            Output dtype; use np.float32 to halve memory
+        """
+        vec_base = np.isnan(arr_lhs).all(axis = 1, )
+
+        # scalars at final time period (future, variable), then ramp over time
+        arr_scalar = self.vec_min + arr_lhs[:, self.vec_dim]*(self.vec_max - self.vec_min)
+        arr_scalar[vec_base] = 1.0
+        arr_scalar = 1.0 + self.vec_ramp[None, :, None]*(arr_scalar[:, None, :] - 1.0)
+        arr_out = self.arr_base[None, :, :]*arr_scalar
+
+        # renormalize simplex groups to base totals
+        if self.arr_normalize.shape[1] > 0:
+            arr_norm = self.arr_normalize
+            arr_total_base = self.arr_base @ arr_norm
+            arr_total = arr_out @ arr_norm
+
+            with np.errstate(divide = "ignore", invalid = "ignore", ):
+                arr_scale = np.where(arr_total > 0, arr_total_base/arr_total, 1.0, )
+
+            arr_out *= arr_scale @ arr_norm.transpose() + (1.0 - arr_norm.sum(axis = 1))
+
+        # base futures are not sampled
+        arr_out[vec_base] = self.arr_base
+
+        arr_out = arr_out.astype(dtype, copy = False, )
+
+        return arr_out
+
+
+
+    def iter_batches(self,
+        n_futures: int,
+        batch_size: int,
+        df_inputs_base: Union[pd.DataFrame, None] = None,
+        dtype: type = np.float64,
+        include_base_future: bool = True,
+        seed: Union[int, None] = None,
+    ) -> Iterator[Tuple[np.ndarray, pd.DataFrame]]:
+        """Iterate over batches of futures. All Latin hypercube samples are
+            drawn up front (so the design is preserved), but trajectories
+            are only built one batch at a time.
+
+            Yields tuples of the form
+
+            (future_ids, df_batch)
+
+        Function Arguments
+        ------------------
+        n_futures : int
+            Number of futures to sample
+        batch_size : int
+            Number of futures in each batch
+
+        Keyword Arguments
+        -----------------
+        df_inputs_base : Union[pd.DataFrame, None]
+            Optional base input table (with time_period). If specified,
+            batches are complete input tables with sampled fields
+            overwritten; otherwise, batches only include sampled fields
+        dtype : type
+            dtype for sampled values
+        include_base_future : bool
+            Include future 0 as the unsampled base future?
+        seed : Union[int, None]
+            Random seed
+        """
+        arr_lhs = self.sample_lhs(
+            n_futures,
+            include_base_future = include_base_future,
+            seed = seed,
+        )
+        future_ids = np.arange(arr_lhs.shape[0])
+
+        for i0 in range(0, len(future_ids), batch_size):
+            ids_batch = future_ids[i0:(i0 + batch_size)]
+            arr_batch = self.build_trajectories(arr_lhs[ids_batch], dtype = dtype, )
+            df_batch = self.to_data_frame(
+                arr_batch,
+                ids_batch,
+                df_inputs_base = df_inputs_base,
+            )
+
+            yield ids_batch, df_batch
+
+
+
+    def run_batches(self,
+        func: Callable[[pd.DataFrame], Any],
+        n_futures: int,
+        batch_size: int,
+        n_workers: int = 1,
+        **kwargs,
+    ) -> List[Any]:
+        """Stream batches of futures to a function, optionally using a
+            process pool. Returns a list of results ordered by batch.
+
+        Function Arguments
+        ------------------
+        func : Callable[[pd.DataFrame], Any]
+            Function applied to each batch DataFrame. Must be picklable
+            (defined at module level) if n_workers > 1
+        n_futures : int
+            Number of futures to sample
+        batch_size : int
+            Number of futures in each batch
+
+        Keyword Arguments
+        -----------------
+        n_workers : int
+            Number of worker processes; if 1, runs in the current process
+        **kwargs :
+            Passed to iter_batches()
+        """
+        batches = self.iter_batches(n_futures, batch_size, **kwargs, )
+
+        if n_workers <= 1:
+            out = [func(df) for _, df in batches]
+            return out
+
+        # keep at most 2*n_workers batches in flight to limit memory
+        out = []
+        with cf.ProcessPoolExecutor(max_workers = n_workers, ) as executor:
+            futures_pending = []
+            for _, df in batches:
+                futures_pending.append(executor.submit(func, df, ))
+                if len(futures_pending) >= 2*n_workers:
+                    out.append(futures_pending.pop(0).result())
+
+            out.extend([x.result() for x in futures_pending])
+
+        return out
+
+
+
+    def sample_lhs(self,
+        n_futures: int,
+        include_base_future: bool = True,
+        seed: Union[int, None] = None,
+    ) -> np.ndarray:
+        """Draw a Latin hypercube sample for all dimensions at once.
+            Returns an array of shape (future, dimension) with values in
+            [0, 1]. If include_base_future, row 0 is NaN, which
+            build_trajectories() treats as the base future.
+
+        Function Arguments
+        ------------------
+        n_futures : int
+            Number of futures to sample
+
+        Keyword Arguments
+        -----------------
+        include_base_future : bool
+            Prepend the base future as future 0?
+        seed : Union[int, None]
+            Random seed
+        """
+        rng = np.random.default_rng(seed, )
+
+        # one stratum per future in each dimension, shuffled independently
+        arr_strata = rng.permuted(
+            np.tile(np.arange(n_futures), (self.n_dims, 1)),
+            axis = 1,
+        ).transpose()
+        arr_out = (arr_strata + rng.random((n_futures, self.n_dims)))/n_futures
+
+        if include_base_future:
+            arr_out = np.concatenate([np.full((1, self.n_dims), np.nan, ), arr_out], axis = 0, )
+
+        return arr_out
+
+
+
+    def to_data_frame(self,
+        arr_trajectories: np.ndarray,
+        future_ids: np.ndarray,
+        df_inputs_base: Union[pd.DataFrame, None] = None,
+    ) -> pd.DataFrame:
+        """Convert a (future, time_period, variable) array to a wide futures
+            table with fields future_id, region (if self.region is set),
+            time_period, and sampled variables. If df_inputs_base is
+            specified, returns complete input tables with sampled fields
+            overwritten.
+
+            If df_inputs_base includes a region field, base inputs are
+            merged on region and time period, so only self.region's rows
+            are used; base inputs with more than one region require
+            self.region.
+        """
+        n_f, n_t, n_v = arr_trajectories.shape
+
+        df_out = pd.DataFrame(
+            arr_trajectories.reshape((n_f*n_t, n_v)),
+            columns = self.variables,
+        )
+        df_out.insert(0, _FIELD_TIME_PERIOD, np.tile(self.time_periods, n_f, ), )
+        if self.region is not None:
+            df_out.insert(0, _FIELD_REGION, self.region, )
+        df_out.insert(0, _FIELD_FUTURE, np.repeat(future_ids, n_t, ), )
+
+        if df_inputs_base is None:
+            return df_out
+
+        # merge on region if base inputs have one
+        fields_merge = [_FIELD_TIME_PERIOD]
+        if _FIELD_REGION in df_inputs_base.columns:
+            regions = list(df_inputs_base[_FIELD_REGION].unique())
+            if (self.region is None) and (len(regions) > 1):
+                raise ValueError(f"df_inputs_base includes regions {regions}; set the sampler's region to choose one.")
+
+            if self.region is not None:
+                if self.region not in regions:
+                    raise KeyError(f"Region '{self.region}' not found in df_inputs_base.")
+                fields_merge = [_FIELD_REGION, _FIELD_TIME_PERIOD]
+
+        # overwrite sampled fields in the base inputs
+        fields_keep = [x for x in df_inputs_base.columns if x not in self.variables]
+        df_out = pd.merge(
+            df_out,
+            df_inputs_base[fields_keep],
+            how = "left",
+            on = fields_merge,
+        )
+        fields_out = [x for x in df_out.columns if x in [_FIELD_FUTURE, _FIELD_REGION]]
+        fields_out += [x for x in df_inputs_base.columns if x not in fields_out]
+        df_out = df_out[fields_out]
+
+        return df_out
+
+
+
+    def write_futures_table(self,
+        path: Union[str, pathlib.Path],
+        n_futures: int,
+        batch_size: int = 100,
+        dtype: type = np.float32,
+        fmt: Union[str, None] = None,
+        **kwargs,
+    ) -> None:
+        """Write sampled futures to a futures table, one batch at a time so
+            that memory use does not grow with the number of futures.
+            Parquet tables (which require pyarrow) store sampled values at
+            dtype and are much smaller than CSV; each batch is written as
+            a row group.
+
+        Function Arguments
+        ------------------
+        path : Union[str, pathlib.Path]
+            Output path
+        n_futures : int
+            Number of futures to sample
+
+        Keyword Arguments
+        -----------------
+        batch_size : int
+            Number of futures to write at a time
+        dtype : type
+            dtype for sampled values
+        fmt : Union[str, None]
+            "csv" or "parquet". If None, inferred from the extension of path
+            (defaults to "csv")
+        **kwargs :
+            Passed to iter_batches()
+        """
+        path = pathlib.Path(path)
+        fmt = _DICT_EXTENSION_TO_FORMAT.get(path.suffix, _FORMAT_CSV) if (fmt is None) else fmt
+        if fmt not in [_FORMAT_CSV, _FORMAT_PARQUET]:
+            raise ValueError(f"Invalid futures table format '{fmt}'. Valid formats are {[_FORMAT_CSV, _FORMAT_PARQUET]}.")
+
+        batches = self.iter_batches(
+            n_futures,
+            batch_size,
+            dtype = dtype,
+            **kwargs,
+        )
+
+        if fmt == _FORMAT_CSV:
+            for i, (_, df) in enumerate(batches):
+                df.to_csv(
+                    path,
+                    encoding = "UTF-8",
+                    header = (i == 0),
+                    index = None,
+                    mode = ("w" if (i == 0) else "a"),
+                )
+
+            return None
+
+        # parquet -- write batches as row groups with a single writer
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for _, df in batches:
+                table = pa.Table.from_pandas(df, preserve_index = False, )
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, )
+                writer.write_table(table, )
+
+        finally:
+            if writer is not None:
+                writer.close()
+
+        return None
+
+
+
+
+
+##########################
+#    DEFINE FUNCTIONS    #
+##########################
+
+def read_templates(
+    path_templates: Union[str, pathlib.Path],
+    strategy_id: int = 0,
+    dir_store: Union[str, pathlib.Path, None] = None,
+) -> pd.DataFrame:
+    """Read variable specification templates for a strategy from all Excel
+        files in a directory (e.g., transformations/templates/calibrated)
+        and stack them into a single DataFrame. Workbooks are synchronized 
+        to a columnar template store (see template_store) and read from it,
+        so each workbook is only parsed again after it changes. If the 
+        directory has no workbooks, it is read as a template store.
+
+    Function Arguments
+    ------------------
+    path_templates : Union[str, pathlib.Path]
+        Directory containing template workbooks or a template store
+
+    Keyword Arguments
+    -----------------
+    strategy_id : int
+        Strategy to read sheets for
+    dir_store : Union[str, pathlib.Path, None]
+        Directory of the template store used for workbooks. If None, uses
+        the _DIR_TEMPLATE_STORE subdirectory of path_templates
+    """
+    path_templates = pathlib.Path(path_templates)
+    paths_xlsx = tps.get_xlsx_paths(path_templates, )
+
+    if len(paths_xlsx) == 0:
+        df_out = tps.read_strategy_templates(path_templates, strategy_id = strategy_id, )
+        return df_out
+
+    dir_store = (
+        path_templates.joinpath(_DIR_TEMPLATE_STORE) 
+        if (dir_store is None) 
+        else pathlib.Path(dir_store)
+    )
+    tps.sync_xlsx_templates(path_templates, dir_store, )
+
+    # only read templates for workbooks that are present
+    df_out = tps.read_strategy_templates(
+        dir_store, 
+        strategy_id = strategy_id, 
+        names = [x.stem for x in paths_xlsx],
+    )
+
+    return df_out
@@ -0,0 +1,276 @@
+"""Targeted gap filling for wide input tables. Missing values are found
+    using a single vectorized mask, and only fields that contain gaps are
+    filled. Methods can be set by field or by field prefix (e.g., variable
+    group), and every imputed cell is recorded in a log.
+
+    Methods
+    -------
+    * "flat": carry the nearest observation forward, then backward
+    * "growth_rate": interpolate interior gaps linearly; extrapolate
+        trailing gaps at the mean growth rate of the last observations
+    * "linear": interpolate linearly in time; extrapolate flat at the ends
+    * "profile": use an example profile (e.g., SISEPUEDE example inputs)
+        scaled to the nearest observation
+"""
+import numpy as np
+import pandas as pd
+from typing import *
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+_METHOD_FLAT = "flat"
+_METHOD_GROWTH_RATE = "growth_rate"
+_METHOD_LINEAR = "linear"
+_METHOD_PROFILE = "profile"
+_METHODS_VALID = [_METHOD_FLAT, _METHOD_GROWTH_RATE, _METHOD_LINEAR, _METHOD_PROFILE]
+
+# fields in the imputation log
+_FIELD_LOG_FIELD = "field"
+_FIELD_LOG_METHOD = "method"
+_FIELD_LOG_VALUE = "value"
+
+
+
+
+
+##########################
+#    DEFINE FUNCTIONS    #
+##########################
+
+def fill_gaps(
+    df: pd.DataFrame,
+    field_time: str,
+    dict_methods: Union[Dict[str, str], None] = None,
+    df_profile: Union[pd.DataFrame, None] = None,
+    fields: Union[List[str], None] = None,
+    method_default: str = _METHOD_LINEAR,
+    n_obs_growth: int = 5,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Fill missing values in fields that contain gaps. Returns a tuple of
+        the form
+
+        (df_filled, df_log)
+
+        where df_log contains one row per imputed cell with fields
+        field_time, "field", "method", and "value". Row order of df is
+        preserved.
+
+    Function Arguments
+    ------------------
+    df : pd.DataFrame
+        Wide DataFrame with one row per time value
+    field_time : str
+        Field storing time (e.g., year or time_period)
+
+    Keyword Arguments
+    -----------------
+    dict_methods : Union[Dict[str, str], None]
+        Optional dictionary mapping fields or field prefixes (e.g., "frac_"
+        or "frac_trns_fuelmix_") to methods. Exact field matches take
+        precedence, then the longest matching prefix
+    df_profile : Union[pd.DataFrame, None]
+        DataFrame of example profiles (with field_time) used by the
+        "profile" method
+    fields : Union[List[str], None]
+        Optional subset of fields to fill. If None, fills all numeric
+        fields other than field_time
+    method_default : str
+        Method used for fields that do not match dict_methods
+    n_obs_growth : int
+        Number of trailing observations used to estimate growth rates
+    """
+    dict_methods = {} if not isinstance(dict_methods, dict) else dict_methods
+    _check_methods(list(dict_methods.values()) + [method_default])
+
+    # get fields to check
+    fields = (
+        [x for x in df.select_dtypes(include = [np.number]).columns if x != field_time]
+        if fields is None
+        else [x for x in fields if (x in df.columns) and (x != field_time)]
+    )
+
+    # sort by time (restore later) and find gaps across all fields at once
+    vec_order = np.argsort(df[field_time].to_numpy(), kind = "stable", )
+    vec_time = df[field_time].to_numpy()[vec_order].astype(float)
+
+    arr = df[fields].to_numpy(dtype = float, )[vec_order]
+    arr_mask = np.isnan(arr)
+    vec_w = np.where(arr_mask.any(axis = 0))[0]
+
+    df_out = df.copy()
+    if len(vec_w) == 0:
+        return df_out, _build_log(field_time, [], [], [], [], )
+
+    # profile array aligned to sorted time
+    arr_profile = None
+    if isinstance(df_profile, pd.DataFrame):
+        arr_profile = (
+            pd.merge(
+                pd.DataFrame({field_time: df[field_time].to_numpy()[vec_order]}),
+                df_profile,
+                how = "left",
+            )
+            .reindex(columns = [fields[i] for i in vec_w])
+            .to_numpy(dtype = float, )
+        )
+
+
+    ##  FILL ONLY FIELDS WITH GAPS
+
+    methods = []
+    for j, i in enumerate(vec_w):
+        method = get_method(fields[i], dict_methods, method_default, )
+        vec_profile = arr_profile[:, j] if (arr_profile is not None) else None
+
+        arr[:, i] = _fill_vector(
+            arr[:, i],
+            vec_time,
+            method,
+            n_obs_growth = n_obs_growth,
+            vec_profile = vec_profile,
+        )
+        methods.append(method)
+
+    # restore order and write only fields with gaps
+    vec_order_inv = np.argsort(vec_order, )
+    fields_gap = [fields[i] for i in vec_w]
+    df_out[fields_gap] = arr[:, vec_w][vec_order_inv]
+
+
+    ##  BUILD LOG OF IMPUTED CELLS
+
+    arr_imputed = arr_mask[:, vec_w] & ~np.isnan(arr[:, vec_w])
+    vec_r, vec_c = np.nonzero(arr_imputed)
+
+    df_log = _build_log(
+        field_time,
+        df[field_time].to_numpy()[vec_order][vec_r],
+        np.array(fields_gap)[vec_c],
+        np.array(methods)[vec_c],
+        arr[:, vec_w][vec_r, vec_c],
+    )
+
+    return df_out, df_log
+
+
+
+def get_method(
+    field: str,
+    dict_methods: Dict[str, str],
+    method_default: str,
+) -> str:
+    """Get the fill method for a field. Exact matches in dict_methods take
+        precedence, then the longest matching prefix, then method_default.
+    """
+    method = dict_methods.get(field)
+    if method is not None:
+        return method
+
+    prefixes = sorted(
+        [x for x in dict_methods.keys() if field.startswith(x)],
+        key = len,
+        reverse = True,
+    )
+    method = dict_methods.get(prefixes[0]) if (len(prefixes) > 0) else method_default
+
+    return method
+
+
+
+def _build_log(
+    field_time: str,
+    vec_time: np.ndarray,
+    vec_field: np.ndarray,
+    vec_method: np.ndarray,
+    vec_value: np.ndarray,
+) -> pd.DataFrame:
+    """Build the imputation log
+    """
+    df_out = pd.DataFrame(
+        {
+            field_time: vec_time,
+            _FIELD_LOG_FIELD: vec_field,
+            _FIELD_LOG_METHOD: vec_method,
+            _FIELD_LOG_VALUE: vec_value,
+        }
+    )
+
+    return df_out
+
+
+
+def _check_methods(
+    methods: List[str],
+) -> None:
+    """Raise an error if any methods are invalid
+    """
+    methods_invalid = sorted(set(methods) - set(_METHODS_VALID))
+    if len(methods_invalid) > 0:
+        raise ValueError(f"Invalid gap filling methods {methods_invalid}. Valid methods are {_METHODS_VALID}.")
+
+    return None
+
+
+
+def _fill_vector(
+    vec: np.ndarray,
+    vec_time: np.ndarray,
+    method: str,
+    n_obs_growth: int = 5,
+    vec_profile: Union[np.ndarray, None] = None,
+) -> np.ndarray:
+    """Fill a single vector (sorted by time) using a method. Vectors with no
+        observations are only filled by the "profile" method.
+    """
+    vec_obs = ~np.isnan(vec)
+    w_obs = np.where(vec_obs)[0]
+    vec_out = vec.copy()
+
+    # nothing to anchor on
+    if len(w_obs) == 0:
+        if (method == _METHOD_PROFILE) and (vec_profile is not None):
+            vec_out = vec_profile.copy()
+        return vec_out
+
+    if method == _METHOD_FLAT:
+        vec_out = pd.Series(vec).ffill().bfill().to_numpy()
+
+    elif method == _METHOD_LINEAR:
+        vec_out = np.interp(vec_time, vec_time[w_obs], vec[w_obs], )
+
+    elif method == _METHOD_GROWTH_RATE:
+        vec_out = np.interp(vec_time, vec_time[w_obs], vec[w_obs], )
+
+        # extrapolate trailing gaps using mean growth of the last observations
+        w_tail = w_obs[-min(n_obs_growth, len(w_obs)):]
+        v0, v1 = vec[w_tail[0]], vec[w_tail[-1]]
+        dt = vec_time[w_tail[-1]] - vec_time[w_tail[0]]
+        rate = (v1/v0)**(1.0/dt) - 1.0 if ((dt > 0) and (v0 > 0) and (v1 > 0)) else 0.0
+
+        w_trail = np.where(vec_time > vec_time[w_obs[-1]])[0]
+        vec_out[w_trail] = v1*(1.0 + rate)**(vec_time[w_trail] - vec_time[w_obs[-1]])
+
+    elif method == _METHOD_PROFILE:
+        vec_out = np.interp(vec_time, vec_time[w_obs], vec[w_obs], )
+        if vec_profile is None:
+            return vec_out
+
+        # scale the profile to the last observation before each gap (or the
+        #  first observation for leading gaps)
+        vec_anchor = np.maximum.accumulate(np.where(vec_obs, np.arange(len(vec)), -1))
+        vec_anchor = np.where(vec_anchor < 0, w_obs[0], vec_anchor)
+
+        with np.errstate(divide = "ignore", invalid = "ignore", ):
+            vec_scale = vec[vec_anchor]/vec_profile[vec_anchor]
+
+        vec_fill = np.where(np.isfinite(vec_scale), vec_profile*vec_scale, vec_out)
+        vec_fill = np.where(np.isnan(vec_fill), vec_out, vec_fill)
+        vec_out = np.where(vec_obs, vec, vec_fill)
+
+    return vec_out
@@ -0,0 +1,381 @@
+"""Baseline-delta storage for per-primary SISEPUEDE input databases. The
+    input table for a baseline primary is stored once; for every other
+    primary, only the cells (row, field) that differ from the baseline are
+    stored. Any set of primaries can be reconstructed in one vectorized
+    operation.
+
+    Example
+    -------
+    df_in = ssp.read_input(None)
+    store = InputDeltaStore(df_in, primary_baseline = 0, )
+    store.save("inputs_delta.npz")
+
+    store = InputDeltaStore.load("inputs_delta.npz")
+    df_1001 = store.get_inputs(1001)
+"""
+import numpy as np
+import pandas as pd
+import pathlib
+from typing import *
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+_FIELD_PRIMARY = "primary_id"
+_FIELDS_INDEX = ["region", "time_period"]
+
+# prefix for index fields stored in npz archives
+_PREFIX_NPZ_INDEX = "index__"
+
+
+
+
+
+########################
+#    PRIMARY CLASS     #
+########################
+
+class InputDeltaStore:
+    """Store a baseline input table and sparse per-primary deltas.
+
+    Initialization Arguments
+    ------------------------
+    df_inputs : Union[pd.DataFrame, None]
+        Long DataFrame of inputs for all primaries (e.g., from
+        SISEPUEDE.read_input(None)). Each primary must contain the same set
+        of index rows as the baseline. If None, initializes an empty store
+        (used by InputDeltaStore.load())
+
+    Optional Arguments
+    ------------------
+    atol : float
+        Absolute tolerance used to identify changed cells. Default of 0 only
+        stores cells that are not exactly equal
+    field_primary : str
+        Field storing the primary key
+    fields_index : Union[List[str], None]
+        Fields that identify a row within a primary (e.g., region and time
+        period). If None, uses any fields in _FIELDS_INDEX that are present
+    primary_baseline : Union[int, None]
+        Primary to use as baseline. If None, uses the minimum primary
+    """
+    def __init__(self,
+        df_inputs: Union[pd.DataFrame, None],
+        atol: float = 0.0,
+        field_primary: str = _FIELD_PRIMARY,
+        fields_index: Union[List[str], None] = None,
+        primary_baseline: Union[int, None] = None,
+    ) -> None:
+
+        self.field_primary = field_primary
+
+        if df_inputs is not None:
+            self._initialize_from_df(
+                df_inputs,
+                atol,
+                fields_index,
+                primary_baseline,
+            )
+
+        return None
+
+
+
+    def __repr__(self,
+    ) -> str:
+        out = f"InputDeltaStore(n_primaries = {len(self.primaries)}, n_fields = {len(self.fields)}, n_delta_cells = {len(self.vec_delta_value)})"
+
+        return out
+
+
+
+    ########################
+    #    INITIALIZATION    #
+    ########################
+
+    def _initialize_from_df(self,
+        df_inputs: pd.DataFrame,
+        atol: float,
+        fields_index: Union[List[str], None],
+        primary_baseline: Union[int, None],
+    ) -> None:
+        """Build the baseline and sparse deltas from a long DataFrame.
+            Sets the following properties:
+
+            * self.arr_baseline
+            * self.df_index
+            * self.fields
+            * self.fields_index
+            * self.primaries
+            * self.primary_baseline
+            * self.vec_delta_col
+            * self.vec_delta_row
+            * self.vec_delta_value
+            * self.vec_offsets
+        """
+        field_primary = self.field_primary
+        if field_primary not in df_inputs.columns:
+            raise KeyError(f"Primary key field '{field_primary}' not found in df_inputs.")
+
+        # check index fields and data fields
+        fields_index = _FIELDS_INDEX if (fields_index is None) else fields_index
+        fields_index = [x for x in fields_index if x in df_inputs.columns]
+        fields = [x for x in df_inputs.columns if x not in fields_index + [field_primary]]
+
+        fields_non_numeric = [
+            x for x in fields
+            if not pd.api.types.is_numeric_dtype(df_inputs[x])
+        ]
+        if len(fields_non_numeric) > 0:
+            raise ValueError(f"Non-numeric fields {fields_non_numeric} must be included in fields_index.")
+
+        # get primaries and baseline
+        primaries = np.sort(df_inputs[field_primary].unique())
+        primary_baseline = primaries[0] if (primary_baseline is None) else primary_baseline
+        if primary_baseline not in primaries:
+            raise KeyError(f"Baseline primary {primary_baseline} not found in df_inputs.")
+
+
+        ##  BUILD BASELINE
+
+        df_base = (
+            df_inputs[df_inputs[field_primary] == primary_baseline]
+            .sort_values(by = fields_index, )
+            .reset_index(drop = True, )
+        )
+        df_index = df_base[fields_index].copy()
+        index_base = pd.MultiIndex.from_frame(df_index, )
+        if not index_base.is_unique:
+            raise ValueError(f"Index fields {fields_index} do not uniquely identify rows in the baseline.")
+
+        arr_baseline = df_base[fields].to_numpy(dtype = np.float64, )
+        n_rows = len(df_index)
+
+
+        ##  GET DELTAS FOR ALL PRIMARIES AT ONCE
+
+        # map rows from each primary to baseline rows
+        vec_row = index_base.get_indexer(
+            pd.MultiIndex.from_frame(df_inputs[fields_index], )
+        )
+        if (vec_row < 0).any():
+            raise ValueError(f"Rows found in df_inputs that are not in the baseline primary {primary_baseline}.")
+
+        vec_pos = np.searchsorted(primaries, df_inputs[field_primary].to_numpy(), )
+        vec_counts = np.bincount(vec_pos, minlength = len(primaries), )
+        if (vec_counts != n_rows).any():
+            raise ValueError(f"All primaries must contain the same {n_rows} index rows as the baseline.")
+
+        arr = df_inputs[fields].to_numpy(dtype = np.float64, )
+        arr_base_rows = arr_baseline[vec_row]
+        arr_same = np.abs(arr - arr_base_rows) <= atol
+        arr_same |= np.isnan(arr) & np.isnan(arr_base_rows)
+        vec_r, vec_c = np.nonzero(~arr_same)
+
+        # sort by primary, row, then column and build offsets for slicing
+        vec_delta_pos = vec_pos[vec_r]
+        vec_delta_row = vec_row[vec_r]
+        vec_order = np.lexsort((vec_c, vec_delta_row, vec_delta_pos, ))
+
+        vec_delta_pos = vec_delta_pos[vec_order]
+        vec_offsets = np.searchsorted(vec_delta_pos, np.arange(len(primaries) + 1), )
+
+
+        ##  SET PROPERTIES
+
+        self.arr_baseline = arr_baseline
+        self.df_index = df_index
+        self.fields = fields
+        self.fields_index = fields_index
+        self.primaries = primaries
+        self.primary_baseline = primary_baseline
+        self.vec_delta_col = vec_c[vec_order].astype(np.int32)
+        self.vec_delta_row = vec_delta_row[vec_order].astype(np.int32)
+        self.vec_delta_value = arr[vec_r, vec_c][vec_order]
+        self.vec_offsets = vec_offsets.astype(np.int64)
+
+        return None
+
+
+
+    ########################
+    #    CORE FUNCTIONS    #
+    ########################
+
+    def get_inputs(self,
+        primaries: Union[int, List[int], None] = None,
+    ) -> pd.DataFrame:
+        """Reconstruct full input tables for one or more primaries. Returns
+            a long DataFrame with the primary key, index fields, and all
+            data fields, with primaries in the order requested (primaries
+            that are requested more than once are repeated).
+
+        Keyword Arguments
+        -----------------
+        primaries : Union[int, List[int], None]
+            Primary or list of primaries to reconstruct. If None,
+            reconstructs all primaries.
+        """
+        primaries = (
+            self.primaries
+            if primaries is None
+            else np.atleast_1d(np.array(primaries, ))
+        )
+
+        # build each primary once, then expand to the requested order
+        primaries_unique, vec_inverse = np.unique(primaries, return_inverse = True, )
+        vec_pos = self.get_primary_positions(primaries_unique, )
+        n_rows = self.arr_baseline.shape[0]
+
+        # tile baseline, then scatter deltas for all requested primaries
+        arr_out = np.tile(self.arr_baseline, (len(vec_pos), 1, ), )
+        vec_block = np.full(len(self.primaries), -1, dtype = np.int64, )
+        vec_block[vec_pos] = np.arange(len(vec_pos), )
+
+        vec_delta_block = np.repeat(vec_block, np.diff(self.vec_offsets), )
+        w = np.where(vec_delta_block >= 0)[0]
+        arr_out[
+            vec_delta_block[w]*n_rows + self.vec_delta_row[w],
+            self.vec_delta_col[w],
+        ] = self.vec_delta_value[w]
+
+        if not np.array_equal(primaries_unique, primaries, ):
+            arr_out = (
+                arr_out
+                .reshape((len(vec_pos), n_rows, -1))[vec_inverse.reshape(-1)]
+                .reshape((len(primaries)*n_rows, -1))
+            )
+
+
+        ##  BUILD OUTPUT
+
+        df_out = pd.concat(
+            [self.df_index]*len(primaries),
+            axis = 0,
+        )
+        df_out.insert(0, self.field_primary, np.repeat(primaries, n_rows, ), )
+        df_out = pd.concat(
+            [
+                df_out.reset_index(drop = True, ),
+                pd.DataFrame(arr_out, columns = self.fields, ),
+            ],
+            axis = 1,
+        )
+
+        return df_out
+
+
+
+    def get_primary_positions(self,
+        primaries: np.ndarray,
+    ) -> np.ndarray:
+        """Get the positions of primaries in self.primaries. Raises a
+            KeyError if any primaries are not found.
+        """
+        vec_pos = np.searchsorted(self.primaries, primaries, )
+        vec_pos = np.clip(vec_pos, 0, len(self.primaries) - 1, )
+        vec_missing = self.primaries[vec_pos] != primaries
+
+        if vec_missing.any():
+            raise KeyError(f"Primaries {list(primaries[vec_missing])} not found in InputDeltaStore.")
+
+        return vec_pos
+
+
+
+    def summarize(self,
+    ) -> pd.DataFrame:
+        """Get the number of changed cells and fields by primary
+        """
+        n_cells = np.diff(self.vec_offsets, )
+        n_fields = [
+            len(np.unique(self.vec_delta_col[i0:i1]))
+            for i0, i1 in zip(self.vec_offsets[0:-1], self.vec_offsets[1:])
+        ]
+
+        df_out = pd.DataFrame(
+            {
+                self.field_primary: self.primaries,
+                "n_cells_changed": n_cells,
+                "n_fields_changed": n_fields,
+            }
+        )
+
+        return df_out
+
+
+
+    ###############
+    #    I/O      #
+    ###############
+
+    @classmethod
+    def load(cls,
+        path: Union[str, pathlib.Path],
+    ) -> "InputDeltaStore":
+        """Load a store saved using InputDeltaStore.save()
+        """
+        with np.load(path, allow_pickle = False, ) as npz:
+
+            field_primary = str(npz["field_primary"])
+            store = cls(None, field_primary = field_primary, )
+
+            fields_index = [str(x) for x in npz["fields_index"]]
+            store.df_index = pd.DataFrame(
+                dict(
+                    (x, npz[f"{_PREFIX_NPZ_INDEX}{x}"])
+                    for x in fields_index
+                )
+            )
+
+            store.arr_baseline = npz["arr_baseline"]
+            store.fields = [str(x) for x in npz["fields"]]
+            store.fields_index = fields_index
+            store.primaries = npz["primaries"]
+            store.primary_baseline = store.primaries[int(npz["pos_baseline"])]
+            store.vec_delta_col = npz["vec_delta_col"]
+            store.vec_delta_row = npz["vec_delta_row"]
+            store.vec_delta_value = npz["vec_delta_value"]
+            store.vec_offsets = npz["vec_offsets"]
+
+        return store
+
+
+
+    def save(self,
+        path: Union[str, pathlib.Path],
+    ) -> None:
+        """Save the store to a compressed .npz archive
+        """
+        # strings are stored as fixed-width unicode so that pickling is not needed
+        dict_index = {}
+        for field in self.fields_index:
+            vec = self.df_index[field]
+            vec = (
+                vec.to_numpy(dtype = str, )
+                if pd.api.types.is_string_dtype(vec) 
+                else vec.to_numpy()
+            )
+            dict_index.update({f"{_PREFIX_NPZ_INDEX}{field}": vec, })
+
+        np.savez_compressed(
+            path,
+            arr_baseline = self.arr_baseline,
+            field_primary = np.array(self.field_primary),
+            fields = np.array(self.fields, dtype = str, ),
+            fields_index = np.array(self.fields_index, dtype = str, ),
+            pos_baseline = np.array(self.get_primary_positions(np.array([self.primary_baseline]))[0]),
+            primaries = self.primaries,
+            vec_delta_col = self.vec_delta_col,
+            vec_delta_row = self.vec_delta_row,
+            vec_delta_value = self.vec_delta_value,
+            vec_offsets = self.vec_offsets,
+            **dict_index,
+        )
+
+        return None
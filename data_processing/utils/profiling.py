@@ -0,0 +1,531 @@
+"""Stage-level timing and memory instrumentation for input builds and model
+    runs. Stages are recorded using spans (context managers or decorators)
+    that capture wall time, thread CPU time, memory, and DataFrame shapes.
+    Records can be sent to a logger (e.g., one configured using
+    logger_utils.setup_clean_logger) and exported to JSON or Chrome trace
+    files (load in chrome://tracing or https://ui.perfetto.dev).
+"""
+import contextlib
+import functools
+import json
+import logging
+import os, os.path
+import pathlib
+import sys
+import threading
+import time
+import tracemalloc
+from typing import *
+
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+# ru_maxrss is reported in bytes on macOS and kilobytes on linux
+_SCALAR_RU_MAXRSS_TO_BYTES = 1 if (sys.platform == "darwin") else 1024
+
+
+
+
+
+########################
+#    SUPPORT CLASSES   #
+########################
+
+class StageRecord:
+    """Store information about a single profiled stage.
+
+    Initialization Arguments
+    ------------------------
+    name : str
+        Name of the stage
+    category : str
+        Stage category (e.g., "read", "merge", "fill", "model")
+    depth : int
+        Nesting depth of the span
+    metadata : Union[dict, None]
+        Optional metadata (e.g., file path) to store with the record
+
+    Recorded properties include cpu_s, the CPU time of the thread that
+        opened the span (work done by other threads, such as a thread
+        pool started inside the span, is not included), and
+        process_peak_rss_bytes, the process's peak resident set size since
+        it started (a high-water mark, not a per-stage peak).
+    """
+
+    __slots__ = (
+        "category",
+        "cpu_s",
+        "depth",
+        "metadata",
+        "name",
+        "peak_tracemalloc_bytes",
+        "process_peak_rss_bytes",
+        "shape_in",
+        "shape_out",
+        "thread_id",
+        "ts_start",
+        "wall_s",
+    )
+
+    def __init__(self,
+        name: str,
+        category: str,
+        depth: int,
+        metadata: Union[dict, None] = None,
+    ) -> None:
+
+        self.category = category
+        self.cpu_s = None
+        self.depth = depth
+        self.metadata = dict(metadata) if isinstance(metadata, dict) else {}
+        self.name = name
+        self.peak_tracemalloc_bytes = None
+        self.process_peak_rss_bytes = None
+        self.shape_in = None
+        self.shape_out = None
+        self.thread_id = threading.get_ident()
+        self.ts_start = None
+        self.wall_s = None
+
+        return None
+
+
+
+    def set_shape(self,
+        obj: Any,
+        which: str = "out",
+    ) -> None:
+        """Set the input or output shape using any object with a .shape
+            property (e.g., a DataFrame or np.ndarray).
+
+        Function Arguments
+        ------------------
+        obj : Any
+            Object with a shape attribute
+
+        Keyword Arguments
+        -----------------
+        which : str
+            "in" or "out"
+        """
+        shape = getattr(obj, "shape", None)
+        shape = tuple(shape) if (shape is not None) else None
+
+        if which == "in":
+            self.shape_in = shape
+        else:
+            self.shape_out = shape
+
+        return None
+
+
+
+    def to_dict(self,
+    ) -> dict:
+        """Convert the record to a dictionary
+        """
+        dict_out = dict((k, getattr(self, k)) for k in self.__slots__)
+
+        return dict_out
+
+
+
+    def to_message(self,
+    ) -> str:
+        """Build a log message for the record
+        """
+        msg = f"[stage] {'  '*self.depth}{self.name}: wall {self.wall_s:.4f}s, cpu {self.cpu_s:.4f}s"
+
+        if self.process_peak_rss_bytes is not None:
+            msg += f", process peak rss {self.process_peak_rss_bytes/1e6:.1f} MB"
+        if self.peak_tracemalloc_bytes is not None:
+            msg += f", peak traced {self.peak_tracemalloc_bytes/1e6:.1f} MB"
+        if self.shape_in is not None:
+            msg += f", shape in {self.shape_in}"
+        if self.shape_out is not None:
+            msg += f", shape out {self.shape_out}"
+
+        return msg
+
+
+
+
+
+class StageProfiler:
+    """Record timing and memory information for stages in a pipeline. Use
+        spans as context managers or decorators:
+
+        profiler = StageProfiler(logger = logger, )
+
+        with profiler.span("read", category = "read", path = path) as rec:
+            df = pd.read_csv(path)
+            rec.set_shape(df)
+
+        @profiler.profile("merge")
+        def f(...):
+            ...
+
+        profiler.to_chrome_trace("build_trace.json")
+
+
+    Initialization Arguments
+    ------------------------
+
+    Optional Arguments
+    ------------------
+    enabled : bool
+        Set to False to turn spans into no-ops (minimal overhead)
+    log_level : int
+        Level at which records are logged
+    logger : Union[logging.Logger, None]
+        Optional logger to send records to (e.g., from
+        logger_utils.setup_clean_logger)
+    trace_memory : bool
+        Use tracemalloc to track peak Python allocations inside each span?
+        Adds overhead; off by default. tracemalloc is process-wide, so
+        when spans are open in several threads, a span's peak includes
+        allocations made by other threads during the span.
+    """
+    def __init__(self,
+        enabled: bool = True,
+        log_level: int = logging.INFO,
+        logger: Union[logging.Logger, None] = None,
+        trace_memory: bool = False,
+    ) -> None:
+
+        self.enabled = enabled
+        self.log_level = log_level
+        self.logger = logger
+        self.records = []
+        self.trace_memory = trace_memory
+
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._thread_state = threading.local()
+
+        # tracemalloc state shared by spans in all threads (guarded by lock)
+        self._dict_peaks_open = {}
+        self._owns_tracemalloc = False
+
+        return None
+
+
+
+    ##################
+    #    SPANNING    #
+    ##################
+
+    @contextlib.contextmanager
+    def span(self,
+        name: str,
+        category: str = "stage",
+        obj_in: Any = None,
+        **kwargs,
+    ) -> Iterator[StageRecord]:
+        """Profile the enclosed block. Yields a StageRecord that can be
+            used to set shapes (see StageRecord.set_shape()).
+
+        Function Arguments
+        ------------------
+        name : str
+            Name of the stage
+
+        Keyword Arguments
+        -----------------
+        category : str
+            Stage category
+        obj_in : Any
+            Optional input object with a .shape property to record
+        **kwargs :
+            Stored as metadata in the record
+        """
+        state = self._get_thread_state()
+        rec = StageRecord(name, category, state.depth, metadata = kwargs, )
+        if not self.enabled:
+            yield rec
+            return None
+
+        if obj_in is not None:
+            rec.set_shape(obj_in, which = "in", )
+
+        if self.trace_memory:
+            key_trace, traced_0 = self._start_trace()
+
+        state.depth += 1
+        rec.ts_start = time.perf_counter() - self._t0
+        # thread CPU time, so spans in concurrent threads are not charged for each other
+        t_cpu_0 = time.thread_time()
+        t_wall_0 = time.perf_counter()
+
+        try:
+            yield rec
+
+        finally:
+            rec.wall_s = time.perf_counter() - t_wall_0
+            rec.cpu_s = time.thread_time() - t_cpu_0
+            rec.process_peak_rss_bytes = get_process_peak_rss_bytes()
+            state.depth -= 1
+
+            if self.trace_memory:
+                rec.peak_tracemalloc_bytes = self._stop_trace(key_trace, traced_0, )
+
+            self._add_record(rec, )
+
+
+
+    def profile(self,
+        name: Union[str, None] = None,
+        category: str = "stage",
+    ) -> Callable:
+        """Decorator to profile a function. If the function returns an
+            object with a shape, it is stored as the output shape.
+
+        Keyword Arguments
+        -----------------
+        name : Union[str, None]
+            Stage name; if None, uses the function's qualified name
+        category : str
+            Stage category
+        """
+        def decorator(func: Callable) -> Callable:
+
+            nm = func.__qualname__ if (name is None) else name
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(nm, category = category, ) as rec:
+                    out = func(*args, **kwargs)
+                    rec.set_shape(out, )
+
+                return out
+
+            return wrapper
+
+        return decorator
+
+
+
+    def _get_thread_state(self,
+    ) -> threading.local:
+        """Get span state (nesting depth) for the current thread; spans can
+            be opened from multiple threads.
+        """
+        state = self._thread_state
+        if not hasattr(state, "depth"):
+            state.depth = 0
+
+        return state
+
+
+
+    def _start_trace(self,
+    ) -> Tuple[object, int]:
+        """Start tracing memory for a span. tracemalloc is process-wide, so
+            it is started by the first open span (in any thread) and
+            stopped when the last one exits. Before the peak is reset, the
+            peak so far is stored for every open span. Returns a tuple of
+            the form
+
+            (key_trace, traced_0)
+
+            where traced_0 is the traced memory at the start of the span.
+        """
+        with self._lock:
+            if (len(self._dict_peaks_open) == 0) and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+
+            traced_0 = self._update_open_peaks()
+
+            key_trace = object()
+            self._dict_peaks_open.update({key_trace: traced_0, })
+
+        return key_trace, traced_0
+
+
+
+    def _stop_trace(self,
+        key_trace: object,
+        traced_0: int,
+    ) -> int:
+        """Stop tracing memory for a span and return the peak traced memory
+            (above traced_0) during the span
+        """
+        with self._lock:
+            self._update_open_peaks()
+            peak = self._dict_peaks_open.pop(key_trace)
+
+            if (len(self._dict_peaks_open) == 0) and self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+
+        out = max(peak - traced_0, 0)
+
+        return out
+
+
+
+    def _update_open_peaks(self,
+    ) -> int:
+        """Store the current tracemalloc peak for all open spans, then reset
+            the peak. Must be called with self._lock held. Returns the
+            current traced memory.
+        """
+        traced, peak = tracemalloc.get_traced_memory()
+        for k, v in self._dict_peaks_open.items():
+            self._dict_peaks_open[k] = max(v, peak)
+
+        tracemalloc.reset_peak()
+
+        return traced
+
+
+
+    def _add_record(self,
+        rec: StageRecord,
+    ) -> None:
+        """Store the record and send it to the logger
+        """
+        with self._lock:
+            self.records.append(rec)
+
+        if self.logger is not None:
+            self.logger.log(self.log_level, rec.to_message(), )
+
+        return None
+
+
+
+    ###################
+    #    EXPORTING    #
+    ###################
+
+    def summarize(self,
+        by: str = "name",
+    ) -> List[dict]:
+        """Aggregate records by name or category. Returns a list of
+            dictionaries, sorted by total wall time (descending), that can
+            be passed to pd.DataFrame.
+
+        Keyword Arguments
+        -----------------
+        by : str
+            "name" or "category"
+        """
+        dict_agg = {}
+        for rec in self.records:
+            key = getattr(rec, by)
+            dict_cur = dict_agg.get(key, {by: key, "n": 0, "wall_s": 0.0, "cpu_s": 0.0, })
+            dict_cur["n"] += 1
+            dict_cur["wall_s"] += rec.wall_s
+            dict_cur["cpu_s"] += rec.cpu_s
+            dict_agg.update({key: dict_cur, })
+
+        list_out = sorted(dict_agg.values(), key = lambda x: -x["wall_s"])
+
+        return list_out
+
+
+
+    def to_chrome_trace(self,
+        path: Union[str, pathlib.Path],
+    ) -> None:
+        """Export records to a Chrome trace (Trace Event Format) file.
+        """
+        pid = os.getpid()
+        events = []
+
+        for rec in self.records:
+            args = dict(rec.metadata)
+            args.update(
+                {
+                    "cpu_s": rec.cpu_s,
+                    "peak_tracemalloc_bytes": rec.peak_tracemalloc_bytes,
+                    "process_peak_rss_bytes": rec.process_peak_rss_bytes,
+                    "shape_in": rec.shape_in,
+                    "shape_out": rec.shape_out,
+                }
+            )
+
+            events.append(
+                {
+                    "name": rec.name,
+                    "cat": rec.category,
+                    "ph": "X",
+                    "ts": rec.ts_start*1e6,
+                    "dur": rec.wall_s*1e6,
+                    "pid": pid,
+                    "tid": rec.thread_id,
+                    "args": args,
+                }
+            )
+
+        with open(path, "w") as fp:
+            json.dump({"traceEvents": events, }, fp, default = str, )
+
+        return None
+
+
+
+    def to_json(self,
+        path: Union[str, pathlib.Path],
+    ) -> None:
+        """Export records to a JSON file.
+        """
+        with open(path, "w") as fp:
+            json.dump(
+                [x.to_dict() for x in self.records],
+                fp,
+                default = str,
+                indent = 2,
+            )
+
+        return None
+
+
+
+
+
+##########################
+#    DEFINE FUNCTIONS    #
+##########################
+
+def get_process_peak_rss_bytes(
+) -> Union[int, None]:
+    """Get the peak resident set size of the current process in bytes since
+        it started. Returns None if unavailable on the platform.
+    """
+    if resource is None:
+        return None
+
+    out = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    out *= _SCALAR_RU_MAXRSS_TO_BYTES
+
+    return out
+
+
+
+def get_profiler(
+    profiler: Union[StageProfiler, None],
+) -> StageProfiler:
+    """Return the profiler if valid; otherwise, return a disabled profiler
+        so that spans can be used unconditionally.
+    """
+    out = (
+        profiler
+        if isinstance(profiler, StageProfiler)
+        else StageProfiler(enabled = False, )
+    )
+
+    return out
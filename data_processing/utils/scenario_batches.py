@@ -0,0 +1,417 @@
+"""Checkpointed, resumable scenario batches. Each primary (design,
+    strategy, future) is run and written on its own, and completion is
+    recorded in a manifest within the run directory. On restart, primaries
+    that are complete are skipped, so a crash or preemption only loses the
+    primaries in flight.
+
+    Run directory layout
+    --------------------
+    <path_run>/
+        ATTRIBUTE_PRIMARY.csv
+        MANIFEST_PRIMARY.csv
+        primaries/primary_<id>.csv
+        <dirname>.csv               (written by combine())
+
+    Example
+    -------
+    df_primary = ssp.odpt_primary.get_indexing_dataframe(primaries)
+    manager = ScenarioBatchManager(
+        path_run,
+        df_primary,
+        runner = make_sisepuede_runner(ssp, include_electricity_in_energy = True, ),
+    )
+    df_manifest = manager.run()
+    df_out = manager.combine()
+"""
+import concurrent.futures as cf
+import pandas as pd
+import pathlib
+import time
+import traceback
+import warnings
+from typing import *
+
+try:
+    import utils.shared_support as shs
+except ModuleNotFoundError:
+    import shared_support as shs
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+# file names in run directory
+_DIR_PRIMARIES = "primaries"
+_FN_ATTRIBUTE_PRIMARY = "ATTRIBUTE_PRIMARY.csv"
+_FN_MANIFEST = "MANIFEST_PRIMARY.csv"
+_FN_PRIMARY = "primary_{}.csv"
+
+# fields
+_FIELD_ERROR = "error"
+_FIELD_N_ROWS = "n_rows"
+_FIELD_PATH_OUTPUT = "path_output"
+_FIELD_PRIMARY = "primary_id"
+_FIELD_REGION = "region"
+_FIELD_STATUS = "status"
+_FIELD_TIME_S = "time_s"
+_FIELD_TIMESTAMP = "timestamp"
+_FIELDS_MANIFEST = [
+    _FIELD_PRIMARY,
+    _FIELD_STATUS,
+    _FIELD_PATH_OUTPUT,
+    _FIELD_N_ROWS,
+    _FIELD_TIME_S,
+    _FIELD_TIMESTAMP,
+    _FIELD_ERROR,
+]
+
+# statuses
+_STATUS_COMPLETE = "complete"
+_STATUS_FAILED = "failed"
+
+# key of the runner in worker state (see shared_support.initialize_worker())
+_KEY_RUNNER = "runner"
+
+
+
+
+
+########################
+#    PRIMARY CLASS     #
+########################
+
+class ScenarioBatchManager:
+    """Run primaries one at a time (or in parallel), writing each primary's
+        results atomically and recording completion in a manifest.
+
+    Initialization Arguments
+    ------------------------
+    path_run : Union[str, pathlib.Path]
+        Run directory (created if it does not exist)
+    df_attribute_primary : Union[pd.DataFrame, None]
+        Primary attribute table (primary_id, design_id, strategy_id,
+        future_id). If None, reads ATTRIBUTE_PRIMARY.csv from path_run
+
+    Optional Arguments
+    ------------------
+    build_runner : Union[Callable[[], Callable[[int], pd.DataFrame]], None]
+        Function that returns a runner. Called once per worker process, so
+        models stay warm. Must be picklable (defined at module level).
+        Required if n_workers > 1
+    n_workers : int
+        Number of worker processes; if 1, runs in the current process
+    runner : Union[Callable[[int], pd.DataFrame], None]
+        Function that runs a primary and returns its output (e.g., from
+        make_sisepuede_runner()). Used if n_workers = 1
+    """
+    def __init__(self,
+        path_run: Union[str, pathlib.Path],
+        df_attribute_primary: Union[pd.DataFrame, None] = None,
+        build_runner: Union[Callable[[], Callable[[int], pd.DataFrame]], None] = None,
+        n_workers: int = 1,
+        runner: Union[Callable[[int], pd.DataFrame], None] = None,
+    ) -> None:
+
+        self.build_runner = build_runner
+        self.n_workers = n_workers
+        self.runner = runner
+
+        self._initialize_paths(path_run, )
+        self._initialize_primaries(df_attribute_primary, )
+
+        return None
+
+
+
+    ########################
+    #    INITIALIZATION    #
+    ########################
+
+    def _initialize_paths(self,
+        path_run: Union[str, pathlib.Path],
+    ) -> None:
+        """Set paths in the run directory. Sets the following properties:
+
+            * self.dir_primaries
+            * self.path_attribute_primary
+            * self.path_manifest
+            * self.path_run
+        """
+        path_run = pathlib.Path(path_run)
+        dir_primaries = path_run.joinpath(_DIR_PRIMARIES)
+        dir_primaries.mkdir(parents = True, exist_ok = True, )
+
+        self.dir_primaries = dir_primaries
+        self.path_attribute_primary = path_run.joinpath(_FN_ATTRIBUTE_PRIMARY)
+        self.path_manifest = path_run.joinpath(_FN_MANIFEST)
+        self.path_run = path_run
+
+        return None
+
+
+
+    def _initialize_primaries(self,
+        df_attribute_primary: Union[pd.DataFrame, None],
+    ) -> None:
+        """Set the primary attribute table, writing it to the run directory
+            if needed. Sets the following properties:
+
+            * self.df_attribute_primary
+            * self.primaries
+        """
+        if df_attribute_primary is None:
+            if not self.path_attribute_primary.is_file():
+                raise RuntimeError(f"No df_attribute_primary specified and {self.path_attribute_primary} not found.")
+            df_attribute_primary = pd.read_csv(self.path_attribute_primary, )
+
+        else:
+            shs.write_csv_atomic(df_attribute_primary, self.path_attribute_primary, )
+
+        self.df_attribute_primary = df_attribute_primary
+        self.primaries = sorted(int(x) for x in df_attribute_primary[_FIELD_PRIMARY].unique())
+
+        return None
+
+
+
+    ########################
+    #    CORE FUNCTIONS    #
+    ########################
+
+    def combine(self,
+        write: bool = True,
+    ) -> pd.DataFrame:
+        """Combine outputs of all complete primaries into a single run
+            output, optionally written to <path_run>/<dirname>.csv. Raises
+            an error if any primaries are incomplete.
+        """
+        primaries_pending = self.get_pending_primaries()
+        if len(primaries_pending) > 0:
+            raise RuntimeError(f"Unable to combine outputs: {len(primaries_pending)} primaries are incomplete.")
+
+        df_manifest = self.read_manifest().set_index(_FIELD_PRIMARY, )
+        df_out = pd.concat(
+            [
+                pd.read_csv(self.path_run.joinpath(df_manifest.loc[x, _FIELD_PATH_OUTPUT]), )
+                for x in self.primaries
+            ],
+            axis = 0,
+        ).reset_index(drop = True, )
+
+        if write:
+            shs.write_csv_atomic(df_out, self.path_run.joinpath(f"{self.path_run.name}.csv"), )
+
+        return df_out
+
+
+
+    def get_pending_primaries(self,
+    ) -> List[int]:
+        """Get primaries that are not complete. A primary is complete if the
+            manifest says so and its output file exists.
+        """
+        df_manifest = self.read_manifest()
+        df_complete = df_manifest[df_manifest[_FIELD_STATUS] == _STATUS_COMPLETE]
+
+        primaries_complete = set(
+            x for x, path in zip(df_complete[_FIELD_PRIMARY], df_complete[_FIELD_PATH_OUTPUT])
+            if self.path_run.joinpath(path).is_file()
+        )
+        list_out = [x for x in self.primaries if x not in primaries_complete]
+
+        return list_out
+
+
+
+    def read_manifest(self,
+    ) -> pd.DataFrame:
+        """Read the manifest. Returns an empty manifest if none exists.
+        """
+        if not self.path_manifest.is_file():
+            return pd.DataFrame(columns = _FIELDS_MANIFEST, )
+
+        df_out = pd.read_csv(self.path_manifest, )
+
+        return df_out
+
+
+
+    def run(self,
+        primaries: Union[List[int], None] = None,
+        retry_failed: bool = True,
+        stop_on_error: bool = False,
+    ) -> pd.DataFrame:
+        """Run all pending primaries, skipping those that are complete.
+            The manifest is updated (atomically) as each primary finishes.
+            Returns the manifest.
+
+        Keyword Arguments
+        -----------------
+        primaries : Union[List[int], None]
+            Optional subset of primaries to run
+        retry_failed : bool
+            Rerun primaries that failed in a previous run?
+        stop_on_error : bool
+            Raise errors? If False, failures are recorded in the manifest
+            and the batch continues
+        """
+        df_manifest = self.read_manifest()
+        primaries_failed = set(df_manifest[df_manifest[_FIELD_STATUS] == _STATUS_FAILED][_FIELD_PRIMARY])
+
+        primaries_run = [
+            x for x in self.get_pending_primaries()
+            if ((primaries is None) or (x in primaries))
+            and (retry_failed or (x not in primaries_failed))
+        ]
+        if len(primaries_run) == 0:
+            return df_manifest
+
+        dict_manifest = dict(
+            (x, row) for x, row in zip(df_manifest[_FIELD_PRIMARY], df_manifest.to_dict("records"))
+        )
+
+
+        ##  RUN PRIMARIES
+
+        if self.n_workers <= 1:
+            if self.runner is None:
+                if self.build_runner is None:
+                    raise RuntimeError(f"Specify runner or build_runner to run primaries.")
+                self.runner = self.build_runner()
+
+            shs.set_worker_state({_KEY_RUNNER: self.runner, })
+            iterator = (_run_primary_worker(x, self.dir_primaries, ) for x in primaries_run)
+            executor = None
+
+        else:
+            if self.build_runner is None:
+                raise RuntimeError(f"build_runner must be specified if n_workers > 1.")
+
+            executor = cf.ProcessPoolExecutor(
+                max_workers = self.n_workers,
+                initializer = shs.initialize_worker,
+                initargs = (self.build_runner, None, _KEY_RUNNER, ),
+            )
+            futures = [
+                executor.submit(_run_primary_worker, x, self.dir_primaries, )
+                for x in primaries_run
+            ]
+            iterator = (x.result() for x in cf.as_completed(futures))
+
+        try:
+            for record in iterator:
+                # store paths relative to the run directory so it can be moved
+                if record.get(_FIELD_PATH_OUTPUT) is not None:
+                    record[_FIELD_PATH_OUTPUT] = str(pathlib.Path(record.get(_FIELD_PATH_OUTPUT)).relative_to(self.path_run))
+
+                dict_manifest.update({record.get(_FIELD_PRIMARY): record, })
+                self._write_manifest(dict_manifest, )
+
+                if record.get(_FIELD_STATUS) == _STATUS_FAILED:
+                    msg = f"Primary {record.get(_FIELD_PRIMARY)} failed: {record.get(_FIELD_ERROR)}"
+                    if stop_on_error:
+                        raise RuntimeError(msg)
+                    warnings.warn(msg)
+
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures = True, )
+
+        df_out = self.read_manifest()
+
+        return df_out
+
+
+
+    def _write_manifest(self,
+        dict_manifest: Dict[int, dict],
+    ) -> None:
+        """Write the manifest atomically
+        """
+        df_manifest = (
+            pd.DataFrame(list(dict_manifest.values()), columns = _FIELDS_MANIFEST, )
+            .sort_values(by = [_FIELD_PRIMARY], )
+            .reset_index(drop = True, )
+        )
+        shs.write_csv_atomic(df_manifest, self.path_manifest, )
+
+        return None
+
+
+
+
+
+##########################
+#    DEFINE FUNCTIONS    #
+##########################
+
+def make_sisepuede_runner(
+    ssp: "SISEPUEDE",
+    **kwargs,
+) -> Callable[[int], pd.DataFrame]:
+    """Build a runner that generates inputs for a primary from a SISEPUEDE
+        object and runs its models. kwargs are passed to the models (e.g.,
+        include_electricity_in_energy).
+    """
+    def runner(primary_id: int, ) -> pd.DataFrame:
+        dict_inputs = ssp.generate_scenario_database_from_primary_key(primary_id, )
+
+        dfs = []
+        for region, df_input in dict_inputs.items():
+            df_output = ssp.models(df_input, **kwargs, )
+            if ssp.key_primary not in df_output.columns:
+                df_output.insert(0, ssp.key_primary, primary_id, )
+            if _FIELD_REGION not in df_output.columns:
+                df_output.insert(1, _FIELD_REGION, region, )
+            dfs.append(df_output)
+
+        df_out = pd.concat(dfs, axis = 0, ).reset_index(drop = True, )
+
+        return df_out
+
+    return runner
+
+
+
+def _run_primary_worker(
+    primary_id: int,
+    dir_primaries: pathlib.Path,
+) -> dict:
+    """Run a primary, write its output atomically, and return a manifest
+        record
+    """
+    t0 = time.time()
+    record = {
+        _FIELD_PRIMARY: primary_id,
+        _FIELD_PATH_OUTPUT: None,
+        _FIELD_N_ROWS: 0,
+        _FIELD_ERROR: None,
+    }
+
+    try:
+        df_out = shs.get_worker_state(_KEY_RUNNER)(primary_id, )
+        path_out = pathlib.Path(dir_primaries).joinpath(_FN_PRIMARY.format(primary_id))
+        shs.write_csv_atomic(df_out, path_out, )
+
+        record.update({
+            _FIELD_PATH_OUTPUT: str(path_out),
+            _FIELD_N_ROWS: len(df_out),
+            _FIELD_STATUS: _STATUS_COMPLETE,
+        })
+
+    except Exception as e:
+        record.update({
+            _FIELD_ERROR: "".join(traceback.format_exception_only(type(e), e, )).strip(),
+            _FIELD_STATUS: _STATUS_FAILED,
+        })
+
+    record.update({
+        _FIELD_TIME_S: time.time() - t0,
+        _FIELD_TIMESTAMP: pd.Timestamp.now().isoformat(),
+    })
+
+    return record
@@ -0,0 +1,576 @@
+"""One-at-a-time (OAT) and Morris sensitivity of SISEPUEDE outputs to input
+    variable groups. Groups are scaled as a unit (e.g., trajectory groups
+    from examples("variable_trajectory_group_specification")), so the
+    number of runs grows with the number of groups, not variables. Input
+    tables for a whole design are built as one (run, time_period, field)
+    array, runs are evaluated in parallel by workers with warm models, and
+    the baseline is run once and reused.
+
+    Example
+    -------
+    df_input = cdn._build_from_outputs(years_required, )
+    dict_groups = get_variable_groups(examples("variable_trajectory_group_specification"), df_input.columns, )
+    sa = SensitivityAnalysis(df_input, dict_groups, n_workers = 8, )
+
+    # share one pool of warm workers across designs
+    with sa.build_executor() as executor:
+        df_elast = sa.run_oat(delta = 0.1, executor = executor, )
+        df_morris = sa.run_morris(n_trajectories = 10, seed = 1, executor = executor, )
+"""
+import concurrent.futures as cf
+import contextlib
+import numpy as np
+import pandas as pd
+import re
+from typing import *
+
+try:
+    import utils.shared_support as shs
+except ModuleNotFoundError:
+    import shared_support as shs
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+# fields in trajectory group specification
+_FIELD_TRAJGROUP = "variable_trajectory_group"
+_FIELD_VARIABLE = "variable"
+
+# output fields
+_FIELD_ELASTICITY = "elasticity"
+_FIELD_GROUP = "group"
+_FIELD_MU = "mu"
+_FIELD_MU_STAR = "mu_star"
+_FIELD_OUTPUT = "output"
+_FIELD_SIGMA = "sigma"
+_FIELD_TIME_PERIOD = "time_period"
+_FIELD_YEAR = "year"
+
+# default outputs
+_REGEX_OUTPUTS = re.compile(r"^emission_co2e_subsector_total_")
+
+
+
+
+
+
+########################
+#    PRIMARY CLASS     #
+########################
+
+class SensitivityAnalysis:
+    """Estimate the sensitivity of outputs to input variable groups. For
+        group g scaled by s, the elasticity of output k in time period t is
+
+        e[g, t, k] = ((y_g[t, k] - y_0[t, k])/y_0[t, k])/(s - 1)
+
+        where y_0 is the baseline output.
+
+    Initialization Arguments
+    ------------------------
+    df_input : pd.DataFrame
+        Input table for one region (one row per time period; e.g., from
+        common_data_needs._build_from_outputs())
+    dict_groups : Dict[str, List[str]]
+        Dictionary mapping group names to input fields (see
+        get_variable_groups())
+
+    Optional Arguments
+    ------------------
+    build_models : Union[Callable[[], Callable], None]
+        Function that returns a model callable (e.g., SISEPUEDEModels).
+        Called once in the current process (which runs the baseline) and 
+        once per worker, so models stay warm. Must be picklable (defined at
+        module level) if n_workers > 1. If None, uses the models in 
+        common_data_needs
+    dict_models_kwargs : Union[dict, None]
+        Optional keyword arguments passed to the models on each run
+    fields_output : Union[List[str], None]
+        Output fields to report. If None, uses all
+        emission_co2e_subsector_total_* fields in the baseline output
+    n_workers : int
+        Number of worker processes; if 1, runs in the current process. If
+        no executor is passed to a design, one pool is created for the 
+        design
+    time_period_start : int
+        First time period that is perturbed; earlier (historical) periods
+        are left unchanged
+    year_0 : Union[int, None]
+        Year of time period 0. If None, uses shared_support.get_year_0()
+    """
+    def __init__(self,
+        df_input: pd.DataFrame,
+        dict_groups: Dict[str, List[str]],
+        build_models: Union[Callable[[], Callable], None] = None,
+        dict_models_kwargs: Union[dict, None] = None,
+        fields_output: Union[List[str], None] = None,
+        n_workers: int = 1,
+        time_period_start: int = 0,
+        year_0: Union[int, None] = None,
+    ) -> None:
+
+        self.build_models = shs.build_models_default if (build_models is None) else build_models
+        self.df_input = df_input.sort_values(by = [_FIELD_TIME_PERIOD], ).reset_index(drop = True, )
+        self.dict_models_kwargs = {} if not isinstance(dict_models_kwargs, dict) else dict_models_kwargs
+        self.fields_output = fields_output
+        self.n_workers = n_workers
+        self.time_period_start = time_period_start
+        self.year_0 = shs.get_year_0() if (year_0 is None) else year_0
+
+        # baseline output (run on first use)
+        self.arr_baseline = None
+
+        self._initialize_groups(dict_groups, )
+
+        return None
+
+
+
+    def _initialize_groups(self,
+        dict_groups: Dict[str, List[str]],
+    ) -> None:
+        """Resolve group fields. Sets the following properties:
+
+            * self.arr_group_to_field
+            * self.fields_perturbed
+            * self.groups
+            * self.vec_mask_time
+        """
+        fields_input = set(self.df_input.columns)
+        dict_field_to_group = {}
+        groups = []
+
+        for group, fields in dict_groups.items():
+            fields = [x for x in fields if x in fields_input]
+            if len(fields) == 0:
+                continue
+
+            fields_dup = [x for x in fields if x in dict_field_to_group]
+            if len(fields_dup) > 0:
+                raise ValueError(f"Fields {fields_dup} are assigned to more than one group.")
+
+            dict_field_to_group.update(dict((x, len(groups)) for x in fields))
+            groups.append(group)
+
+        if len(groups) == 0:
+            raise ValueError(f"No group fields found in df_input.")
+
+        fields_perturbed = sorted(dict_field_to_group.keys())
+        arr_group_to_field = np.zeros((len(groups), len(fields_perturbed)), )
+        arr_group_to_field[[dict_field_to_group.get(x) for x in fields_perturbed], np.arange(len(fields_perturbed))] = 1.0
+
+        self.arr_group_to_field = arr_group_to_field
+        self.fields_perturbed = fields_perturbed
+        self.groups = groups
+        self.vec_mask_time = (self.df_input[_FIELD_TIME_PERIOD].to_numpy() >= self.time_period_start)
+
+        return None
+
+
+
+    ########################
+    #    CORE FUNCTIONS    #
+    ########################
+
+    def build_executor(self,
+    ) -> cf.ProcessPoolExecutor:
+        """Build a pool of n_workers processes with warm models for this 
+            analysis. The baseline is run first (in the current process) so
+            that output fields are known. Pass the pool to any number of 
+            designs to reuse the workers; the caller is responsible for 
+            shutting it down (e.g., use as a context manager).
+        """
+        self.run_baseline()
+
+        executor = cf.ProcessPoolExecutor(
+            max_workers = max(self.n_workers, 1),
+            initializer = _initialize_worker,
+            initargs = (self.build_models, self.fields_output, self.dict_models_kwargs, ),
+        )
+
+        return executor
+
+
+
+    def build_inputs_batch(self,
+        arr_scalars: np.ndarray,
+    ) -> List[pd.DataFrame]:
+        """Build input tables for a design (run, group) of group scalars.
+            Perturbed fields for all runs are calculated at once as a (run,
+            time_period, field) array.
+        """
+        arr_base = self.df_input[self.fields_perturbed].to_numpy(dtype = float, )
+        arr_mult = np.asarray(arr_scalars, dtype = float, ) @ self.arr_group_to_field
+        arr_mult = 1.0 + (arr_mult[:, None, :] - 1.0)*self.vec_mask_time[None, :, None]
+        arr_perturbed = arr_base[None, :, :]*arr_mult
+
+        list_out = []
+        for arr in arr_perturbed:
+            df = self.df_input.copy()
+            df[self.fields_perturbed] = arr
+            list_out.append(df)
+
+        return list_out
+
+
+
+    def run_baseline(self,
+    ) -> np.ndarray:
+        """Run the baseline in the current process (only once) and return 
+            its (time_period, output) array. If fields_output was not 
+            specified, output fields are set from the baseline output.
+        """
+        if self.arr_baseline is not None:
+            return self.arr_baseline
+
+        _initialize_worker(self.build_models, self.fields_output, self.dict_models_kwargs, )
+        df_output = shs.get_worker_state("models")(self.df_input, **self.dict_models_kwargs, )
+
+        if self.fields_output is None:
+            self.fields_output = [x for x in df_output.columns if _REGEX_OUTPUTS.match(x) is not None]
+
+        self.arr_baseline = _get_output_array(df_output, self.fields_output, )
+
+        return self.arr_baseline
+
+
+
+    def run_design(self,
+        arr_scalars: np.ndarray,
+        executor: Union[cf.Executor, None] = None,
+    ) -> np.ndarray:
+        """Run a design (run, group) of group scalars and return outputs as
+            a (run, time_period, output) array. The baseline is run once
+            and reused for any runs with all scalars equal to 1.
+
+        Function Arguments
+        ------------------
+        arr_scalars : np.ndarray
+            Design of group scalars
+
+        Keyword Arguments
+        -----------------
+        executor : Union[cf.Executor, None]
+            Optional executor from build_executor(). If None and 
+            n_workers > 1, a pool is created for this design
+        """
+        arr_scalars = np.atleast_2d(arr_scalars)
+        vec_base = np.all(arr_scalars == 1.0, axis = 1, )
+        w_run = np.where(~vec_base)[0]
+
+        self.run_baseline()
+
+        arr_out = np.tile(self.arr_baseline[None, :, :], (len(arr_scalars), 1, 1), )
+        if len(w_run) > 0:
+            arr_out[w_run] = self._run_inputs(
+                self.build_inputs_batch(arr_scalars[w_run]), 
+                executor = executor,
+            )
+
+        return arr_out
+
+
+
+    def run_morris(self,
+        n_trajectories: int = 10,
+        n_levels: int = 4,
+        scalar_max: float = 1.2,
+        scalar_min: float = 0.8,
+        seed: Union[int, None] = None,
+        executor: Union[cf.Executor, None] = None,
+    ) -> pd.DataFrame:
+        """Run a Morris screening design with n_trajectories*(n_groups + 1)
+            runs. Elementary effects are calculated as elasticities (see
+            class docstring). Returns a long DataFrame with group, time
+            period, year, output, mu, mu_star (mean absolute effect), and
+            sigma.
+
+        Keyword Arguments
+        -----------------
+        n_trajectories : int
+            Number of Morris trajectories
+        n_levels : int
+            Number of grid levels in each group's range (even)
+        scalar_max : float
+            Maximum group scalar
+        scalar_min : float
+            Minimum group scalar
+        seed : Union[int, None]
+            Random seed
+        executor : Union[cf.Executor, None]
+            Optional executor from build_executor() (see run_design())
+        """
+        n_groups = len(self.groups)
+        arr_design, arr_step_group = build_morris_design(
+            n_groups,
+            n_trajectories,
+            n_levels = n_levels,
+            seed = seed,
+        )
+        arr_scalars = scalar_min + arr_design*(scalar_max - scalar_min)
+
+        arr_out = self.run_design(arr_scalars.reshape((-1, n_groups)), executor = executor, )
+        arr_out = arr_out.reshape((n_trajectories, n_groups + 1) + arr_out.shape[1:])
+
+
+        ##  ELEMENTARY EFFECTS -- (trajectory, step, time_period, output)
+
+        with np.errstate(divide = "ignore", invalid = "ignore", ):
+            arr_rel = np.diff(arr_out, axis = 1, )/self.arr_baseline[None, None, :, :]
+
+        vec_r = np.repeat(np.arange(n_trajectories), n_groups, )
+        vec_s = np.tile(np.arange(n_groups), n_trajectories, )
+        vec_g = arr_step_group.reshape(-1)
+        vec_ds = (
+            arr_scalars[vec_r, vec_s + 1, vec_g]
+            - arr_scalars[vec_r, vec_s, vec_g]
+        )
+
+        # reorder effects by group: (trajectory, group, time_period, output)
+        arr_ee = np.zeros((n_trajectories, n_groups) + arr_rel.shape[2:], )
+        arr_ee[vec_r, vec_g] = arr_rel[vec_r, vec_s]/vec_ds[:, None, None]
+
+        df_out = self._build_long(
+            {
+                _FIELD_MU: np.nanmean(arr_ee, axis = 0, ),
+                _FIELD_MU_STAR: np.nanmean(np.abs(arr_ee), axis = 0, ),
+                _FIELD_SIGMA: np.nanstd(arr_ee, axis = 0, ),
+            }
+        )
+
+        return df_out
+
+
+
+    def run_oat(self,
+        delta: float = 0.1,
+        two_sided: bool = False,
+        executor: Union[cf.Executor, None] = None,
+    ) -> pd.DataFrame:
+        """Run a one-at-a-time design where each group is scaled by
+            1 + delta (and 1 - delta if two_sided). Returns a long DataFrame
+            with group, time period, year, output, and elasticity. If
+            two_sided, elasticities are central differences. The design has
+            n_groups (2*n_groups if two_sided) runs plus the baseline. An
+            optional executor from build_executor() can be passed (see 
+            run_design()).
+        """
+        n_groups = len(self.groups)
+        arr_scalars = 1.0 + delta*np.eye(n_groups, )
+        if two_sided:
+            arr_scalars = np.concatenate([arr_scalars, 1.0 - delta*np.eye(n_groups, )], axis = 0, )
+
+        arr_out = self.run_design(arr_scalars, executor = executor, )
+
+        with np.errstate(divide = "ignore", invalid = "ignore", ):
+            arr_diff = (
+                (arr_out[0:n_groups] - arr_out[n_groups:])/(2.0*delta)
+                if two_sided
+                else (arr_out - self.arr_baseline[None, :, :])/delta
+            )
+            arr_elast = arr_diff/self.arr_baseline[None, :, :]
+
+        df_out = self._build_long({_FIELD_ELASTICITY: arr_elast, })
+
+        return df_out
+
+
+
+    def _build_long(self,
+        dict_arrays: Dict[str, np.ndarray],
+    ) -> pd.DataFrame:
+        """Convert (group, time_period, output) arrays to a long DataFrame
+        """
+        vec_tp = self.df_input[_FIELD_TIME_PERIOD].to_numpy()
+        n_groups, n_tp, n_out = (len(self.groups), len(vec_tp), len(self.fields_output))
+
+        df_out = pd.DataFrame(
+            {
+                _FIELD_GROUP: np.repeat(self.groups, n_tp*n_out, ),
+                _FIELD_TIME_PERIOD: np.tile(np.repeat(vec_tp, n_out, ), n_groups, ),
+                _FIELD_YEAR: np.tile(np.repeat(vec_tp + self.year_0, n_out, ), n_groups, ),
+                _FIELD_OUTPUT: np.tile(self.fields_output, n_groups*n_tp, ),
+            }
+        )
+        for field, arr in dict_arrays.items():
+            df_out[field] = arr.reshape(-1)
+
+        return df_out
+
+
+
+    def _run_inputs(self,
+        list_inputs: List[pd.DataFrame],
+        executor: Union[cf.Executor, None] = None,
+    ) -> np.ndarray:
+        """Run input tables and return a (run, time_period, output) array.
+            Requires the baseline to have been run (see run_baseline()).
+        """
+        if (executor is None) and (self.n_workers <= 1):
+            _initialize_worker(self.build_models, self.fields_output, self.dict_models_kwargs, )
+            list_out = [_evaluate_worker(x) for x in list_inputs]
+
+        else:
+            context = (
+                self.build_executor()
+                if executor is None
+                else contextlib.nullcontext(executor, )
+            )
+            with context as executor:
+                list_out = list(executor.map(_evaluate_worker, list_inputs, ))
+
+        arr_out = np.stack(list_out, axis = 0, )
+
+        return arr_out
+
+
+
+
+
+##########################
+#    DEFINE FUNCTIONS    #
+##########################
+
+def build_morris_design(
+    n_groups: int,
+    n_trajectories: int,
+    n_levels: int = 4,
+    seed: Union[int, None] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Build Morris trajectories in [0, 1]^n_groups. Each trajectory has
+        n_groups + 1 points and changes one group (in random order) by
+        delta = n_levels/(2*(n_levels - 1)) at each step. Returns a tuple
+        of the form
+
+        (arr_design, arr_step_group)
+
+        where arr_design has shape (trajectory, point, group) and
+        arr_step_group has shape (trajectory, step) and gives the group
+        changed at each step.
+    """
+    rng = np.random.default_rng(seed, )
+    delta = n_levels/(2.0*(n_levels - 1))
+
+    # base points on the lower part of the grid so that x + delta <= 1
+    vec_levels = np.arange(n_levels)/(n_levels - 1)
+    vec_levels = vec_levels[vec_levels + delta <= 1.0 + 1e-12]
+    arr_x0 = rng.choice(vec_levels, size = (n_trajectories, n_groups), )
+
+    # random order and direction for each trajectory
+    arr_step_group = np.argsort(rng.random((n_trajectories, n_groups)), axis = 1, )
+    arr_sign = rng.choice([-1.0, 1.0], size = (n_trajectories, n_groups), )
+    arr_x0 = np.where(arr_sign < 0, arr_x0 + delta, arr_x0, )
+
+    # cumulative changes along each trajectory
+    arr_steps = np.zeros((n_trajectories, n_groups + 1, n_groups), )
+    vec_r = np.repeat(np.arange(n_trajectories), n_groups, )
+    vec_s = np.tile(np.arange(n_groups), n_trajectories, )
+    vec_g = arr_step_group.reshape(-1)
+    arr_steps[vec_r, vec_s + 1, vec_g] = delta*arr_sign[vec_r, vec_g]
+
+    arr_design = arr_x0[:, None, :] + np.cumsum(arr_steps, axis = 1, )
+
+    return arr_design, arr_step_group
+
+
+
+def get_variable_groups(
+    df_trajgroup: pd.DataFrame,
+    fields_input: List[str],
+    include_ungrouped: bool = False,
+) -> Dict[str, List[str]]:
+    """Build a dictionary mapping groups to input fields from a trajectory
+        group specification (variable, variable_trajectory_group).
+
+    Function Arguments
+    ------------------
+    df_trajgroup : pd.DataFrame
+        Trajectory group specification
+    fields_input : List[str]
+        Fields in the input table
+
+    Keyword Arguments
+    -----------------
+    include_ungrouped : bool
+        Include input fields with no group as their own groups?
+    """
+    fields_input = list(fields_input)
+    set_input = set(fields_input)
+    dict_out = {}
+
+    df = df_trajgroup[[_FIELD_VARIABLE, _FIELD_TRAJGROUP]].dropna()
+    for group, df_group in df.groupby(_FIELD_TRAJGROUP, sort = True, ):
+        fields = [x for x in df_group[_FIELD_VARIABLE] if x in set_input]
+        if len(fields) > 0:
+            dict_out.update({f"trajgroup_{int(group)}": fields, })
+
+    if include_ungrouped:
+        fields_grouped = set(sum(dict_out.values(), []))
+        fields_ungrouped = [
+            x for x in fields_input
+            if (x not in fields_grouped) and (x != _FIELD_TIME_PERIOD)
+        ]
+        dict_out.update(dict((x, [x]) for x in fields_ungrouped))
+
+    return dict_out
+
+
+
+
+
+##########################
+#    WORKER FUNCTIONS    #
+##########################
+
+def _evaluate_worker(
+    df_input: pd.DataFrame,
+) -> np.ndarray:
+    """Run models on an input table and return outputs as a (time_period,
+        output) array
+    """
+    df_output = shs.get_worker_state("models")(df_input, **shs.get_worker_state("dict_models_kwargs"), )
+    arr_out = _get_output_array(df_output, shs.get_worker_state("fields_output"), )
+
+    return arr_out
+
+
+
+def _get_output_array(
+    df_output: pd.DataFrame,
+    fields_output: List[str],
+) -> np.ndarray:
+    """Get a (time_period, output) array from a model output
+    """
+    arr_out = (
+        df_output
+        .sort_values(by = [_FIELD_TIME_PERIOD], )
+        .reindex(columns = fields_output, )
+        .to_numpy(dtype = float, )
+    )
+
+    return arr_out
+
+
+
+def _initialize_worker(
+    build_models: Callable[[], Callable],
+    fields_output: Union[List[str], None],
+    dict_models_kwargs: dict,
+) -> None:
+    """Initialize models once per worker (see 
+        shared_support.initialize_worker())
+    """
+    shs.initialize_worker(
+        build_models,
+        {
+            "dict_models_kwargs": dict_models_kwargs,
+            "fields_output": fields_output,
+        },
+    )
+
+    return None
@@ -20,6 +20,11 @@ _DICT_MODVARS_OUTPUT_ACTIVITY_RATIOS_PETROLEUM_FIG_2_27 = {
     "Fuel Production NemoMod OutputActivityRatio Oil": 0.04,   
 }
 
+# category restrictions for figures (see figure_registry.FigureRegistry.register_dataset())
+DICT_FIGURE_CATEGORIES = {
+    "figure_2_27": "fp_petroleum_refinement",
+}
+
 ETPData = cl.Dataset(
     {
         "figure_2_27": {
@@ -0,0 +1,217 @@
+"""Support shared by the batch, calibration, and sensitivity modules:
+    repository paths and the SISEPUEDE year of time period 0, atomic file
+    writes, and per-process worker state that keeps models (or runners) 
+    warm across tasks. Other modules should use the accessors here 
+    (get_path_repo(), get_year_0(), get_worker_state(), and 
+    set_worker_state()) rather than the module variables.
+
+    Example
+    -------
+    with atomic_write(path_out, ) as path_tmp:
+        df.to_parquet(path_tmp, )
+
+    # in a ProcessPoolExecutor
+    executor = cf.ProcessPoolExecutor(
+        initializer = initialize_worker,
+        initargs = (build_models, {"dict_models_kwargs": {}}, ),
+    )
+"""
+import contextlib
+import os, os.path
+import pandas as pd
+import pathlib
+import tempfile
+from typing import *
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+# paths
+_PATH_CUR = pathlib.Path(__file__).parents[0]
+_PATH_REPO = _PATH_CUR.parents[1]
+
+# file creation mask of the process (read once; os.umask() can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# objects held by worker processes (or the current process if run serially)
+_WORKER_STATE = {}
+
+
+
+
+
+##########################
+#    DEFINE FUNCTIONS    #
+##########################
+
+@contextlib.contextmanager
+def atomic_write(
+    path: Union[str, pathlib.Path],
+    suffix: str = ".tmp",
+) -> Iterator[str]:
+    """Context manager that yields a temporary path in the same directory as
+        path. On exit, the temporary file is moved into place, so readers
+        never see a partially written file. If writing fails, the temporary
+        file is removed and path is left unchanged.
+
+        The temporary file is created with mode 0600; before it is moved 
+        into place, its mode is set to 0666 less the process umask, as for
+        a file created with open().
+
+    Function Arguments
+    ------------------
+    path : Union[str, pathlib.Path]
+        Final output path
+
+    Keyword Arguments
+    -----------------
+    suffix : str
+        Suffix of the temporary file
+    """
+    path = pathlib.Path(path)
+    with tempfile.NamedTemporaryFile(dir = path.parent, delete = False, suffix = suffix, ) as fp:
+        path_tmp = fp.name
+
+    try:
+        yield path_tmp
+        os.chmod(path_tmp, 0o666 & ~_UMASK, )
+        os.replace(path_tmp, path, )
+
+    finally:
+        if os.path.exists(path_tmp):
+            os.remove(path_tmp)
+
+
+
+def build_models_default(
+) -> Callable:
+    """Get the SISEPUEDEModels instance from common_data_needs (built on
+        first use)
+    """
+    # import here so that modules can run with other models without SISEPUEDE
+    try:
+        import utils.common_data_needs as cdn
+    except ModuleNotFoundError:
+        import common_data_needs as cdn
+
+    return cdn.get_sisepuede_models()
+
+
+
+def clear_worker_state(
+) -> None:
+    """Remove all objects from the worker state in the current process
+    """
+    _WORKER_STATE.clear()
+
+    return None
+
+
+
+def get_path_repo(
+) -> pathlib.Path:
+    """Get the path to the root of the repository
+    """
+    return _PATH_REPO
+
+
+
+def get_worker_state(
+    key: str,
+    default: Any = None,
+) -> Any:
+    """Get an object from the worker state (see initialize_worker() and
+        set_worker_state()). Returns default if key is not set.
+    """
+    out = _WORKER_STATE.get(key, default, )
+
+    return out
+
+
+
+def get_year_0(
+) -> int:
+    """Get the year of SISEPUEDE time period 0 from the time period 
+        attribute table in common_data_needs (see 
+        common_data_needs.get_file_structure())
+    """
+    # import here so that modules that are passed year_0 can run without SISEPUEDE
+    try:
+        import utils.common_data_needs as cdn
+    except ModuleNotFoundError:
+        import common_data_needs as cdn
+
+    return cdn.get_year_0()
+
+
+
+def initialize_worker(
+    build: Callable[[], Any],
+    dict_state: Union[dict, None] = None,
+    key: str = "models",
+) -> None:
+    """Initialize _WORKER_STATE once per worker process (or in the current
+        process). The object returned by build() is stored under key and is
+        only rebuilt if build changes; dict_state is merged into the state
+        on every call.
+
+    Function Arguments
+    ------------------
+    build : Callable[[], Any]
+        Function that returns the object to keep warm (e.g., models). Must
+        be picklable (defined at module level) if used in worker processes
+
+    Keyword Arguments
+    -----------------
+    dict_state : Union[dict, None]
+        Optional additional state (e.g., model keyword arguments)
+    key : str
+        Key in _WORKER_STATE used to store the built object
+    """
+    key_build = f"build_{key}"
+    if _WORKER_STATE.get(key_build) is not build:
+        _WORKER_STATE.update({
+            key_build: build,
+            key: build(),
+        })
+
+    if isinstance(dict_state, dict):
+        _WORKER_STATE.update(dict_state)
+
+    return None
+
+
+
+def set_worker_state(
+    dict_state: dict,
+) -> None:
+    """Set objects in the worker state directly, e.g., a runner that was
+        already built in the current process. Objects set this way are not
+        associated with a build function, so the next call to 
+        initialize_worker() for the same key rebuilds them.
+    """
+    for key in dict_state.keys():
+        _WORKER_STATE.pop(f"build_{key}", None, )
+
+    _WORKER_STATE.update(dict_state)
+
+    return None
+
+
+
+def write_csv_atomic(
+    df: pd.DataFrame,
+    path: Union[str, pathlib.Path],
+) -> None:
+    """Write a DataFrame to CSV atomically (see atomic_write())
+    """
+    with atomic_write(path, ) as path_tmp:
+        df.to_csv(path_tmp, encoding = "UTF-8", index = None, )
+
+    return None
@@ -0,0 +1,376 @@
+"""Repo-local read cache (the "store") for SISEPUEDE variable 
+    specification templates. Excel templates store one sheet per strategy
+    ("strategy_id-<id>"); the store keeps each template as a single table
+    with a strategy_id field, written as CSV (default) or Parquet. Reading
+    any number of strategies is one table operation, and each workbook is
+    only parsed again after it changes (see sync_xlsx_templates()). 
+
+    Scope and tradeoff: the store only speeds up template reads in this 
+    repository (e.g., future_sampling.read_templates()). It is not a 
+    template backend for SISEPUEDE: build_strategies_to_templates() still
+    writes xlsx, and SISEPUEDE setup still reads the workbooks with 
+    openpyxl, so template build and ingestion time in SISEPUEDE are 
+    unchanged. In exchange for faster repeated reads, every workbook is 
+    parsed once more on first sync and a second copy of each template is 
+    kept on disk. Workbooks remain the source of truth; tables changed in 
+    the store only reach SISEPUEDE after export_xlsx_directory().
+
+    Example
+    -------
+    # after strategies.build_strategies_to_templates(...), convert stale 
+    #  workbooks only
+    sync_xlsx_templates(dir_templates, dir_store, )
+
+    # fast reads
+    df_0 = read_strategy_templates(dir_store, strategy_id = 0, )
+
+    # workbooks for review; only rewritten if the store has changed
+    export_xlsx_directory(dir_store, dir_templates, )
+"""
+import numpy as np
+import os, os.path
+import pandas as pd
+import pathlib
+import re
+from typing import *
+
+try:
+    import utils.shared_support as shs
+except ModuleNotFoundError:
+    import shared_support as shs
+
+
+
+
+
+##########################
+#    GLOBAL VARIABLES    #
+##########################
+
+_FIELD_STRATEGY = "strategy_id"
+
+# supported formats and extensions
+_FORMAT_CSV = "csv"
+_FORMAT_PARQUET = "parquet"
+_DICT_FORMAT_TO_EXTENSION = {
+    _FORMAT_CSV: ".csv",
+    _FORMAT_PARQUET: ".parquet",
+}
+
+# sheet names used in Excel templates
+_REGEX_SHEET_STRATEGY = re.compile(r"^strategy_id-(\d+)$")
+_SHEET_STRATEGY = "strategy_id-{}"
+
+
+
+
+
+##########################
+#    DEFINE FUNCTIONS    #
+##########################
+
+def convert_xlsx_templates(
+    dir_xlsx: Union[str, pathlib.Path],
+    dir_store: Union[str, pathlib.Path],
+    fmt: str = _FORMAT_CSV,
+) -> Dict[str, pathlib.Path]:
+    """Convert all Excel templates in a directory to the columnar store.
+        Each workbook is read once (all sheets). Returns a dictionary
+        mapping template names (workbook stems) to paths in the store.
+    """
+    dict_out = {}
+
+    for path in get_xlsx_paths(dir_xlsx, ):
+        dict_sheets = pd.read_excel(path, sheet_name = None, )
+        df_template = sheets_to_table(dict_sheets, )
+
+        path_out = write_template(df_template, dir_store, path.stem, fmt = fmt, )
+        dict_out.update({path.stem: path_out, })
+
+    return dict_out
+
+
+
+def export_xlsx(
+    path_store: Union[str, pathlib.Path],
+    path_xlsx: Union[str, pathlib.Path],
+    strategy_ids: Union[List[int], None] = None,
+) -> None:
+    """Export a template in the store to an Excel workbook with one sheet
+        per strategy
+
+    Function Arguments
+    ------------------
+    path_store : Union[str, pathlib.Path]
+        Path to the template in the store
+    path_xlsx : Union[str, pathlib.Path]
+        Output workbook path
+
+    Keyword Arguments
+    -----------------
+    strategy_ids : Union[List[int], None]
+        Optional subset of strategies to export
+    """
+    df_template = read_template(path_store, strategy_ids = strategy_ids, )
+    dict_sheets = table_to_sheets(df_template, )
+
+    with pd.ExcelWriter(path_xlsx, engine = "openpyxl", ) as writer:
+        for strategy_id, df in dict_sheets.items():
+            df.to_excel(writer, sheet_name = _SHEET_STRATEGY.format(strategy_id), index = False, )
+
+    return None
+
+
+
+def export_xlsx_directory(
+    dir_store: Union[str, pathlib.Path],
+    dir_xlsx: Union[str, pathlib.Path],
+    force: bool = False,
+    **kwargs,
+) -> List[pathlib.Path]:
+    """Export all templates in the store to Excel workbooks (e.g., into the
+        SISEPUEDE templates directory, which is the only way changes in the 
+        store reach SISEPUEDE). Workbooks are only rewritten if the stored 
+        template is newer, unless force = True. Returns the list of
+        workbooks written. kwargs are passed to export_xlsx().
+    """
+    dir_xlsx = pathlib.Path(dir_xlsx)
+    dir_xlsx.mkdir(parents = True, exist_ok = True, )
+
+    list_out = []
+    for path in get_template_paths(dir_store, ):
+        path_xlsx = dir_xlsx.joinpath(f"{path.stem}.xlsx")
+
+        stale = (
+            force
+            or not path_xlsx.is_file()
+            or (os.path.getmtime(path) > os.path.getmtime(path_xlsx))
+        )
+        if not stale:
+            continue
+
+        export_xlsx(path, path_xlsx, **kwargs, )
+
+        # match the store's modification time so that sync_xlsx_templates()
+        #  does not convert the exported workbook back
+        os.utime(path_xlsx, (os.path.getatime(path_xlsx), os.path.getmtime(path), ), )
+        list_out.append(path_xlsx)
+
+    return list_out
+
+
+
+def get_template_paths(
+    dir_store: Union[str, pathlib.Path],
+) -> List[pathlib.Path]:
+    """Get paths of all templates in the store
+    """
+    extensions = set(_DICT_FORMAT_TO_EXTENSION.values())
+    list_out = sorted(
+        x for x in pathlib.Path(dir_store).iterdir()
+        if x.is_file() and (x.suffix in extensions)
+    )
+
+    return list_out
+
+
+
+def get_xlsx_paths(
+    dir_xlsx: Union[str, pathlib.Path],
+) -> List[pathlib.Path]:
+    """Get paths of all Excel templates in a directory (excluding lock 
+        files)
+    """
+    list_out = sorted(
+        x for x in pathlib.Path(dir_xlsx).glob("*.xlsx")
+        if not x.name.startswith("~$")
+    )
+
+    return list_out
+
+
+
+def read_strategy_templates(
+    dir_store: Union[str, pathlib.Path],
+    strategy_id: int = 0,
+    names: Union[List[str], None] = None,
+) -> pd.DataFrame:
+    """Read templates for a strategy from all templates in the store and
+        stack them into a single DataFrame (same layout as a strategy sheet)
+
+    Function Arguments
+    ------------------
+    dir_store : Union[str, pathlib.Path]
+        Directory of the store
+
+    Keyword Arguments
+    -----------------
+    strategy_id : int
+        Strategy to read
+    names : Union[List[str], None]
+        Optional subset of template names to read. If None, reads all 
+        templates in the store
+    """
+    dfs = []
+    for path in get_template_paths(dir_store, ):
+        if (names is not None) and (path.stem not in names):
+            continue
+
+        df = read_template(path, strategy_ids = [strategy_id], )
+        if len(df) > 0:
+            dfs.append(df.drop(columns = [_FIELD_STRATEGY], ))
+
+    if len(dfs) == 0:
+        raise RuntimeError(f"No templates found for strategy {strategy_id} in {dir_store}")
+
+    df_out = pd.concat(dfs, axis = 0, ).reset_index(drop = True, )
+
+    return df_out
+
+
+
+def read_template(
+    path: Union[str, pathlib.Path],
+    strategy_ids: Union[List[int], None] = None,
+) -> pd.DataFrame:
+    """Read a template from the store. Returns a DataFrame with strategy_id
+        and all template fields, optionally filtered to strategy_ids. CSV
+        values are parsed with round-trip precision, so reads are exact.
+    """
+    path = pathlib.Path(path)
+
+    df_out = (
+        pd.read_parquet(path, )
+        if path.suffix == _DICT_FORMAT_TO_EXTENSION.get(_FORMAT_PARQUET)
+        else pd.read_csv(path, float_precision = "round_trip", )
+    )
+
+    if strategy_ids is not None:
+        df_out = (
+            df_out[df_out[_FIELD_STRATEGY].isin(strategy_ids)]
+            .reset_index(drop = True, )
+        )
+
+    return df_out
+
+
+
+def sheets_to_table(
+    dict_sheets: Dict[str, pd.DataFrame],
+) -> pd.DataFrame:
+    """Combine strategy sheets ("strategy_id-<id>") into a single table with
+        a strategy_id field. Other sheets are ignored.
+    """
+    dfs = []
+    for sheet, df in dict_sheets.items():
+        match = _REGEX_SHEET_STRATEGY.match(str(sheet))
+        if match is None:
+            continue
+
+        df = df.copy()
+        df.columns = [str(x) for x in df.columns]
+        df.insert(0, _FIELD_STRATEGY, int(match.groups()[0]), )
+        dfs.append(df)
+
+    df_out = (
+        pd.concat(dfs, axis = 0, )
+        .sort_values(by = [_FIELD_STRATEGY], kind = "stable", )
+        .reset_index(drop = True, )
+    )
+
+    return df_out
+
+
+
+def sync_xlsx_templates(
+    dir_xlsx: Union[str, pathlib.Path],
+    dir_store: Union[str, pathlib.Path],
+    fmt: str = _FORMAT_CSV,
+) -> List[pathlib.Path]:
+    """Convert Excel templates that are missing from the store or newer 
+        than their stored table. Returns the list of paths written to the 
+        store.
+    """
+    extension = _DICT_FORMAT_TO_EXTENSION.get(fmt)
+    if extension is None:
+        raise ValueError(f"Invalid template format '{fmt}'. Valid formats are {list(_DICT_FORMAT_TO_EXTENSION.keys())}.")
+
+    dir_store = pathlib.Path(dir_store)
+
+    list_out = []
+    for path in get_xlsx_paths(dir_xlsx, ):
+        path_store = dir_store.joinpath(f"{path.stem}{extension}")
+
+        stale = (
+            not path_store.is_file()
+            or (os.path.getmtime(path) > os.path.getmtime(path_store))
+        )
+        if not stale:
+            continue
+
+        df_template = sheets_to_table(pd.read_excel(path, sheet_name = None, ), )
+        list_out.append(write_template(df_template, dir_store, path.stem, fmt = fmt, ))
+
+    return list_out
+
+
+
+def table_to_sheets(
+    df_template: pd.DataFrame,
+) -> Dict[int, pd.DataFrame]:
+    """Split a template table into strategy sheets. Returns a dictionary
+        mapping strategy ids to DataFrames (without strategy_id). Fields
+        that are empty for a strategy are kept so that all sheets share a
+        layout.
+    """
+    dict_out = dict(
+        (int(strategy_id), df.drop(columns = [_FIELD_STRATEGY], ).reset_index(drop = True, ))
+        for strategy_id, df in df_template.groupby(_FIELD_STRATEGY, sort = True, )
+    )
+
+    return dict_out
+
+
+
+def write_template(
+    df_template: pd.DataFrame,
+    dir_store: Union[str, pathlib.Path],
+    name: str,
+    fmt: str = _FORMAT_CSV,
+) -> pathlib.Path:
+    """Write a template table (with strategy_id) to the store. The file is
+        written to a temporary path and moved into place; the temporary 
+        file is removed if writing fails.
+
+    Function Arguments
+    ------------------
+    df_template : pd.DataFrame
+        Template table with strategy_id (see sheets_to_table())
+    dir_store : Union[str, pathlib.Path]
+        Directory of the store
+    name : str
+        Template name (e.g., model_input_variables_uganda_af_calibrated)
+
+    Keyword Arguments
+    -----------------
+    fmt : str
+        "csv" or "parquet"
+    """
+    extension = _DICT_FORMAT_TO_EXTENSION.get(fmt)
+    if extension is None:
+        raise ValueError(f"Invalid template format '{fmt}'. Valid formats are {list(_DICT_FORMAT_TO_EXTENSION.keys())}.")
+
+    if _FIELD_STRATEGY not in df_template.columns:
+        raise KeyError(f"Field '{_FIELD_STRATEGY}' not found in df_template.")
+
+    dir_store = pathlib.Path(dir_store)
+    dir_store.mkdir(parents = True, exist_ok = True, )
+    path_out = dir_store.joinpath(f"{name}{extension}")
+
+    with shs.atomic_write(path_out, ) as path_tmp:
+        if fmt == _FORMAT_PARQUET:
+            df_template.to_parquet(path_tmp, index = False, )
+        else:
+            df_template.to_csv(path_tmp, encoding = "UTF-8", index = None, )
+
+    return path_out
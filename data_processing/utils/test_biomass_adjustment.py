@@ -0,0 +1,139 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils.biomass_adjustment as ba
+except ModuleNotFoundError:
+    import biomass_adjustment as ba
+
+
+class TestBiomassAdjustment(unittest.TestCase):
+
+    def setUp(self):
+        self.df_adjustments = pd.DataFrame(
+            {
+                "year": [2017, 2015],
+                "total_removals_to_reallocate_mt_co2e": [20.0, 10.0],
+                "frac_allocation_inen": [0.4, 0.2],
+                "frac_allocation_scoe": [0.6, 0.8],
+            }
+        )
+
+        # time periods 0-4 are 2015-2019; 2018 and 2019 are outside the inventory
+        #  (R*frac_inen is 2 in 2015 and 8 in 2017; R*frac_scoe is 8 and 12)
+        n_tp = 5
+        self.df_run = pd.DataFrame(
+            {
+                "primary_id": [0]*n_tp,
+                "time_period": np.arange(n_tp),
+                "emission_co2e_co2_frst_sequestration_primary": [-5.0]*n_tp,
+                "emission_co2e_co2_scoe_fuel": [2.0]*n_tp,
+                "emission_co2e_ch4_inen_fuel": [1.0]*n_tp,
+            }
+        )
+        self.vec_frac_gas = [0.1, 0.8, 0.1]
+        self.df_category_map = pd.DataFrame(
+            {
+                "cats_inv": [ba._SUBSECTOR_INEN, ba._SUBSECTOR_SCOE, ba._SUBSECTOR_FRST],
+                "cats_wb_1": ["EN - Manufacturing/Construction", "EN - Building", "LULUCF - Forest Land"],
+            }
+        )
+
+    def get_values(self, df_adjusted, subsector, gas, ):
+        df = df_adjusted[
+            (df_adjusted["Subsector"] == subsector)
+            & (df_adjusted["Gas"] == gas)
+        ]
+
+        return df.sort_values(by = ["Year"], )["Value"].to_numpy()
+
+    def adjust(self, **kwargs):
+        df_out = ba.adjust_emissions(
+            self.df_run,
+            df_adjustments = self.df_adjustments,
+            vec_frac_gas = self.vec_frac_gas,
+            year_0 = 2015,
+            **kwargs,
+        )
+
+        return df_out
+
+    def test_reallocation_held_flat_after_inventory(self):
+        df_out = self.adjust()
+        vec_removals_inen = np.array([2.0, 5.0, 8.0, 8.0, 8.0])
+        vec_removals_scoe = np.array([8.0, 10.0, 12.0, 12.0, 12.0])
+
+        np.testing.assert_allclose(
+            self.get_values(df_out, ba._SUBSECTOR_FRST, "CO2"),
+            -5.0 - vec_removals_inen - vec_removals_scoe,
+        )
+        np.testing.assert_allclose(
+            self.get_values(df_out, ba._SUBSECTOR_SCOE, "CO2"),
+            2.0 + 0.8*vec_removals_scoe,
+        )
+        np.testing.assert_allclose(
+            self.get_values(df_out, ba._SUBSECTOR_INEN, "CH4"),
+            1.0 + 0.1*vec_removals_inen,
+        )
+
+    def test_net_emissions_preserved(self):
+        for extrapolation in ["flat", "zero"]:
+            df_out = self.adjust(extrapolation = extrapolation, )
+            vec_total = df_out.groupby("Year")["Value"].sum().to_numpy()
+
+            np.testing.assert_allclose(vec_total, -2.0)
+
+    def test_product_is_interpolated(self):
+        # 2016 is (10*0.2 + 20*0.4)/2 = 5.0, not 15*0.3 = 4.5
+        vec_inen, vec_scoe = ba.interpolate_adjustments(
+            np.array([2010, 2016, 2050]),
+            self.df_adjustments,
+        )
+
+        np.testing.assert_allclose(vec_inen, [2.0, 5.0, 8.0])
+        np.testing.assert_allclose(vec_scoe, [8.0, 10.0, 12.0])
+
+    def test_no_reallocation_outside_inventory_years(self):
+        vec_inen, vec_scoe = ba.interpolate_adjustments(
+            np.array([2010, 2015, 2016, 2017, 2050]),
+            self.df_adjustments,
+            extrapolation = "zero",
+        )
+
+        np.testing.assert_allclose(vec_inen + vec_scoe, [0.0, 10.0, 15.0, 20.0, 0.0])
+
+    def test_map_to_wb_categories_keeps_sector(self):
+        df_out = self.adjust()
+        df_mapped = ba.map_to_wb_categories(df_out, df_category_map = self.df_category_map, )
+
+        self.assertIn("Sector", df_mapped.columns)
+        self.assertEqual(
+            sorted(df_mapped[["Sector", "Subsector"]].drop_duplicates().itertuples(index = False, name = None, )),
+            [("AFOLU", "LULUCF - Forest Land"), ("Energy", "EN - Building"), ("Energy", "EN - Manufacturing/Construction")],
+        )
+        np.testing.assert_allclose(df_mapped["Value"].sum(), df_out["Value"].sum())
+
+    def test_map_to_wb_categories_raises_on_leftover_rows(self):
+        df_out = self.adjust()
+
+        # categories that are not in the map
+        with self.assertRaises(ValueError):
+            ba.map_to_wb_categories(df_out, df_category_map = self.df_category_map.iloc[0:2], )
+
+        # gases without a WB CSC equivalent
+        df_all_ghg = df_out.iloc[0:1].assign(Gas = "All GHG", )
+        with self.assertRaises(ValueError):
+            ba.map_to_wb_categories(
+                pd.concat([df_out, df_all_ghg], ignore_index = True, ),
+                df_category_map = self.df_category_map,
+            )
+
+    def test_invalid_extrapolation(self):
+        with self.assertRaises(ValueError):
+            self.adjust(extrapolation = "linear", )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+import concurrent.futures as cf
+from concurrent.futures.process import BrokenProcessPool
+import os
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils.calibration as cal
+except ModuleNotFoundError:
+    import calibration as cal
+
+
+def build_models_linear(
+):
+    """Model where emissions equal the scaled input; fails for scalars 
+        above 1.5
+    """
+    def models(df_input, **kwargs):
+        if (df_input["x_in"] > 1.5*df_input["x_base"]).any():
+            raise RuntimeError("model failed")
+
+        return pd.DataFrame(
+            {
+                "time_period": df_input["time_period"],
+                "emission_a": df_input["x_in"],
+                "emission_b": 0.001*df_input["x_in"],
+            }
+        )
+
+    return models
+
+
+class ExecutorBreaksAfterFirst(cf.Executor):
+    """Executor that runs the first submission in the current process and 
+        then behaves like a broken process pool
+    """
+    def __init__(self):
+        self.n_submitted = 0
+
+    def submit(self, fn, *args, **kwargs):
+        future = cf.Future()
+        if self.n_submitted == 0:
+            future.set_result(fn(*args, **kwargs))
+        else:
+            future.set_exception(BrokenProcessPool("worker died"))
+        self.n_submitted += 1
+
+        return future
+
+
+class TestCalibration(unittest.TestCase):
+
+    def setUp(self):
+        years = [2015, 2016]
+        self.df_targets = pd.DataFrame(
+            {
+                "Subsector": ["A"]*2 + ["B"]*2,
+                "Gas": ["CO2"]*4,
+                "Year": years*2,
+                "Value": [10.0, 12.0, 0.01, 0.012],
+            }
+        )
+        self.df_field_map = pd.DataFrame(
+            {
+                "Edgar_Class": ["A:CO2", "B:CO2"],
+                "Vars": ["emission_a", "emission_b"],
+            }
+        )
+        self.df_input = pd.DataFrame(
+            {
+                "time_period": [0, 1],
+                "x_in": [10.0, 12.0],
+                "x_base": [10.0, 12.0],
+            }
+        )
+        self.df_parameters = pd.DataFrame(
+            {
+                "parameter": ["scale_x"],
+                "fields": [["x_in"]],
+                "min": [0.5],
+                "max": [2.0],
+            }
+        )
+        self.targets = cal.CalibrationTargets(self.df_targets, self.df_field_map, )
+
+    def test_scale_floor_from_target_magnitudes(self):
+        self.assertAlmostEqual(self.targets.scale_floor, 0.5*np.median([10.0, 12.0, 0.01, 0.012]))
+        np.testing.assert_allclose(self.targets.arr_scale[:, 0], [10.0, 12.0])
+
+        # a near-zero target does not dominate the loss
+        arr_model = self.targets.arr_targets.copy()
+        arr_model[:, 1] = 0.1
+        _, arr_error = self.targets.compute_error(arr_model, return_components = True, )
+        self.assertLess(np.abs(arr_error).max(), 1.0)
+
+        targets = cal.CalibrationTargets(self.df_targets, self.df_field_map, scale_floor = 0.01, )
+        self.assertEqual(targets.scale_floor, 0.01)
+
+    def test_error_by_candidate(self):
+        calib = cal.Calibrator(
+            self.df_input,
+            self.targets,
+            self.df_parameters,
+            build_models = build_models_linear,
+            year_0 = 2015,
+        )
+        vec_error = calib.evaluate(np.array([[1.0], [1.2]]), )
+
+        self.assertAlmostEqual(vec_error[0], 0.0)
+        self.assertGreater(vec_error[1], 0.0)
+
+    def test_failed_candidate_gets_infinite_error(self):
+        with tempfile.TemporaryDirectory() as dir_tmp:
+            path_cache = os.path.join(dir_tmp, "cache.csv")
+            calib = cal.Calibrator(
+                self.df_input,
+                self.targets,
+                self.df_parameters,
+                build_models = build_models_linear,
+                path_cache = path_cache,
+                year_0 = 2015,
+            )
+
+            with warnings.catch_warnings(record = True, ) as list_warnings:
+                warnings.simplefilter("always")
+                vec_error = calib.evaluate(np.array([[1.0], [1.8], [0.9]]), )
+
+            df_cache = pd.read_csv(path_cache, )
+
+        self.assertTrue(np.isinf(vec_error[1]))
+        self.assertTrue(np.isfinite(vec_error[[0, 2]]).all())
+        self.assertEqual(len(list_warnings), 1)
+        self.assertIn("model failed", str(list_warnings[0].message))
+
+        # failures are not cached
+        self.assertEqual(sorted(df_cache["scale_x"]), [0.9, 1.0])
+        self.assertEqual(sorted(calib.dict_cache.keys()), [(0.9, ), (1.0, )])
+        np.testing.assert_array_equal(calib.get_best()[0], [1.0])
+
+    def test_cache_rejected_if_fingerprint_differs(self):
+        with tempfile.TemporaryDirectory() as dir_tmp:
+            path_cache = os.path.join(dir_tmp, "cache.csv")
+
+            def get_calibrator(df_input, targets, ):
+                return cal.Calibrator(
+                    df_input,
+                    targets,
+                    self.df_parameters,
+                    build_models = build_models_linear,
+                    path_cache = path_cache,
+                    year_0 = 2015,
+                )
+
+            get_calibrator(self.df_input, self.targets, ).evaluate(np.array([[1.0], [1.2]]), )
+            calib = get_calibrator(self.df_input, self.targets, )
+            self.assertEqual(len(calib.dict_cache), 2)
+
+            # changing inputs or target weights invalidates the cache
+            targets_weighted = cal.CalibrationTargets(self.df_targets, self.df_field_map, dict_weights = {"B:CO2": 2.0, }, )
+            df_input = self.df_input.assign(x_base = [10.0, 13.0], )
+            for df, targets in [(df_input, self.targets), (self.df_input, targets_weighted)]:
+                with warnings.catch_warnings(record = True, ) as list_warnings:
+                    warnings.simplefilter("always")
+                    calib = get_calibrator(df, targets, )
+
+                self.assertEqual(len(calib.dict_cache), 0)
+                self.assertEqual(len(list_warnings), 1)
+
+    def test_broken_executor_aborts_batch(self):
+        calib = cal.Calibrator(
+            self.df_input,
+            self.targets,
+            self.df_parameters,
+            build_models = build_models_linear,
+            year_0 = 2015,
+        )
+        cal._initialize_worker(calib.build_models, calib.targets, calib.dict_models_kwargs, calib.year_0, )
+
+        with self.assertRaises(RuntimeError):
+            calib.evaluate(np.array([[1.0], [1.1], [1.2]]), executor = ExecutorBreaksAfterFirst(), )
+
+        # only the completed candidate is cached
+        self.assertEqual(list(calib.dict_cache.keys()), [(1.0, )])
+
+    def test_run_prefers_base(self):
+        calib = cal.Calibrator(
+            self.df_input,
+            self.targets,
+            self.df_parameters,
+            build_models = build_models_linear,
+            year_0 = 2015,
+        )
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            df_history = calib.run(n_iterations = 2, batch_size = 6, seed = 0, )
+
+        self.assertEqual(len(df_history), 12)
+        self.assertAlmostEqual(calib.get_best()[1], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
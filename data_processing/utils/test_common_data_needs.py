@@ -0,0 +1,75 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# common_data_needs loads SISEPUEDE on import
+_HAS_SISEPUEDE = importlib.util.find_spec("sisepuede") is not None
+
+if _HAS_SISEPUEDE:
+    try:
+        import utils.common_data_needs as cdn
+        import utils.dtype_policy as dtp
+    except ModuleNotFoundError:
+        import common_data_needs as cdn
+        import dtype_policy as dtp
+
+
+@unittest.skipUnless(_HAS_SISEPUEDE, "sisepuede is not installed")
+class TestBuildFromOutputs(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.TemporaryDirectory()
+        self.path_csvs = os.path.join(self.dir_tmp.name, "outputs")
+        self.path_base_raw_data = os.path.join(self.dir_tmp.name, "raw_inputs.csv")
+        os.mkdir(self.path_csvs)
+
+        fields = cdn._SISEPUEDE_MODEL_ATTRIBUTES.all_variable_fields_input
+        field_year = cdn._SISEPUEDE_TIME_PERIODS.field_year
+        self.years_required = (2015, 2020)
+        vec_years = np.arange(self.years_required[0], self.years_required[1] + 1, )
+        rng = np.random.default_rng(0)
+
+        # short decimals compact to float32; interpolated values do not
+        pd.DataFrame(
+            {
+                field_year: vec_years,
+                fields[0]: [0.1, np.nan, np.nan, 0.7, 0.8, np.nan],
+                fields[1]: [1.5, 2.5, 3.5, 4.5, 5.5, 6.5],
+            }
+        ).to_csv(self.path_base_raw_data, index = None, )
+
+        pd.DataFrame(
+            {
+                field_year: vec_years,
+                fields[1]: rng.uniform(0, 1, len(vec_years)),
+            }
+        ).to_csv(os.path.join(self.path_csvs, "source.csv"), index = None, )
+
+    def tearDown(self):
+        self.dir_tmp.cleanup()
+
+    def build(self, compact):
+        df_out = cdn._build_from_outputs(
+            self.years_required,
+            compact = compact,
+            force_complete_build = True,
+            path_base_raw_data = cdn.pathlib.Path(self.path_base_raw_data),
+            path_csvs = cdn.pathlib.Path(self.path_csvs),
+        )
+
+        return df_out
+
+    def test_expanded_compact_build_matches_float64_build(self):
+        df_64 = self.build(False)
+        df_compact = self.build(True)
+
+        self.assertTrue(dtp.is_compact(df_compact))
+        pd.testing.assert_frame_equal(dtp.expand_df(df_compact), df_64, check_exact = True, )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils.dtype_policy as dtp
+except ModuleNotFoundError:
+    import dtype_policy as dtp
+
+
+class TestDtypePolicy(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 200
+
+        # values as they come out of CSVs (few significant digits)
+        self.df = pd.DataFrame(
+            {
+                "region": ["uganda"]*n,
+                "time_period": np.arange(n),
+                "frac_decimal": np.round(rng.uniform(0, 1, n), 4),
+                "gdp_decimal": np.round(rng.uniform(1e3, 1e4, n), 2),
+                "value_computed": rng.uniform(0, 1, n),
+                "value_nan": np.where(np.arange(n) % 7 == 0, np.nan, 0.25),
+            }
+        )
+
+    def test_round_trip_is_exact(self):
+        df_compact = dtp.compact_df(self.df, )
+        df_expanded = dtp.expand_df(df_compact, )
+
+        pd.testing.assert_frame_equal(df_expanded, self.df, check_exact = True, )
+
+    def test_lossy_fields_stay_float64(self):
+        df_compact = dtp.compact_df(self.df, )
+        report = dtp.get_compaction_report(df_compact, )
+
+        self.assertEqual(df_compact["value_computed"].dtype, np.float64)
+        self.assertIn("value_computed", report.get("fields_float64"))
+        self.assertEqual(
+            set(report.get("fields_float32")),
+            {"frac_decimal", "gdp_decimal", "value_nan"},
+        )
+        self.assertEqual(df_compact["region"].dtype, "category")
+        self.assertEqual(df_compact["time_period"].dtype, np.int16)
+        self.assertGreater(report.get("bytes_saved"), 0)
+
+    def test_digits_reject_precision_float32_cannot_hold(self):
+        # 8 significant digits cannot round-trip through float32
+        df = pd.DataFrame({"x": [1234.5678, 0.12345678]})
+        df_compact = dtp.compact_df(df, digits = 7, )
+
+        self.assertEqual(df_compact["x"].dtype, np.float64)
+
+    def test_field_override_keeps_float64(self):
+        df_compact = dtp.compact_df(self.df, dict_digits_by_field = {"frac_decimal": 0}, )
+
+        self.assertEqual(df_compact["frac_decimal"].dtype, np.float64)
+        self.assertEqual(df_compact["gdp_decimal"].dtype, np.float32)
+
+    def test_expand_without_report_restores_decimals(self):
+        # reports are lost in some operations (e.g., merges)
+        df_compact = dtp.compact_df(self.df, )
+        df_compact.attrs.clear()
+        df_expanded = dtp.expand_df(df_compact, )
+
+        np.testing.assert_array_equal(
+            df_expanded["gdp_decimal"].to_numpy(),
+            self.df["gdp_decimal"].to_numpy(),
+        )
+
+    def test_expand_returns_input_if_not_compact(self):
+        self.assertIs(dtp.expand_df(self.df, ), self.df)
+
+
+if __name__ == "__main__":
+    unittest.main()
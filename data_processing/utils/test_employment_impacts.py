@@ -0,0 +1,188 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils.employment_impacts as ei
+except ModuleNotFoundError:
+    import employment_impacts as ei
+
+
+def write_workbook(
+    path: str,
+) -> None:
+    """Write a small employment results workbook with sector averages for two
+        countries and strategy-specific coefficients for one strategy
+    """
+    df_by_group = pd.DataFrame(
+        {
+            "Country": ["UGA", "UGA", "KEN"],
+            "Group": ["AGRC ", "TRNS", "AGRC"],
+            "Direct_jobs": [2.0, 1.0, 100.0],
+            "Indirect_jobs": [1.0, 0.5, 100.0],
+            "Total_jobs": [3.0, 1.5, 200.0],
+        }
+    )
+    df_by_strategy = pd.DataFrame(
+        {
+            "Country": ["UGA", "KEN"],
+            "Group": ["TRNS", "TRNS"],
+            "strategy_id": [2, 2],
+            "Direct_jobs": [10.0, 100.0],
+            "Indirect_jobs": [0.0, 100.0],
+            "Total_jobs": [10.0, 200.0],
+        }
+    )
+
+    with pd.ExcelWriter(path, ) as writer:
+        df_by_group.to_excel(writer, sheet_name = ei._SHEET_BY_GROUP, index = False, )
+        df_by_strategy.to_excel(writer, sheet_name = ei._SHEET_BY_STRATEGY, index = False, )
+
+    return None
+
+
+class TestEmploymentEngine(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dir_tmp = tempfile.TemporaryDirectory()
+        cls.path_workbook = os.path.join(cls.dir_tmp.name, "employment.xlsx")
+        write_workbook(cls.path_workbook)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.dir_tmp.cleanup()
+
+    def setUp(self):
+        # primaries 0, 1, 2 are strategies 0, 1, 2 with one design/future
+        n_tp = 3
+        vec_primary = np.repeat([2, 0, 1], n_tp, )
+        self.df_run = pd.DataFrame(
+            {
+                "primary_id": vec_primary,
+                "strategy_id": vec_primary,
+                "time_period": np.tile(np.arange(n_tp), 3, ),
+                "agrc_crop": 1.0 + vec_primary,
+                "agrc_livestock": np.tile(np.arange(n_tp, dtype = float, ), 3, ),
+                "trns_fuel": 2.0*vec_primary,
+            }
+        )
+        self.engine = ei.EmploymentEngine(
+            {
+                "AGRC": r"^agrc_",
+                "TRNS": ["trns_fuel"],
+            },
+            path_workbook = self.path_workbook,
+        )
+
+    def get_jobs(self, df_jobs, primary, sector, field = "total_jobs"):
+        df = df_jobs[(df_jobs["primary_id"] == primary) & (df_jobs["sector"] == sector)]
+
+        return df.sort_values(by = ["time_period"])[field].to_numpy()
+
+    def test_coefficients_are_read_for_country(self):
+        df_by_sector, df_by_strategy = ei.read_employment_coefficients(self.path_workbook, )
+
+        self.assertEqual(sorted(df_by_sector["sector"]), ["AGRC", "TRNS"])
+        self.assertEqual(df_by_strategy["strategy_id"].tolist(), [2])
+        # cached results are copies
+        df_by_sector["total_jobs"] = 0.0
+        df_by_sector, _ = ei.read_employment_coefficients(self.path_workbook, )
+        self.assertEqual(df_by_sector["total_jobs"].sum(), 4.5)
+
+    def test_jobs_relative_to_baseline(self):
+        df_jobs = self.engine(self.df_run, )
+
+        self.assertEqual(len(df_jobs), len(self.df_run)*2)
+        np.testing.assert_allclose(self.get_jobs(df_jobs, 0, "AGRC"), 0.0)
+        np.testing.assert_allclose(self.get_jobs(df_jobs, 0, "TRNS"), 0.0)
+
+        # activity changes by primary_id in each sector
+        np.testing.assert_allclose(self.get_jobs(df_jobs, 1, "AGRC"), 3.0)
+        np.testing.assert_allclose(self.get_jobs(df_jobs, 1, "TRNS"), 1.5*2.0)
+
+        # strategy 2 uses its own TRNS coefficients
+        np.testing.assert_allclose(self.get_jobs(df_jobs, 2, "TRNS"), 10.0*4.0)
+        np.testing.assert_allclose(self.get_jobs(df_jobs, 2, "TRNS", "indirect_jobs"), 0.0)
+        np.testing.assert_allclose(self.get_jobs(df_jobs, 2, "AGRC", "direct_jobs"), 2.0*2.0)
+
+    def test_sector_averages_only(self):
+        self.engine.use_strategy_coefficients = False
+        df_jobs = self.engine(self.df_run, )
+
+        np.testing.assert_allclose(self.get_jobs(df_jobs, 2, "TRNS"), 1.5*4.0)
+
+    def test_activity_levels(self):
+        self.engine.relative_to_baseline = False
+        df_jobs = self.engine(self.df_run, )
+
+        # sum of agrc_crop and agrc_livestock for primary 0
+        np.testing.assert_allclose(self.get_jobs(df_jobs, 0, "AGRC"), 3.0*np.array([1.0, 2.0, 3.0]))
+
+    def test_strategy_from_attribute_table(self):
+        df_attribute_primary = self.df_run[["primary_id", "strategy_id"]].drop_duplicates()
+        df_run = self.df_run.drop(columns = ["strategy_id"], )
+
+        with self.assertRaises(KeyError):
+            self.engine(df_run, )
+
+        df_jobs = self.engine(df_run, df_attribute_primary = df_attribute_primary, )
+        pd.testing.assert_frame_equal(df_jobs, self.engine(self.df_run, ))
+
+    def test_missing_baseline_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.engine(self.df_run[self.df_run["strategy_id"] != 0], )
+
+    def test_missing_activity_fields_raise(self):
+        for spec in [["trns_fuel", "trns_missing"], r"^trns_missing_"]:
+            engine = ei.EmploymentEngine(
+                {"AGRC": r"^agrc_", "TRNS": spec, },
+                path_workbook = self.path_workbook,
+            )
+            with self.assertRaises(KeyError):
+                engine(self.df_run, )
+
+    def test_missing_sector_coefficients_raise(self):
+        with self.assertRaises(KeyError):
+            ei.EmploymentEngine({"WASO": r"^agrc_", }, path_workbook = self.path_workbook, )
+
+    def test_activity_scalars(self):
+        # activity in thousands of USD is converted to million USD
+        engine = ei.EmploymentEngine(
+            {"AGRC": r"^agrc_", "TRNS": ["trns_fuel"], },
+            dict_activity_scalars = {"TRNS": 1e-3, },
+            path_workbook = self.path_workbook,
+        )
+        df_jobs = engine(self.df_run, )
+
+        np.testing.assert_allclose(self.get_jobs(df_jobs, 1, "TRNS"), 1.5*2.0*1e-3)
+        np.testing.assert_allclose(self.get_jobs(df_jobs, 1, "AGRC"), 3.0)
+
+        with self.assertRaises(KeyError):
+            ei.EmploymentEngine(
+                {"AGRC": r"^agrc_", },
+                dict_activity_scalars = {"TRNS": 1e-3, },
+                path_workbook = self.path_workbook,
+            )
+
+    def test_export_tables(self):
+        df_jobs = self.engine(self.df_run, )
+
+        with tempfile.TemporaryDirectory() as dir_out:
+            dict_paths = self.engine.export_tables(df_jobs, dir_out, )
+            df_strategy_sector = pd.read_csv(dict_paths.get("by_strategy_sector"))
+            self.assertEqual(sorted(os.listdir(dir_out)), sorted(x.name for x in dict_paths.values()))
+
+        df_expected = (
+            df_jobs
+            .groupby(["strategy_id", "sector"], as_index = False, )[["direct_jobs", "indirect_jobs", "total_jobs"]]
+            .sum()
+        )
+        pd.testing.assert_frame_equal(df_strategy_sector, df_expected, check_dtype = False, )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils.figure_registry as fr
+except ModuleNotFoundError:
+    import figure_registry as fr
+
+
+class FakeVariable:
+    """Model variable with one field per category
+    """
+    def __init__(self, name, categories):
+        self.name = name
+        self.categories = categories
+
+    def build_fields(self, category_restrictions = None, ):
+        categories = self.categories if category_restrictions is None else category_restrictions
+        if isinstance(categories, str):
+            categories = [categories]
+
+        return [f"{self.name}_{x}" for x in categories]
+
+
+class FakeModelAttributes:
+
+    def __init__(self, dict_variables):
+        self.dict_variables = dict((k, FakeVariable(k, v)) for k, v in dict_variables.items())
+
+    def get_variable(self, modvar, ):
+        return self.dict_variables.get(modvar)
+
+
+class TestFigureRegistryApply(unittest.TestCase):
+
+    def setUp(self):
+        model_attributes = FakeModelAttributes(
+            {
+                "x": ["a", "b"],
+                "y": ["a"],
+            }
+        )
+        self.registry = fr.FigureRegistry(model_attributes = model_attributes, )
+        self.df_input = pd.DataFrame(
+            {
+                "year": [2015, 2016, 2017, 2018, 2019],
+                "x_a": [1.0, 2.0, 3.0, 4.0, 5.0],
+                "x_b": [6.0, 7.0, 8.0, 9.0, 10.0],
+            }
+        )
+
+    def test_existing_fields_only_overwritten_where_covered(self):
+        self.registry.register("src", "fig", "x", 20.0, category = "a", year = 2016, )
+        df_out = self.registry.apply(self.df_input, )
+
+        np.testing.assert_allclose(df_out["x_a"], [1.0, 20.0, 3.0, 4.0, 5.0])
+        pd.testing.assert_series_equal(df_out["x_b"], self.df_input["x_b"])
+        # input is not modified
+        self.assertEqual(self.df_input["x_a"].iloc[1], 2.0)
+
+    def test_year_values_take_precedence(self):
+        self.registry.register("src", "fig", "x", 30.0, year = 2018, )
+        self.registry.register("src", "fig", "x", 0.5, )
+        df_out = self.registry.apply(self.df_input, )
+
+        for field in ["x_a", "x_b"]:
+            np.testing.assert_allclose(df_out[field], [0.5, 0.5, 0.5, 30.0, 0.5])
+
+    def test_precedence_does_not_depend_on_registration_order(self):
+        records = [
+            (0.5, None, None),
+            (30.0, None, 2018),
+            (7.0, "a", None),
+            (40.0, "a", 2019),
+        ]
+        for order in [records, records[::-1]]:
+            registry = fr.FigureRegistry(model_attributes = self.registry.model_attributes, )
+            for value, category, year in order:
+                registry.register("src", "fig", "x", value, category = category, year = year, )
+            df_out = registry.apply(self.df_input, )
+
+            # one category beats all categories, then one year beats all years
+            np.testing.assert_allclose(df_out["x_a"], [7.0, 7.0, 7.0, 7.0, 40.0])
+            np.testing.assert_allclose(df_out["x_b"], [0.5, 0.5, 0.5, 30.0, 0.5])
+
+            df_targets = registry.get_targets()
+            self.assertFalse(df_targets.duplicated(subset = ["field", "year"], ).any())
+            self.assertTrue(df_targets["precedence"].is_monotonic_increasing)
+
+    def test_new_field_covered_for_all_years(self):
+        self.registry.register("src", "fig", "y", 0.25, )
+        df_out = self.registry.apply(self.df_input, fill_new_fields = "raise", )
+
+        np.testing.assert_allclose(df_out["y_a"], 0.25)
+
+    def test_new_field_uncovered_rows_raise(self):
+        self.registry.register("src", "fig", "y", 1.0, year = 2016, )
+
+        with self.assertRaises(ValueError):
+            self.registry.apply(self.df_input, fill_new_fields = "raise", )
+
+    def test_new_field_uncovered_rows_interpolated(self):
+        self.registry.register("src", "fig", "y", 1.0, year = 2016, )
+        self.registry.register("src", "fig", "y", 3.0, year = 2018, )
+
+        # rows are out of order; time_period is used when there is no year field
+        df_input = self.df_input.iloc[[4, 0, 2, 1, 3]].drop(columns = ["year"], )
+        df_input["time_period"] = [4, 0, 2, 1, 3]
+        df_out = self.registry.apply(df_input, year_0 = 2015, )
+
+        np.testing.assert_allclose(df_out["y_a"], [3.0, 1.0, 2.0, 1.0, 3.0])
+        self.assertFalse(df_out["y_a"].isna().any())
+
+    def test_new_field_without_values_in_years_raises(self):
+        self.registry.register("src", "fig", "y", 1.0, year = 2030, )
+
+        with self.assertRaises(ValueError):
+            self.registry.apply(self.df_input, )
+
+    def test_invalid_fill_method(self):
+        self.registry.register("src", "fig", "y", 1.0, )
+
+        with self.assertRaises(ValueError):
+            self.registry.apply(self.df_input, fill_new_fields = "nan", )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils.future_sampling as fs
+except ModuleNotFoundError:
+    import future_sampling as fs
+
+
+def build_template(
+    n_tp: int = 12,
+) -> pd.DataFrame:
+    """Build a small variable specification template with grouped variables
+        that have different bounds, a normalized group, and a fixed variable
+    """
+    rng = np.random.default_rng(0)
+
+    df = pd.DataFrame(
+        {
+            "variable": ["gdp", "pop", "frac_a", "frac_b", "fixed"],
+            "variable_trajectory_group": [1.0, 1.0, np.nan, np.nan, np.nan],
+            "normalize_group": [np.nan, np.nan, 1.0, 1.0, np.nan],
+            "trajgroup_no_vary_q": [0, 0, 0, 0, 0],
+            "max_35": [1.3, 1.1, 1.2, 1.0, 1.0],
+            "min_35": [0.7, 0.8, 0.9, 1.0, 1.0],
+        }
+    )
+
+    arr = rng.uniform(1, 2, (len(df), n_tp))
+    arr[2:4] /= arr[2:4].sum(axis = 0)
+    for t in range(n_tp):
+        df[str(t)] = arr[:, t]
+
+    return df
+
+
+class TestFutureSampler(unittest.TestCase):
+
+    def setUp(self):
+        self.df_template = build_template()
+        self.sampler = fs.FutureSampler(self.df_template, time_period_u0 = 4, )
+        self.fields_tp = [str(x) for x in range(12)]
+
+    def test_base_future_equals_templates(self):
+        arr_lhs = self.sampler.sample_lhs(20, seed = 1, )
+        arr = self.sampler.build_trajectories(arr_lhs, )
+
+        df_base = self.df_template.set_index("variable").loc[self.sampler.variables, self.fields_tp]
+        np.testing.assert_array_equal(arr[0], df_base.to_numpy().transpose())
+
+    def test_base_future_in_batches(self):
+        batches = list(self.sampler.iter_batches(9, 4, seed = 2, ))
+        df_0 = batches[0][1]
+        df_0 = df_0[df_0["future_id"] == 0].set_index("time_period")
+
+        for variable in self.sampler.variables:
+            vec_template = (
+                self.df_template
+                .set_index("variable")
+                .loc[variable, self.fields_tp]
+                .to_numpy(dtype = float, )
+            )
+            np.testing.assert_array_equal(df_0[variable].to_numpy(), vec_template)
+
+        self.assertEqual(sum(len(x[0]) for x in batches), 10)
+
+    def test_fixed_variables_are_dropped(self):
+        self.assertNotIn("fixed", self.sampler.variables)
+        # normalized groups are kept whole
+        self.assertIn("frac_b", self.sampler.variables)
+
+    def test_lhs_strata(self):
+        n = 50
+        arr_lhs = self.sampler.sample_lhs(n, include_base_future = False, seed = 3, )
+
+        self.assertEqual(arr_lhs.shape, (n, self.sampler.n_dims))
+        for d in range(self.sampler.n_dims):
+            vec_strata = np.sort(np.floor(arr_lhs[:, d]*n).astype(int))
+            np.testing.assert_array_equal(vec_strata, np.arange(n))
+
+    def test_bounds_and_normalization(self):
+        arr_lhs = self.sampler.sample_lhs(30, include_base_future = False, seed = 4, )
+        arr = self.sampler.build_trajectories(arr_lhs, )
+        arr_base = self.sampler.arr_base
+
+        # grouped variables share a sample; scalars stay in bounds
+        ind_gdp = self.sampler.variables.index("gdp")
+        vec_scalar = arr[:, -1, ind_gdp]/arr_base[-1, ind_gdp]
+        self.assertTrue(((vec_scalar >= 0.7 - 1e-12) & (vec_scalar <= 1.3 + 1e-12)).all())
+
+        # no uncertainty up to time_period_u0
+        np.testing.assert_allclose(arr[:, 0:5, :], np.broadcast_to(arr_base[0:5], arr[:, 0:5, :].shape))
+
+        # normalized group keeps base totals
+        inds = [self.sampler.variables.index(x) for x in ["frac_a", "frac_b"]]
+        np.testing.assert_allclose(arr[:, :, inds].sum(axis = 2), 1.0)
+
+    def build_base_inputs(self, regions):
+        # one row per (region, time_period); values differ by region
+        dfs = []
+        for i, region in enumerate(regions):
+            df = pd.DataFrame({"region": region, "time_period": np.arange(12), })
+            df["gdp"] = 100.0*(i + 1)
+            df["other"] = float(i)
+            dfs.append(df)
+
+        return pd.concat(dfs, axis = 0, ).reset_index(drop = True, )
+
+    def test_multi_region_base_inputs(self):
+        df_inputs_base = self.build_base_inputs(["a", "b"])
+        sampler = fs.FutureSampler(self.df_template, region = "b", time_period_u0 = 4, )
+        _, df = next(sampler.iter_batches(3, 4, df_inputs_base = df_inputs_base, seed = 5, ))
+
+        # one row per (future, time_period) using region b's base inputs
+        self.assertEqual(len(df), 4*12)
+        self.assertEqual(list(df.columns), ["future_id", "region", "time_period", "gdp", "other"])
+        self.assertEqual(set(df["region"]), {"b"})
+        np.testing.assert_array_equal(df["other"], 1.0)
+
+        df_0 = df[df["future_id"] == 0]
+        vec_template = self.df_template.set_index("variable").loc["gdp", self.fields_tp].to_numpy(dtype = float, )
+        np.testing.assert_array_equal(df_0["gdp"].to_numpy(), vec_template)
+
+    def test_multi_region_base_inputs_require_region(self):
+        df_inputs_base = self.build_base_inputs(["a", "b"])
+
+        with self.assertRaises(ValueError):
+            next(self.sampler.iter_batches(3, 4, df_inputs_base = df_inputs_base, ))
+
+        # a single region does not need to be specified
+        _, df = next(self.sampler.iter_batches(3, 4, df_inputs_base = self.build_base_inputs(["a"]), ))
+        self.assertEqual(len(df), 4*12)
+
+    def test_write_futures_table_csv(self):
+        with tempfile.TemporaryDirectory() as dir_tmp:
+            path = os.path.join(dir_tmp, "futures.csv")
+            self.sampler.write_futures_table(path, 9, batch_size = 4, seed = 6, )
+            df = pd.read_csv(path, )
+
+        df_expected = pd.concat([x[1] for x in self.sampler.iter_batches(9, 4, dtype = np.float32, seed = 6, )])
+        self.assertEqual(len(df), 10*12)
+        np.testing.assert_allclose(df[self.sampler.variables], df_expected[self.sampler.variables], rtol = 1e-6, )
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow") is not None, "pyarrow is not installed")
+    def test_write_futures_table_parquet(self):
+        with tempfile.TemporaryDirectory() as dir_tmp:
+            path = os.path.join(dir_tmp, "futures.parquet")
+            self.sampler.write_futures_table(path, 9, batch_size = 4, seed = 6, )
+            df = pd.read_parquet(path, )
+
+        df_expected = pd.concat([x[1] for x in self.sampler.iter_batches(9, 4, dtype = np.float32, seed = 6, )])
+        pd.testing.assert_frame_equal(df, df_expected.reset_index(drop = True, ), )
+
+    def test_write_futures_table_invalid_format(self):
+        with self.assertRaises(ValueError):
+            self.sampler.write_futures_table("futures.txt", 2, fmt = "txt", )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils.gap_filling as gf
+except ModuleNotFoundError:
+    import gap_filling as gf
+
+
+class TestFillGaps(unittest.TestCase):
+
+    def setUp(self):
+        # rows are deliberately out of order; output order must be preserved
+        self.df = pd.DataFrame(
+            {
+                "year": [2018, 2015, 2016, 2017, 2019, 2020],
+                "x_gap": [np.nan, 1.0, np.nan, 3.0, 5.0, np.nan],
+                "x_full": [4.0, 1.0, 2.0, 3.0, 5.0, 6.0],
+            }
+        )
+
+    def fill(self, method, **kwargs):
+        df_out, df_log = gf.fill_gaps(
+            self.df,
+            "year",
+            dict_methods = {"x_gap": method},
+            **kwargs,
+        )
+        vec = df_out.set_index("year").loc[range(2015, 2021), "x_gap"].to_numpy()
+
+        return df_out, df_log, vec
+
+    def test_linear(self):
+        df_out, df_log, vec = self.fill("linear", )
+
+        np.testing.assert_allclose(vec, [1.0, 2.0, 3.0, 4.0, 5.0, 5.0])
+        self.assertEqual(list(df_out["year"]), list(self.df["year"]))
+
+    def test_flat(self):
+        _, _, vec = self.fill("flat", )
+
+        np.testing.assert_allclose(vec, [1.0, 1.0, 3.0, 3.0, 5.0, 5.0])
+
+    def test_growth_rate(self):
+        _, _, vec = self.fill("growth_rate", n_obs_growth = 2, )
+
+        # interior gaps are linear; trailing gaps grow at the rate from 3 -> 5
+        rate = (5.0/3.0)**(1.0/2.0) - 1.0
+        np.testing.assert_allclose(vec, [1.0, 2.0, 3.0, 4.0, 5.0, 5.0*(1 + rate)])
+
+    def test_profile(self):
+        df_profile = pd.DataFrame(
+            {
+                "year": range(2015, 2021),
+                "x_gap": [10.0, 20.0, 30.0, 40.0, 50.0, 100.0],
+            }
+        )
+        _, _, vec = self.fill("profile", df_profile = df_profile, )
+
+        # gaps follow the profile scaled to the last observation before them
+        np.testing.assert_allclose(vec, [1.0, 2.0, 3.0, 4.0, 5.0, 10.0])
+
+    def test_profile_fills_empty_fields(self):
+        df = pd.DataFrame({"year": [2015, 2016], "x_empty": [np.nan, np.nan]})
+        df_profile = pd.DataFrame({"year": [2015, 2016], "x_empty": [0.3, 0.4]})
+        df_out, _ = gf.fill_gaps(df, "year", method_default = "profile", df_profile = df_profile, )
+
+        np.testing.assert_allclose(df_out["x_empty"], [0.3, 0.4])
+
+    def test_only_gapped_fields_are_written_and_logged(self):
+        df_out, df_log = gf.fill_gaps(self.df, "year", )
+
+        pd.testing.assert_series_equal(df_out["x_full"], self.df["x_full"])
+        self.assertEqual(set(df_log["field"]), {"x_gap"})
+        self.assertEqual(sorted(df_log["year"]), [2016, 2018, 2020])
+        self.assertEqual(set(df_log["method"]), {"linear"})
+
+    def test_method_by_prefix(self):
+        dict_methods = {"x_": "flat", "x_g": "linear", "x_gap_other": "profile"}
+
+        self.assertEqual(gf.get_method("x_gap", dict_methods, "growth_rate", ), "linear")
+        self.assertEqual(gf.get_method("x_full", dict_methods, "growth_rate", ), "flat")
+        self.assertEqual(gf.get_method("y", dict_methods, "growth_rate", ), "growth_rate")
+
+    def test_invalid_method(self):
+        with self.assertRaises(ValueError):
+            gf.fill_gaps(self.df, "year", method_default = "cubic", )
+
+
+if __name__ == "__main__":
+    unittest.main()
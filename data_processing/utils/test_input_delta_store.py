@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils.input_delta_store as ids
+except ModuleNotFoundError:
+    import input_delta_store as ids
+
+
+class TestInputDeltaStore(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        primaries = [0, 1001, 2002, 3003]
+        n_tp = 6
+        dfs = []
+
+        arr_base = rng.uniform(0, 1, (n_tp, 3))
+        for i, primary in enumerate(primaries):
+            arr = arr_base.copy()
+            # each primary changes a different set of cells
+            if i > 0:
+                arr[i:, (i - 1) % 3] *= 1 + i
+            dfs.append(
+                pd.DataFrame(
+                    {
+                        "primary_id": primary,
+                        "region": "uganda",
+                        "time_period": np.arange(n_tp),
+                        "x_0": arr[:, 0],
+                        "x_1": arr[:, 1],
+                        "x_2": arr[:, 2],
+                    }
+                )
+            )
+
+        self.df_inputs = pd.concat(dfs, axis = 0, ).reset_index(drop = True, )
+        self.store = ids.InputDeltaStore(self.df_inputs, primary_baseline = 0, )
+
+    def get_expected(self, primaries):
+        df = pd.concat(
+            [self.df_inputs[self.df_inputs["primary_id"] == x] for x in primaries],
+            axis = 0,
+        )
+
+        return df.reset_index(drop = True, )
+
+    def test_reconstructs_all_primaries(self):
+        df_out = self.store.get_inputs()
+
+        pd.testing.assert_frame_equal(df_out, self.df_inputs, check_dtype = False, )
+
+    def test_only_changed_cells_are_stored(self):
+        df_summary = self.store.summarize()
+
+        self.assertEqual(df_summary["n_cells_changed"].tolist(), [0, 5, 4, 3])
+        self.assertEqual(df_summary["n_fields_changed"].tolist(), [0, 1, 1, 1])
+
+    def test_requested_order_is_kept(self):
+        primaries = [3003, 1001]
+        df_out = self.store.get_inputs(primaries)
+
+        pd.testing.assert_frame_equal(df_out, self.get_expected(primaries), check_dtype = False, )
+
+    def test_duplicate_primaries(self):
+        primaries = [2002, 1001, 2002, 0, 1001]
+        df_out = self.store.get_inputs(primaries)
+
+        pd.testing.assert_frame_equal(df_out, self.get_expected(primaries), check_dtype = False, )
+
+    def test_missing_primary_raises(self):
+        with self.assertRaises(KeyError):
+            self.store.get_inputs([1001, 999])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as dir_tmp:
+            path = os.path.join(dir_tmp, "inputs_delta.npz")
+            self.store.save(path)
+            store = ids.InputDeltaStore.load(path)
+
+        pd.testing.assert_frame_equal(
+            store.get_inputs([1001, 1001]),
+            self.get_expected([1001, 1001]),
+            check_dtype = False,
+        )
+        self.assertEqual(store.primary_baseline, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import threading
+import time
+import tracemalloc
+import unittest
+
+import numpy as np
+
+try:
+    import utils.profiling as prf
+except ModuleNotFoundError:
+    import profiling as prf
+
+
+class TestStageProfiler(unittest.TestCase):
+
+    def test_nested_spans_record_depth_and_shapes(self):
+        profiler = prf.StageProfiler()
+        arr = np.zeros((3, 4))
+
+        with profiler.span("outer", category = "build", obj_in = arr, ) as rec_outer:
+            with profiler.span("inner", category = "read", path = "x.csv", ) as rec_inner:
+                rec_inner.set_shape(arr, )
+            rec_outer.set_shape(arr[0:2], )
+
+        dict_recs = dict((x.name, x) for x in profiler.records)
+        self.assertEqual(dict_recs["outer"].depth, 0)
+        self.assertEqual(dict_recs["inner"].depth, 1)
+        self.assertEqual(dict_recs["outer"].shape_in, (3, 4))
+        self.assertEqual(dict_recs["outer"].shape_out, (2, 4))
+        self.assertEqual(dict_recs["inner"].metadata, {"path": "x.csv"})
+        self.assertGreaterEqual(dict_recs["outer"].wall_s, dict_recs["inner"].wall_s)
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = prf.get_profiler(None, )
+        with profiler.span("stage", ) as rec:
+            rec.set_shape(np.zeros(2), )
+
+        self.assertEqual(profiler.records, [])
+
+    def test_trace_memory_nested_peaks(self):
+        profiler = prf.StageProfiler(trace_memory = True, )
+
+        with profiler.span("outer", ):
+            with profiler.span("inner", ):
+                arr = np.ones(2_000_000)
+                del arr
+
+        dict_recs = dict((x.name, x) for x in profiler.records)
+        self.assertGreaterEqual(dict_recs["inner"].peak_tracemalloc_bytes, 16_000_000)
+        self.assertGreaterEqual(dict_recs["outer"].peak_tracemalloc_bytes, 16_000_000)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_trace_memory_across_threads(self):
+        # spans in one thread must not stop or reset tracing for another
+        profiler = prf.StageProfiler(trace_memory = True, )
+        barrier = threading.Barrier(4)
+        n_bytes = 8_000_000
+
+        def work(i):
+            with profiler.span(f"thread_{i}", ):
+                barrier.wait()
+                arr = np.ones(n_bytes//8)
+                barrier.wait()
+                del arr
+
+        threads = [threading.Thread(target = work, args = (i, )) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(profiler.records), 4)
+        for rec in profiler.records:
+            self.assertGreaterEqual(rec.peak_tracemalloc_bytes, n_bytes)
+
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_cpu_time_is_per_thread(self):
+        # a waiting span is not charged for CPU used by another thread
+        profiler = prf.StageProfiler()
+        event = threading.Event()
+
+        def spin():
+            t_0 = time.perf_counter()
+            while time.perf_counter() - t_0 < 0.3:
+                pass
+            event.set()
+
+        with profiler.span("wait", ) as rec:
+            thread = threading.Thread(target = spin, )
+            thread.start()
+            event.wait()
+            thread.join()
+
+        self.assertGreaterEqual(rec.wall_s, 0.3)
+        self.assertLess(rec.cpu_s, 0.1)
+        self.assertIn("process_peak_rss_bytes", rec.to_dict())
+
+    def test_summarize(self):
+        profiler = prf.StageProfiler()
+
+        @profiler.profile("step", category = "model", )
+        def f(n):
+            return np.zeros((n, 2))
+
+        f(3)
+        f(4)
+
+        summary = profiler.summarize(by = "name", )
+        self.assertEqual(summary[0]["name"], "step")
+        self.assertEqual(summary[0]["n"], 2)
+        self.assertEqual(profiler.records[-1].shape_out, (4, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
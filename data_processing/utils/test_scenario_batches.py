@@ -0,0 +1,129 @@
+import os
+import pathlib
+import tempfile
+import unittest
+import warnings
+
+import pandas as pd
+
+try:
+    import utils.scenario_batches as sb
+except ModuleNotFoundError:
+    import scenario_batches as sb
+
+
+class Runner:
+    """Runner that records calls and fails for primaries in primaries_fail
+    """
+    def __init__(self, primaries_fail = None, ):
+        self.calls = []
+        self.primaries_fail = set() if (primaries_fail is None) else set(primaries_fail)
+
+    def __call__(self, primary_id, ):
+        self.calls.append(primary_id)
+        if primary_id in self.primaries_fail:
+            raise RuntimeError(f"primary {primary_id} crashed")
+
+        return pd.DataFrame(
+            {
+                "primary_id": [primary_id]*2,
+                "time_period": [0, 1],
+                "value": [primary_id*1.0, primary_id*2.0],
+            }
+        )
+
+
+def build_runner(
+):
+    return Runner()
+
+
+class TestScenarioBatchManager(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.TemporaryDirectory()
+        self.path_run = pathlib.Path(self.dir_tmp.name).joinpath("run_0")
+        self.df_primary = pd.DataFrame(
+            {
+                "primary_id": [0, 1001, 2002, 3003],
+                "design_id": [0]*4,
+                "strategy_id": [0, 1001, 2002, 3003],
+                "future_id": [0]*4,
+            }
+        )
+
+    def tearDown(self):
+        self.dir_tmp.cleanup()
+
+    def test_checkpoint_and_resume(self):
+        # first run crashes on one primary
+        runner = Runner(primaries_fail = [2002], )
+        manager = sb.ScenarioBatchManager(self.path_run, self.df_primary, runner = runner, )
+        with warnings.catch_warnings(record = True, ) as list_warnings:
+            warnings.simplefilter("always")
+            df_manifest = manager.run()
+
+        self.assertEqual(len(list_warnings), 1)
+        self.assertEqual(manager.get_pending_primaries(), [2002])
+        self.assertEqual(
+            df_manifest.set_index("primary_id")["status"].to_dict(),
+            {0: "complete", 1001: "complete", 2002: "failed", 3003: "complete"},
+        )
+        with self.assertRaises(RuntimeError):
+            manager.combine()
+
+        # resume from disk only: the attribute table is read from the run directory
+        runner = Runner()
+        manager = sb.ScenarioBatchManager(self.path_run, runner = runner, )
+        manager.run()
+
+        self.assertEqual(runner.calls, [2002])
+        self.assertEqual(manager.get_pending_primaries(), [])
+
+        df_out = manager.combine()
+        self.assertEqual(df_out["primary_id"].tolist(), [0, 0, 1001, 1001, 2002, 2002, 3003, 3003])
+        self.assertTrue(self.path_run.joinpath("run_0.csv").is_file())
+
+        # nothing left to run
+        manager.run()
+        self.assertEqual(runner.calls, [2002])
+
+    def test_missing_output_is_rerun(self):
+        runner = Runner()
+        manager = sb.ScenarioBatchManager(self.path_run, self.df_primary, runner = runner, )
+        manager.run()
+
+        os.remove(manager.dir_primaries.joinpath("primary_1001.csv"))
+        manager.run()
+
+        self.assertEqual(runner.calls, [0, 1001, 2002, 3003, 1001])
+
+    def test_skip_failed_primaries(self):
+        manager = sb.ScenarioBatchManager(
+            self.path_run, 
+            self.df_primary, 
+            runner = Runner(primaries_fail = [0], ), 
+        )
+        with self.assertRaises(RuntimeError):
+            manager.run(stop_on_error = True, )
+
+        runner = Runner()
+        manager.runner = runner
+        manager.run(retry_failed = False, )
+        self.assertNotIn(0, runner.calls)
+
+    def test_workers(self):
+        manager = sb.ScenarioBatchManager(
+            self.path_run,
+            self.df_primary,
+            build_runner = build_runner,
+            n_workers = 2,
+        )
+        manager.run()
+
+        self.assertEqual(manager.get_pending_primaries(), [])
+        self.assertEqual(len(manager.combine(write = False, )), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils.sensitivity as sens
+except ModuleNotFoundError:
+    import sensitivity as sens
+
+
+class LinearModels:
+    """Model with emissions linear in inputs; counts calls
+    """
+    def __init__(self, ):
+        self.n_calls = 0
+
+    def __call__(self, df_input, **kwargs, ):
+        self.n_calls += 1
+
+        return pd.DataFrame(
+            {
+                "time_period": df_input["time_period"],
+                "emission_co2e_subsector_total_a": df_input["x_1"] + df_input["x_2"],
+                "emission_co2e_subsector_total_b": df_input["x_3"],
+                "other": 0.0,
+            }
+        )
+
+
+def build_linear_models(
+):
+    return LinearModels()
+
+
+class TestSensitivityAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.models = LinearModels()
+        self.df_input = pd.DataFrame(
+            {
+                "time_period": [2, 0, 1],
+                "x_1": [3.0, 1.0, 2.0],
+                "x_2": [1.0, 1.0, 1.0],
+                "x_3": [5.0, 5.0, 5.0],
+            }
+        )
+        self.dict_groups = {"g_12": ["x_1", "x_2"], "g_3": ["x_3"]}
+
+    def build(self, **kwargs):
+        sa = sens.SensitivityAnalysis(
+            self.df_input,
+            self.dict_groups,
+            build_models = lambda: self.models,
+            year_0 = 2015,
+            **kwargs,
+        )
+
+        return sa
+
+    def test_oat_run_count(self):
+        sa = self.build()
+        df_oat = sa.run_oat(delta = 0.1, )
+
+        # baseline plus one run per group; output fields come from the baseline
+        self.assertEqual(self.models.n_calls, 3)
+        self.assertEqual(
+            sa.fields_output,
+            ["emission_co2e_subsector_total_a", "emission_co2e_subsector_total_b"],
+        )
+        self.assertEqual(len(df_oat), 2*3*2)
+
+        # the baseline is reused across designs
+        sa.run_oat(delta = 0.1, two_sided = True, )
+        self.assertEqual(self.models.n_calls, 3 + 4)
+
+    def test_oat_elasticities(self):
+        df_oat = self.build().run_oat(delta = 0.1, )
+        df_oat = df_oat.set_index(["group", "time_period", "output"])["elasticity"]
+
+        np.testing.assert_allclose(df_oat.loc[("g_12", slice(None), "emission_co2e_subsector_total_a")], 1.0)
+        np.testing.assert_allclose(df_oat.loc[("g_12", slice(None), "emission_co2e_subsector_total_b")], 0.0)
+        np.testing.assert_allclose(df_oat.loc[("g_3", slice(None), "emission_co2e_subsector_total_b")], 1.0)
+
+    def test_time_period_start(self):
+        df_oat = self.build(time_period_start = 1, ).run_oat(delta = 0.1, )
+        df_oat = df_oat[df_oat["group"] == "g_3"].set_index(["time_period", "output"])["elasticity"]
+
+        self.assertEqual(df_oat.loc[(0, "emission_co2e_subsector_total_b")], 0.0)
+        self.assertAlmostEqual(df_oat.loc[(2, "emission_co2e_subsector_total_b")], 1.0)
+
+    def test_morris_run_count(self):
+        sa = self.build()
+        df_morris = sa.run_morris(n_trajectories = 3, seed = 0, )
+
+        # design points equal to the baseline are not run again
+        self.assertLessEqual(self.models.n_calls, 1 + 3*3)
+        self.assertEqual(set(df_morris["group"]), {"g_12", "g_3"})
+        np.testing.assert_allclose(
+            df_morris[
+                (df_morris["group"] == "g_3")
+                & (df_morris["output"] == "emission_co2e_subsector_total_b")
+            ]["mu"],
+            1.0,
+        )
+
+    def test_shared_executor(self):
+        sa = sens.SensitivityAnalysis(
+            self.df_input,
+            self.dict_groups,
+            build_models = build_linear_models,
+            n_workers = 2,
+            year_0 = 2015,
+        )
+        df_serial = self.build().run_oat(delta = 0.1, )
+
+        with sa.build_executor() as executor:
+            df_oat = sa.run_oat(delta = 0.1, executor = executor, )
+            sa.run_morris(n_trajectories = 2, seed = 0, executor = executor, )
+
+        pd.testing.assert_frame_equal(df_oat, df_serial, )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import pathlib
+import stat
+import tempfile
+import unittest
+
+import pandas as pd
+
+try:
+    import utils.shared_support as shs
+except ModuleNotFoundError:
+    import shared_support as shs
+
+
+def build_counter(
+) -> dict:
+    return {"n": 1}
+
+
+def build_other(
+) -> dict:
+    return {"n": 2}
+
+
+class TestSharedSupport(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.dir_tmp.name)
+        shs.clear_worker_state()
+
+    def tearDown(self):
+        self.dir_tmp.cleanup()
+        shs.clear_worker_state()
+
+    def test_write_csv_atomic(self):
+        df = pd.DataFrame({"a": [1, 2], "b": [0.5, 0.25]})
+        path_out = self.path.joinpath("out.csv")
+        shs.write_csv_atomic(df, path_out, )
+
+        pd.testing.assert_frame_equal(pd.read_csv(path_out, ), df, )
+        self.assertEqual(os.listdir(self.path), ["out.csv"])
+
+    def test_atomic_write_uses_default_file_mode(self):
+        # compare with a file created by open(), which applies the umask
+        path_ref = self.path.joinpath("ref.txt")
+        path_ref.write_text("ref")
+        path_out = self.path.joinpath("out.txt")
+        with shs.atomic_write(path_out, ) as path_tmp:
+            with open(path_tmp, "w") as fp:
+                fp.write("new")
+
+        self.assertEqual(
+            stat.S_IMODE(os.stat(path_out).st_mode),
+            stat.S_IMODE(os.stat(path_ref).st_mode),
+        )
+
+    def test_atomic_write_failure_keeps_existing_file(self):
+        path_out = self.path.joinpath("out.txt")
+        path_out.write_text("old")
+
+        with self.assertRaises(RuntimeError):
+            with shs.atomic_write(path_out, ) as path_tmp:
+                with open(path_tmp, "w") as fp:
+                    fp.write("partial")
+                raise RuntimeError("write failed")
+
+        self.assertEqual(path_out.read_text(), "old")
+        self.assertEqual(os.listdir(self.path), ["out.txt"])
+
+    def test_initialize_worker_keeps_objects_warm(self):
+        shs.initialize_worker(build_counter, {"x": 1}, )
+        obj = shs.get_worker_state("models")
+        shs.initialize_worker(build_counter, {"x": 2}, )
+
+        # same builder reuses the object; state is updated
+        self.assertIs(shs.get_worker_state("models"), obj)
+        self.assertEqual(shs.get_worker_state("x"), 2)
+
+        shs.initialize_worker(build_other, )
+        self.assertEqual(shs.get_worker_state("models"), {"n": 2})
+
+        shs.initialize_worker(build_counter, key = "runner", )
+        self.assertEqual(shs.get_worker_state("runner"), {"n": 1})
+        self.assertEqual(shs.get_worker_state("models"), {"n": 2})
+
+    def test_set_worker_state_is_rebuilt_by_initialize_worker(self):
+        shs.initialize_worker(build_counter, key = "runner", )
+        runner = {"n": 3}
+        shs.set_worker_state({"runner": runner, })
+        self.assertIs(shs.get_worker_state("runner"), runner)
+
+        # the builder no longer matches the object, so it is rebuilt
+        shs.initialize_worker(build_counter, key = "runner", )
+        self.assertEqual(shs.get_worker_state("runner"), {"n": 1})
+        self.assertIsNone(shs.get_worker_state("missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
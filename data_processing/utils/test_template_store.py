@@ -0,0 +1,128 @@
+import os
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+try:
+    import utils.future_sampling as fs
+    import utils.template_store as tps
+except ModuleNotFoundError:
+    import future_sampling as fs
+    import template_store as tps
+
+
+def build_sheets(
+    offset: float = 0.0,
+) -> dict:
+    """Build strategy sheets with values that need full precision
+    """
+    rng = np.random.default_rng(0)
+    dict_out = {}
+    for strategy_id in [0, 1002]:
+        dict_out.update({
+            f"strategy_id-{strategy_id}": pd.DataFrame(
+                {
+                    "variable": ["x", "y"],
+                    "max_35": [1.1, 1.2],
+                    0: rng.uniform(0, 1, 2) + offset,
+                    1: rng.uniform(0, 1, 2)/3.0,
+                }
+            )
+        })
+    dict_out.update({"notes": pd.DataFrame({"a": [1]})})
+
+    return dict_out
+
+
+def write_xlsx(
+    path: pathlib.Path,
+    dict_sheets: dict,
+) -> None:
+    with pd.ExcelWriter(path, engine = "openpyxl", ) as writer:
+        for sheet, df in dict_sheets.items():
+            df.to_excel(writer, sheet_name = sheet, index = False, )
+
+
+class TestTemplateStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.dir_tmp.name)
+        self.dict_sheets = build_sheets()
+
+    def tearDown(self):
+        self.dir_tmp.cleanup()
+
+    def test_sheets_round_trip(self):
+        df_template = tps.sheets_to_table(self.dict_sheets, )
+        dict_sheets = tps.table_to_sheets(df_template, )
+
+        self.assertEqual(sorted(dict_sheets.keys()), [0, 1002])
+        df_0 = self.dict_sheets.get("strategy_id-0")
+        df_0.columns = [str(x) for x in df_0.columns]
+        pd.testing.assert_frame_equal(dict_sheets.get(0), df_0, check_exact = True, )
+
+    def test_csv_reads_are_exact(self):
+        df_template = tps.sheets_to_table(self.dict_sheets, )
+        path_out = tps.write_template(df_template, self.path, "tmpl", )
+        df_read = tps.read_template(path_out, )
+
+        pd.testing.assert_frame_equal(df_read, df_template, check_exact = True, )
+        self.assertEqual(len(tps.read_template(path_out, strategy_ids = [1002], )), 2)
+
+    def test_failed_write_removes_temporary_file(self):
+        df_template = tps.sheets_to_table(self.dict_sheets, )
+
+        with mock.patch.object(pd.DataFrame, "to_csv", side_effect = OSError("disk full"), ):
+            with self.assertRaises(OSError):
+                tps.write_template(df_template, self.path, "tmpl", )
+
+        self.assertEqual(list(self.path.iterdir()), [])
+
+    def test_sync_only_converts_stale_workbooks(self):
+        dir_store = self.path.joinpath("store")
+        write_xlsx(self.path.joinpath("a.xlsx"), self.dict_sheets, )
+        write_xlsx(self.path.joinpath("b.xlsx"), build_sheets(offset = 1.0, ), )
+
+        self.assertEqual(len(tps.sync_xlsx_templates(self.path, dir_store, )), 2)
+        self.assertEqual(tps.sync_xlsx_templates(self.path, dir_store, ), [])
+
+        # touching a workbook converts it again
+        path_a = self.path.joinpath("a.xlsx")
+        mtime = os.path.getmtime(dir_store.joinpath("a.csv")) + 10
+        os.utime(path_a, (mtime, mtime), )
+        self.assertEqual(tps.sync_xlsx_templates(self.path, dir_store, ), [dir_store.joinpath("a.csv")])
+
+        # exported workbooks are not converted back
+        tps.export_xlsx_directory(dir_store, self.path.joinpath("export"), )
+        tps.sync_xlsx_templates(self.path.joinpath("export"), dir_store, )
+        self.assertEqual(tps.export_xlsx_directory(dir_store, self.path.joinpath("export"), ), [])
+
+    def test_read_templates_uses_store(self):
+        write_xlsx(self.path.joinpath("a.xlsx"), self.dict_sheets, )
+        write_xlsx(self.path.joinpath("b.xlsx"), build_sheets(offset = 1.0, ), )
+
+        df_xlsx = pd.concat(
+            [
+                pd.read_excel(self.path.joinpath(x), sheet_name = "strategy_id-1002", )
+                for x in ["a.xlsx", "b.xlsx"]
+            ],
+            axis = 0,
+        ).reset_index(drop = True, )
+        df_xlsx.columns = [str(x) for x in df_xlsx.columns]
+
+        df_read = fs.read_templates(self.path, strategy_id = 1002, )
+        pd.testing.assert_frame_equal(df_read, df_xlsx, check_exact = True, )
+        self.assertTrue(self.path.joinpath(fs._DIR_TEMPLATE_STORE, "a.csv").is_file())
+
+        # templates for removed workbooks are not read
+        os.remove(self.path.joinpath("b.xlsx"))
+        self.assertEqual(len(fs.read_templates(self.path, strategy_id = 1002, )), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    from utils.utils import TransportUtils
+except ModuleNotFoundError:
+    from utils import TransportUtils
+
+
+class TestTransportUtilsArrays(unittest.TestCase):
+
+    def setUp(self):
+        # years do not fully overlap, so missing years count as 0
+        self.domestic_arrivals = {2015: 1000, 2016: 1200, 2017: 1500}
+        self.domestic_departures = {2015: 900, 2016: 1100, 2018: 300}
+        self.international_departures = {2016: 5000, 2017: 5200, 2018: 6100}
+        self.domestic_cargo = {2015: 250.5, 2016: 300.0}
+        self.international_exports = {2016: 42000.0, 2017: 45500.0}
+
+    def test_passenger_km_matches_dict_version(self):
+        for fd, fi in [(300, 2500), (275.5, 3100)]:
+            dict_pkm = TransportUtils.compute_passenger_km(
+                self.domestic_arrivals,
+                self.domestic_departures,
+                self.international_departures,
+                factor_domestic = fd,
+                factor_international = fi,
+            )
+            df_pkm = TransportUtils.compute_passenger_km_array(
+                self.domestic_arrivals,
+                self.domestic_departures,
+                self.international_departures,
+                factor_domestic = fd,
+                factor_international = fi,
+            )
+
+            self.assertEqual(df_pkm.shape[0], 1)
+            self.assertEqual(list(df_pkm.columns), list(dict_pkm.keys()))
+            np.testing.assert_array_equal(df_pkm.iloc[0].to_numpy(), np.array(list(dict_pkm.values())))
+
+    def test_freight_mtkm_matches_dict_version(self):
+        dict_mtkm = TransportUtils.compute_freight_mtkm(
+            self.domestic_cargo,
+            self.international_exports,
+        )
+        df_mtkm = TransportUtils.compute_freight_mtkm_array(
+            pd.Series(self.domestic_cargo),
+            self.international_exports,
+        )
+
+        self.assertEqual(list(df_mtkm.columns), list(dict_mtkm.keys()))
+        np.testing.assert_array_equal(df_mtkm.iloc[0].to_numpy(), np.array(list(dict_mtkm.values())))
+
+    def test_factor_grid_matches_dict_version(self):
+        vec_fd = [250, 300, 350]
+        vec_fi = [2000, 2500]
+        df_grid = TransportUtils.compute_passenger_km_array(
+            self.domestic_arrivals,
+            self.domestic_departures,
+            self.international_departures,
+            factor_domestic = vec_fd,
+            factor_international = vec_fi,
+            grid = True,
+        )
+
+        self.assertEqual(df_grid.shape[0], len(vec_fd)*len(vec_fi))
+        for fd in vec_fd:
+            for fi in vec_fi:
+                dict_pkm = TransportUtils.compute_passenger_km(
+                    self.domestic_arrivals,
+                    self.domestic_departures,
+                    self.international_departures,
+                    factor_domestic = fd,
+                    factor_international = fi,
+                )
+                np.testing.assert_array_equal(
+                    df_grid.loc[(fd, fi)].to_numpy(),
+                    np.array(list(dict_pkm.values())),
+                )
+
+    def test_variant_frames_match_dict_version(self):
+        # one row per variant with years as columns
+        df_cargo = pd.DataFrame(
+            [self.domestic_cargo, {2015: 100.0, 2016: 120.0}],
+            index = pd.Index(["low", "high"], name = "scenario"),
+        )
+        df_mtkm = TransportUtils.compute_freight_mtkm_array(
+            df_cargo,
+            self.international_exports,
+        )
+
+        self.assertEqual(list(df_mtkm.index), ["low", "high"])
+        for scenario, row in df_cargo.iterrows():
+            dict_mtkm = TransportUtils.compute_freight_mtkm(
+                row.to_dict(),
+                self.international_exports,
+            )
+            np.testing.assert_array_equal(
+                df_mtkm.loc[scenario].to_numpy(),
+                np.array(list(dict_mtkm.values())),
+            )
+
+    def get_arrival_frames(self):
+        index = pd.Index(["a", "b"], name = "scenario")
+        df_arr = pd.DataFrame([self.domestic_arrivals, {2015: 10, 2016: 20, 2017: 30}], index = index, )
+        df_dep = pd.DataFrame([self.domestic_departures, {2015: 5, 2016: 15, 2018: 25}], index = index, )
+
+        return df_arr, df_dep
+
+    def check_variant_factor_rows(self, df_pkm, df_arr, df_dep, pairs):
+        # one row per (input variant, factor pair) with the input index kept
+        self.assertEqual(df_pkm.shape[0], len(df_arr)*len(pairs))
+        self.assertEqual(list(df_pkm.index.names), ["scenario", "factor_domestic", "factor_international"])
+
+        for scenario in df_arr.index:
+            for fd, fi in pairs:
+                dict_pkm = TransportUtils.compute_passenger_km(
+                    df_arr.loc[scenario].dropna().to_dict(),
+                    df_dep.loc[scenario].dropna().to_dict(),
+                    self.international_departures,
+                    factor_domestic = fd,
+                    factor_international = fi,
+                )
+                np.testing.assert_array_equal(
+                    df_pkm.loc[(scenario, fd, fi)].to_numpy(),
+                    np.array(list(dict_pkm.values())),
+                )
+
+    def test_variant_frames_with_factor_grid(self):
+        df_arr, df_dep = self.get_arrival_frames()
+        vec_fd = [250, 300, 350]
+        vec_fi = [2000, 2500]
+        df_pkm = TransportUtils.compute_passenger_km_array(
+            df_arr,
+            df_dep,
+            self.international_departures,
+            factor_domestic = vec_fd,
+            factor_international = vec_fi,
+            grid = True,
+        )
+
+        pairs = [(fd, fi) for fd in vec_fd for fi in vec_fi]
+        self.check_variant_factor_rows(df_pkm, df_arr, df_dep, pairs, )
+
+    def test_variant_frames_with_paired_factors(self):
+        # factor vectors with the same length as the variants are not paired with them
+        df_arr, df_dep = self.get_arrival_frames()
+        df_pkm = TransportUtils.compute_passenger_km_array(
+            df_arr,
+            df_dep,
+            self.international_departures,
+            factor_domestic = [250, 350],
+            factor_international = [2000, 3000],
+        )
+
+        self.check_variant_factor_rows(df_pkm, df_arr, df_dep, [(250, 2000), (350, 3000)], )
+
+    def test_freight_variant_frames_with_factor_grid(self):
+        df_cargo = pd.DataFrame(
+            [self.domestic_cargo, {2015: 100.0, 2016: 120.0}],
+            index = pd.Index(["low", "high"], name = "scenario"),
+        )
+        df_mtkm = TransportUtils.compute_freight_mtkm_array(
+            df_cargo,
+            self.international_exports,
+            factor_domestic = [250, 300],
+            factor_international = 2500,
+            grid = True,
+        )
+
+        self.assertEqual(df_mtkm.shape[0], 4)
+        for scenario, row in df_cargo.iterrows():
+            for fd in [250, 300]:
+                dict_mtkm = TransportUtils.compute_freight_mtkm(
+                    row.to_dict(),
+                    self.international_exports,
+                    factor_domestic = fd,
+                )
+                np.testing.assert_array_equal(
+                    df_mtkm.loc[(scenario, fd, 2500)].to_numpy(),
+                    np.array(list(dict_mtkm.values())),
+                )
+
+    def test_mismatched_variant_frames(self):
+        df_arr, df_dep = self.get_arrival_frames()
+
+        with self.assertRaises(ValueError):
+            TransportUtils.compute_passenger_km_array(
+                df_arr,
+                df_dep.iloc[[0]],
+                self.international_departures,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
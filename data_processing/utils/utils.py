@@ -298,5 +298,184 @@ class TransportUtils:
 
             result[year] = dom_mtkm + intl_mtkm
         return result
+
+    @staticmethod
+    def _align_yearly_inputs(*inputs):
+        """
+        Aligns year-indexed inputs on the sorted union of their years. Missing years are
+        set to 0, matching the dict-based calculators.
+
+        Args:
+            *inputs: Each a dict {year: value}, a pd.Series indexed by year, or a
+                pd.DataFrame with one row per input variant and one column per year.
+                DataFrame inputs must share the same index.
+
+        Returns:
+            tuple: (years, arrays, index) where years is a sorted np.ndarray, arrays is a
+                list of 3D arrays of shape (n_variants or 1, 1, n_years), and index is the
+                row index of the DataFrame inputs (or None).
+        """
+        frames = []
+        index = None
+        for obj in inputs:
+            if isinstance(obj, pd.DataFrame):
+                if index is not None and not obj.index.equals(index):
+                    raise ValueError("DataFrame inputs must share the same index of variants.")
+                frames.append(obj)
+                index = obj.index if index is None else index
+            else:
+                frames.append(pd.DataFrame([pd.Series(obj)]))
+
+        years = sorted(set().union(*[set(df.columns) for df in frames]))
+        arrays = [
+            df.reindex(columns=years).fillna(0).to_numpy()[:, None, :]
+            for df in frames
+        ]
+        return np.array(years), arrays, index
+
+    @staticmethod
+    def _broadcast_factors(factor_domestic, factor_international, grid):
+        """
+        Builds distance factor pairs and the matching factor index.
+
+        Args:
+            factor_domestic (int, float, or array-like): Domestic distance factor(s)
+            factor_international (int, float, or array-like): International distance factor(s)
+            grid (bool): If True, evaluate every combination of the two factor vectors;
+                otherwise, the vectors are paired element-wise (scalars are broadcast).
+
+        Returns:
+            tuple: (factor_domestic, factor_international, index) where the factors are
+                arrays of shape (n_pairs, 1) and index is a pd.MultiIndex of
+                (factor_domestic, factor_international), or None for a single scalar pair.
+        """
+        fd = np.atleast_1d(np.asarray(factor_domestic))
+        fi = np.atleast_1d(np.asarray(factor_international))
+        names = ["factor_domestic", "factor_international"]
+
+        if grid:
+            index = pd.MultiIndex.from_product([fd, fi], names=names)
+        else:
+            fd, fi = np.broadcast_arrays(fd, fi)
+            index = (
+                pd.MultiIndex.from_arrays([fd, fi], names=names)
+                if len(fd) > 1 else None
+            )
+
+        if index is not None:
+            fd = index.get_level_values(0).to_numpy()
+            fi = index.get_level_values(1).to_numpy()
+
+        return fd[:, None], fi[:, None], index
+
+    @staticmethod
+    def _to_variant_frame(values, years, index_factors, index_inputs):
+        """
+        Wraps an (input variant, factor pair, year) array in a DataFrame with years as
+        columns. Rows are the outer product of input variants and factor pairs, indexed
+        by (input variant, factor_domestic, factor_international); levels that do not
+        vary (a single scalar factor pair, or dict/Series inputs) are omitted.
+        """
+        n_inputs, n_factors, n_years = values.shape
+        values = values.reshape((n_inputs*n_factors, n_years))
+
+        if index_inputs is None and index_factors is None:
+            index = pd.RangeIndex(values.shape[0], name="variant")
+        elif index_factors is None:
+            index = index_inputs
+        elif index_inputs is None:
+            index = index_factors
+        else:
+            vec_inputs = np.repeat(np.arange(n_inputs), n_factors)
+            vec_factors = np.tile(np.arange(n_factors), n_inputs)
+            index = pd.MultiIndex.from_arrays(
+                [index_inputs.get_level_values(i)[vec_inputs] for i in range(index_inputs.nlevels)]
+                + [index_factors.get_level_values(i)[vec_factors] for i in range(index_factors.nlevels)],
+                names=[x if x is not None else "variant" for x in index_inputs.names]
+                + list(index_factors.names),
+            )
+
+        return pd.DataFrame(values, index=index, columns=years)
+
+    @staticmethod
+    def compute_passenger_km_array(
+        domestic_arrivals,
+        domestic_departures,
+        international_departures,
+        factor_domestic=300,
+        factor_international=2500,
+        grid: bool = False
+    ) -> pd.DataFrame:
+        """
+        Array-based version of compute_passenger_km that evaluates many variants at once.
+        Every input variant is evaluated with every factor pair (an outer product), so a
+        full sensitivity grid is a single NumPy expression. With dict inputs and scalar
+        factors, the single row equals compute_passenger_km exactly.
+
+        Args:
+            domestic_arrivals (dict, pd.Series, or pd.DataFrame): {year: count}, or one row
+                per variant with years as columns
+            domestic_departures (dict, pd.Series, or pd.DataFrame): as above
+            international_departures (dict, pd.Series, or pd.DataFrame): as above
+            factor_domestic (int, float, or array-like): Distance multiplier(s) for domestic
+                trips (default: 300 km)
+            factor_international (int, float, or array-like): Distance multiplier(s) for
+                international trips (default: 2500 km)
+            grid (bool): If True, evaluate every combination of the factor vectors;
+                otherwise, the factor vectors are paired element-wise.
+
+        Returns:
+            pd.DataFrame: total passenger-kilometers with years as columns and one row per
+                (input variant, factor pair), indexed by (input variant, factor_domestic,
+                factor_international)
+        """
+        years, (dom_arr, dom_dep, intl_dep), index_inputs = TransportUtils._align_yearly_inputs(
+            domestic_arrivals, domestic_departures, international_departures
+        )
+        fd, fi, index_factors = TransportUtils._broadcast_factors(
+            factor_domestic, factor_international, grid
+        )
+
+        values = (dom_arr + dom_dep) * fd + intl_dep * fi
+        return TransportUtils._to_variant_frame(values, years, index_factors, index_inputs)
+
+    @staticmethod
+    def compute_freight_mtkm_array(
+        domestic_cargo,
+        international_exports,
+        factor_domestic=300,
+        factor_international=2500,
+        grid: bool = False
+    ) -> pd.DataFrame:
+        """
+        Array-based version of compute_freight_mtkm that evaluates many variants at once.
+        Every input variant is evaluated with every factor pair (an outer product). With
+        dict inputs and scalar factors, the single row equals compute_freight_mtkm exactly.
+
+        Args:
+            domestic_cargo (dict, pd.Series, or pd.DataFrame): {year: tonnes}, or one row
+                per variant with years as columns
+            international_exports (dict, pd.Series, or pd.DataFrame): as above
+            factor_domestic (int, float, or array-like): Avg distance(s) in km for domestic
+                cargo (default: 300 km)
+            factor_international (int, float, or array-like): Avg distance(s) in km for
+                international exports (default: 2500 km)
+            grid (bool): If True, evaluate every combination of the factor vectors;
+                otherwise, the factor vectors are paired element-wise.
+
+        Returns:
+            pd.DataFrame: total freight in mtkm with years as columns and one row per
+                (input variant, factor pair), indexed by (input variant, factor_domestic,
+                factor_international)
+        """
+        years, (dom_tonnes, intl_tonnes), index_inputs = TransportUtils._align_yearly_inputs(
+            domestic_cargo, international_exports
+        )
+        fd, fi, index_factors = TransportUtils._broadcast_factors(
+            factor_domestic, factor_international, grid
+        )
+
+        values = (dom_tonnes * fd) / 1_000_000 + (intl_tonnes * fi) / 1_000_000
+        return TransportUtils._to_variant_frame(values, years, index_factors, index_inputs)
     
 
@@ -1,10 +1,21 @@
+import copy
+import json
 import logging
-from typing import List
+import multiprocessing
+import os
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional, Tuple
 
 def setup_clean_logger(name: str = "main", level: int = logging.INFO) -> logging.Logger:
     """
     Create a clean logger with a single console handler, avoiding duplicate logs.
 
+    If queue logging is active in this process (see setup_worker_logging),
+    the logger has no handlers and propagates to the queue instead, so its
+    records are not written to the console directly.
+
     Args:
         name (str): Name of the logger.
         level (int): Logging level (e.g., logging.INFO, logging.DEBUG).
@@ -12,18 +23,38 @@ def setup_clean_logger(name: str = "main", level: int = logging.INFO) -> logging
     Returns:
         logging.Logger: Configured logger instance.
     """
-    # Remove all root handlers to avoid duplicates from previous configurations
-    for handler in logging.root.handlers[:]:
-        logging.root.removeHandler(handler)
-
     # Create or retrieve the logger
     logger = logging.getLogger(name)
     logger.setLevel(level)
+    _CLEAN_LOGGERS.add(name)
 
     # Clear existing handlers for this logger
     if logger.hasHandlers():
         logger.handlers.clear()
 
+    # route through the queue if queue logging is active
+    if _QUEUE_STATE.get("active"):
+        logger.propagate = True
+        return logger
+
+    # Remove all root handlers to avoid duplicates from previous configurations
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+
+    _add_clean_console_handler(logger, level)
+
+    return logger
+
+
+def _add_clean_console_handler(logger: logging.Logger, level: int) -> None:
+    """
+    Add the console handler used by setup_clean_logger and disable
+    propagation.
+
+    Args:
+        logger (logging.Logger): Logger to configure.
+        level (int): Logging level of the handler.
+    """
     # Create a console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(level)
@@ -38,8 +69,6 @@ def setup_clean_logger(name: str = "main", level: int = logging.INFO) -> logging
     # Disable propagation to prevent duplication through root logger
     logger.propagate = False
 
-    return logger
-
 
 def mute_external_loggers(loggers_to_mute: List[str]) -> None:
     """
@@ -50,3 +79,355 @@ def mute_external_loggers(loggers_to_mute: List[str]) -> None:
     """
     for name in loggers_to_mute:
         logging.getLogger(name).propagate = False
+
+
+# ---------------------------------------------------------------------------
+# Queue-based logging for parallel runs
+# ---------------------------------------------------------------------------
+
+# context fields included in structured records
+LOG_CONTEXT_FIELDS = ["primary_id", "strategy_id", "stage"]
+
+# noisy external loggers that are rate-limited by default
+RATE_LIMITED_LOGGERS = ["sisepuede", "julia", "juliacall"]
+
+_FORMAT_TEXT = '%(asctime)s - %(processName)s - %(levelname)s - %(message)s'
+
+# names of loggers created by setup_clean_logger, whether queue logging is
+# active in this process, and the logging configuration it replaced
+_CLEAN_LOGGERS = set()
+_QUEUE_STATE = {"active": False, "saved": None}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as single-line JSON, including context fields (primary,
+    strategy, and stage) when they are set on the record.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format a record as JSON.
+
+        Args:
+            record (logging.LogRecord): Record to format.
+
+        Returns:
+            str: JSON string.
+        """
+        dict_out = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "message": record.getMessage(),
+        }
+
+        for field in LOG_CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                dict_out[field] = value
+
+        # records from a queue carry the formatted exception in exc_text
+        # (see ExceptionQueueHandler)
+        if record.exc_info:
+            dict_out["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            dict_out["exception"] = record.exc_text
+
+        return json.dumps(dict_out, default=str)
+
+
+class ExceptionQueueHandler(QueueHandler):
+    """
+    Queue handler that keeps exception text. QueueHandler.prepare merges the
+    traceback into the message and drops exc_info (tracebacks cannot be
+    pickled), so formatters in the listener never see the exception. Here,
+    the message is kept as is and the formatted traceback is stored in
+    exc_text, which both JsonFormatter and logging.Formatter write.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Prepare a record for pickling onto the queue.
+
+        Args:
+            record (logging.LogRecord): Record to prepare.
+
+        Returns:
+            logging.LogRecord: Copy of the record with the message merged
+            with its arguments and the exception stored as text.
+        """
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.message = record.msg
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limit records from noisy loggers to a maximum number per interval for
+    each (logger, message template) pair. When a new interval starts, the
+    first record notes how many similar records were suppressed.
+    """
+
+    def __init__(
+        self,
+        logger_names: Optional[List[str]] = None,
+        max_records: int = 10,
+        interval_s: float = 60.0,
+    ):
+        """
+        Args:
+            logger_names (Optional[List[str]]): Logger names (and their
+                children) to rate-limit. Defaults to RATE_LIMITED_LOGGERS.
+            max_records (int): Maximum records per interval for each
+                (logger, message template) pair.
+            interval_s (float): Length of the interval in seconds.
+        """
+        super().__init__()
+        self.logger_names = tuple(RATE_LIMITED_LOGGERS if logger_names is None else logger_names)
+        self.max_records = max_records
+        self.interval_s = interval_s
+        self._counts: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Check whether a record should be emitted.
+
+        Args:
+            record (logging.LogRecord): Record to check.
+
+        Returns:
+            bool: True if the record should be emitted.
+        """
+        if not any(record.name == x or record.name.startswith(f"{x}.") for x in self.logger_names):
+            return True
+
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+
+        with self._lock:
+            # state is [window start, count, suppressed]
+            state = self._counts.get(key)
+            if (state is None) or (now - state[0] >= self.interval_s):
+                n_suppressed = 0 if state is None else int(state[2])
+                self._counts[key] = [now, 1, 0]
+                if n_suppressed > 0:
+                    record.msg = f"{record.msg} ({n_suppressed} similar records suppressed)"
+                return True
+
+            if state[1] < self.max_records:
+                state[1] += 1
+                return True
+
+            state[2] += 1
+
+        return False
+
+
+def get_context_logger(logger: logging.Logger, **context) -> logging.LoggerAdapter:
+    """
+    Wrap a logger so that every record carries context fields (e.g.,
+    primary_id, strategy_id, stage) for structured output.
+
+    Args:
+        logger (logging.Logger): Logger to wrap.
+        **context: Context fields added to each record.
+
+    Returns:
+        logging.LoggerAdapter: Logger adapter with context.
+    """
+    class _ContextAdapter(logging.LoggerAdapter):
+        def process(self, msg, kwargs):
+            kwargs["extra"] = {**self.extra, **kwargs.get("extra", {})}
+            return msg, kwargs
+
+    return _ContextAdapter(logger, context)
+
+
+def setup_queue_logging(
+    level: int = logging.INFO,
+    path_log: Optional[str] = None,
+    backup_count: int = 5,
+    json_format: bool = False,
+    max_bytes: int = 10_000_000,
+    rate_limit: Optional[RateLimitFilter] = None,
+) -> Tuple["multiprocessing.Queue", QueueListener]:
+    """
+    Set up logging for parallel runs. Records from this process and from
+    worker processes (see setup_worker_logging) are put on a queue, and a
+    single listener thread writes them to the console and, optionally, a
+    rotating file. Workers never write to stderr or files directly.
+
+    Args:
+        level (int): Logging level.
+        path_log (Optional[str]): Optional path to a rotating log file.
+        backup_count (int): Number of rotated log files to keep.
+        json_format (bool): Write structured JSON records instead of text.
+        max_bytes (int): Maximum size of the log file before rotating.
+        rate_limit (Optional[RateLimitFilter]): Filter used to rate-limit
+            noisy external loggers. Defaults to RateLimitFilter().
+
+    Returns:
+        Tuple[multiprocessing.Queue, QueueListener]: Queue to pass to
+        workers and the running listener (stop with stop_queue_logging).
+    """
+    queue = multiprocessing.Queue(-1)
+    formatter = JsonFormatter() if json_format else logging.Formatter(_FORMAT_TEXT)
+
+    handlers = [logging.StreamHandler()]
+    if path_log is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(path_log)), exist_ok=True)
+        handlers.append(
+            RotatingFileHandler(path_log, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        )
+
+    for handler in handlers:
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
+
+    listener = QueueListener(queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    # route this process through the queue as well
+    setup_worker_logging(queue, level=level, rate_limit=rate_limit)
+
+    return queue, listener
+
+
+def setup_worker_logging(
+    queue: "multiprocessing.Queue",
+    level: int = logging.INFO,
+    rate_limit: Optional[RateLimitFilter] = None,
+) -> None:
+    """
+    Route all records in the current process to a logging queue. Use as
+    (or call from) a worker initializer, e.g.,
+    ProcessPoolExecutor(initializer=setup_worker_logging, initargs=(queue,)).
+    Records from rate-limited loggers are dropped before they are queued.
+
+    Loggers from setup_clean_logger have their own console handler and do
+    not propagate, so they are reset to propagate to the queue. Loggers
+    created by setup_clean_logger afterwards in this process propagate to
+    the queue as well. The configuration that is replaced is saved so that
+    stop_queue_logging can restore it.
+
+    Args:
+        queue (multiprocessing.Queue): Queue from setup_queue_logging.
+        level (int): Logging level.
+        rate_limit (Optional[RateLimitFilter]): Filter used to rate-limit
+            noisy external loggers. Defaults to RateLimitFilter().
+    """
+    if not _QUEUE_STATE.get("active"):
+        _QUEUE_STATE["saved"] = _get_logging_state()
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+
+    queue_handler = ExceptionQueueHandler(queue)
+    queue_handler.addFilter(RateLimitFilter() if rate_limit is None else rate_limit)
+
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    # external loggers propagate to the queue instead of their own handlers
+    for name in RATE_LIMITED_LOGGERS:
+        external = logging.getLogger(name)
+        for handler in external.handlers[:]:
+            external.removeHandler(handler)
+        external.propagate = True
+
+    # clean loggers would otherwise bypass the queue
+    for name in sorted(_CLEAN_LOGGERS):
+        clean = logging.getLogger(name)
+        for handler in clean.handlers[:]:
+            clean.removeHandler(handler)
+        clean.propagate = True
+
+    _QUEUE_STATE["active"] = True
+
+
+def stop_queue_logging(listener: QueueListener) -> None:
+    """
+    Restore the logging configuration replaced by setup_queue_logging, then
+    flush remaining records and stop the listener. The queue handler is
+    removed from the root logger, and clean and external loggers get their
+    handlers and propagation back. Clean loggers created while queue
+    logging was active get the console handler from setup_clean_logger.
+
+    Args:
+        listener (QueueListener): Listener from setup_queue_logging.
+    """
+    if _QUEUE_STATE.get("saved") is not None:
+        _restore_logging_state(_QUEUE_STATE["saved"])
+
+    _QUEUE_STATE.update({"active": False, "saved": None})
+
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def _get_logging_state() -> Dict:
+    """
+    Get the handlers and level of the root logger and the handlers and
+    propagation of clean and external loggers.
+
+    Returns:
+        Dict: State to pass to _restore_logging_state.
+    """
+    root = logging.getLogger()
+    names = sorted(set(RATE_LIMITED_LOGGERS) | _CLEAN_LOGGERS)
+
+    dict_out = {
+        "root": (root.handlers[:], root.level),
+        "loggers": dict(
+            (name, (logging.getLogger(name).handlers[:], logging.getLogger(name).propagate))
+            for name in names
+        ),
+    }
+
+    return dict_out
+
+
+def _restore_logging_state(state: Dict) -> None:
+    """
+    Restore a state from _get_logging_state, closing queue handlers that
+    are removed.
+
+    Args:
+        state (Dict): State from _get_logging_state.
+    """
+    root = logging.getLogger()
+    handlers, level = state["root"]
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        if isinstance(handler, ExceptionQueueHandler) and (handler not in handlers):
+            handler.close()
+
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+    for name in sorted(set(RATE_LIMITED_LOGGERS) | _CLEAN_LOGGERS):
+        logger = logging.getLogger(name)
+        logger.handlers.clear()
+
+        if name in state["loggers"]:
+            handlers, propagate = state["loggers"][name]
+            for handler in handlers:
+                logger.addHandler(handler)
+            logger.propagate = propagate
+        else:
+            _add_clean_console_handler(logger, logger.level)
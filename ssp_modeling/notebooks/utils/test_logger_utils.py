@@ -0,0 +1,140 @@
+import concurrent.futures as cf
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+try:
+    import utils.logger_utils as lu
+except ModuleNotFoundError:
+    import logger_utils as lu
+
+
+def log_error_worker(primary_id: int) -> int:
+    logger = lu.get_context_logger(logging.getLogger("worker"), primary_id=primary_id)
+    try:
+        1/0
+    except ZeroDivisionError:
+        logger.exception("primary %s failed", primary_id)
+
+    return primary_id
+
+
+class TestQueueLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.dir_tmp = tempfile.TemporaryDirectory()
+        self.path_log = os.path.join(self.dir_tmp.name, "run.log")
+
+        root = logging.getLogger()
+        self.root_handlers = root.handlers[:]
+        self.root_level = root.level
+
+    def tearDown(self):
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in self.root_handlers:
+            root.addHandler(handler)
+        root.setLevel(self.root_level)
+
+        for name in list(lu._CLEAN_LOGGERS) + lu.RATE_LIMITED_LOGGERS:
+            logging.getLogger(name).handlers.clear()
+            logging.getLogger(name).propagate = True
+        lu._CLEAN_LOGGERS.clear()
+        lu._QUEUE_STATE.update({"active": False, "saved": None})
+        self.dir_tmp.cleanup()
+
+    def read_records(self):
+        with open(self.path_log, encoding="utf-8") as fp:
+            list_out = [json.loads(x) for x in fp if x.strip()]
+
+        return list_out
+
+    def test_json_exception_through_queue(self):
+        queue, listener = lu.setup_queue_logging(path_log=self.path_log, json_format=True)
+        try:
+            log_error_worker(0)
+            with cf.ProcessPoolExecutor(
+                max_workers=2,
+                initializer=lu.setup_worker_logging,
+                initargs=(queue,),
+            ) as executor:
+                list(executor.map(log_error_worker, [1001, 2002]))
+        finally:
+            lu.stop_queue_logging(listener)
+
+        records = self.read_records()
+        self.assertEqual(sorted(x["primary_id"] for x in records), [0, 1001, 2002])
+        for record in records:
+            self.assertEqual(record["message"], f"primary {record['primary_id']} failed")
+            self.assertIn("ZeroDivisionError", record["exception"])
+            self.assertIn("Traceback", record["exception"])
+
+    def test_text_exception_through_queue(self):
+        queue, listener = lu.setup_queue_logging(path_log=self.path_log)
+        try:
+            log_error_worker(0)
+        finally:
+            lu.stop_queue_logging(listener)
+
+        with open(self.path_log, encoding="utf-8") as fp:
+            text = fp.read()
+
+        self.assertIn("primary 0 failed", text)
+        self.assertIn("ZeroDivisionError", text)
+
+    def test_clean_loggers_use_queue(self):
+        logger_before = lu.setup_clean_logger("clean_before")
+        queue, listener = lu.setup_queue_logging(path_log=self.path_log, json_format=True)
+        try:
+            logger_after = lu.setup_clean_logger("clean_after")
+            logger_before.info("before")
+            logger_after.info("after")
+
+            for logger in [logger_before, logger_after]:
+                self.assertTrue(logger.propagate)
+                self.assertEqual(logger.handlers, [])
+        finally:
+            lu.stop_queue_logging(listener)
+
+        records = self.read_records()
+        self.assertEqual(
+            [(x["logger"], x["message"]) for x in records],
+            [("clean_before", "before"), ("clean_after", "after")],
+        )
+
+    def test_stop_restores_logging(self):
+        # setup_clean_logger removes root handlers, so add them afterwards
+        logger_before = lu.setup_clean_logger("clean_before")
+        handlers_before = logger_before.handlers[:]
+
+        root = logging.getLogger()
+        root.addHandler(logging.NullHandler())
+        handlers_root = root.handlers[:]
+
+        handler_external = logging.NullHandler()
+        external = logging.getLogger(lu.RATE_LIMITED_LOGGERS[0])
+        external.addHandler(handler_external)
+        external.propagate = False
+
+        queue, listener = lu.setup_queue_logging(path_log=self.path_log)
+        logger_after = lu.setup_clean_logger("clean_after")
+        lu.stop_queue_logging(listener)
+
+        self.assertEqual(root.handlers, handlers_root)
+        self.assertFalse(any(isinstance(x, lu.ExceptionQueueHandler) for x in root.handlers))
+        self.assertEqual(external.handlers, [handler_external])
+        self.assertFalse(external.propagate)
+        self.assertEqual(logger_before.handlers, handlers_before)
+        self.assertFalse(logger_before.propagate)
+
+        # loggers created while the queue was active get a console handler
+        self.assertEqual(len(logger_after.handlers), 1)
+        self.assertFalse(logger_after.propagate)
+        self.assertFalse(lu._QUEUE_STATE["active"])
+
+
+if __name__ == "__main__":
+    unittest.main()